@@ -7,11 +7,14 @@ Based on AgentLab and WebArena architectures.
 """
 
 from .agent import AcidwaveAgentArgs, AcidwaveAgent
+from message_store import MessageStore, load_messages
 from .prompts import ACIDWAVE_SYSTEM_PROMPT, ACIDWAVE_EXAMPLES
 
 __all__ = [
     "AcidwaveAgentArgs",
     "AcidwaveAgent",
+    "MessageStore",
+    "load_messages",
     "ACIDWAVE_SYSTEM_PROMPT",
     "ACIDWAVE_EXAMPLES",
 ]
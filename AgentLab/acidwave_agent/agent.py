@@ -30,6 +30,10 @@ except ImportError:
     AGENTLAB_AVAILABLE = False
     print("[WARNING] AgentLab not found. Using fallback implementations.")
 
+from benchmark.tracing import span, traced
+
+from message_store import store_from_env
+
 # Local imports
 from .prompts import (
     ACIDWAVE_SYSTEM_PROMPT,
@@ -267,7 +271,36 @@ class AcidwaveAgent(bgym.Agent):
 
         logger.info(f"Initialized AcidwaveAgent with {model_name}, temp={temperature}")
 
+    def _build_messages(self, goal: str, url: str, html_content: str) -> list[dict]:
+        """System prompt, few-shot examples and the current observation as chat messages."""
+        messages = []
+
+        # System message
+        messages.append({"role": "system", "content": self.system_prompt})
+
+        # Add few-shot examples
+        for example in ACIDWAVE_EXAMPLES:
+            messages.append(example)
+
+        # Current observation
+        history_str = format_action_history(self.action_history, max_history=5)
+
+        current_prompt = f"""Goal: {goal}
+
+Current URL: {url}
+
+Current Page:
+{html_content}
+
+{history_str}
+
+What is the next action to achieve the goal? Output a single action in a code block."""
+
+        messages.append({"role": "user", "content": current_prompt})
+        return messages
+
     @cost_tracker_decorator
+    @traced("agent.get_action")
     def get_action(self, obs: Any) -> tuple[str, dict]:
         """
         Generate next action based on observation.
@@ -290,58 +323,39 @@ class AcidwaveAgent(bgym.Agent):
                 action_str: BID action like 'click("[aria-label=\'SONGS\']")'
                 info_dict: Metadata about generation process
         """
-        # Extract observation components
-        goal = obs.get("goal", "")
-        url = obs.get("url", "")
-
-        # Get HTML content
-        if self.use_axtree and "axtree_txt" in obs:
-            html_content = obs["axtree_txt"]
-        elif "pruned_html" in obs:
-            html_content = obs["pruned_html"]
-        elif "dom_txt" in obs:
-            html_content = obs["dom_txt"]
-        else:
-            html_content = "<No HTML available>"
-
-        # Truncate if too long
-        if len(html_content) > self.max_html_length:
-            html_content = html_content[:self.max_html_length] + "\n\n[... HTML truncated ...]"
-
-        # Get last action info
-        last_action = obs.get("last_action", None)
-        last_error = obs.get("last_action_error", None)
-
-        if last_action:
-            self.action_history.append(last_action)
-            if last_error:
-                self.action_history.append(f"  ERROR: {last_error}")
+        with span("agent.observation") as sp:
+            # Extract observation components
+            goal = obs.get("goal", "")
+            url = obs.get("url", "")
+
+            # Get HTML content
+            if self.use_axtree and "axtree_txt" in obs:
+                html_content = obs["axtree_txt"]
+            elif "pruned_html" in obs:
+                html_content = obs["pruned_html"]
+            elif "dom_txt" in obs:
+                html_content = obs["dom_txt"]
+            else:
+                html_content = "<No HTML available>"
+
+            # Truncate if too long
+            if len(html_content) > self.max_html_length:
+                html_content = html_content[:self.max_html_length] + "\n\n[... HTML truncated ...]"
+
+            # Get last action info
+            last_action = obs.get("last_action", None)
+            last_error = obs.get("last_action_error", None)
+
+            if last_action:
+                self.action_history.append(last_action)
+                if last_error:
+                    self.action_history.append(f"  ERROR: {last_error}")
+
+            sp["html_chars"] = len(html_content)
 
         # Build messages
-        messages = []
-
-        # System message
-        messages.append({"role": "system", "content": self.system_prompt})
-
-        # Add few-shot examples
-        for example in ACIDWAVE_EXAMPLES:
-            messages.append(example)
-
-        # Current observation
-        history_str = format_action_history(self.action_history, max_history=5)
-
-        current_prompt = f"""Goal: {goal}
-
-Current URL: {url}
-
-Current Page:
-{html_content}
-
-{history_str}
-
-What is the next action to achieve the goal? Output a single action in a code block."""
-
-        messages.append({"role": "user", "content": current_prompt})
+        with span("agent.prompt"):
+            messages = self._build_messages(goal, url, html_content)
 
         # Call LLM with retry logic
         action_str = None
@@ -351,19 +365,21 @@ What is the next action to achieve the goal? Output a single action in a code bl
         for attempt in range(self.max_retry):
             try:
                 # Call LLM
-                llm_response = self.chat_model(messages)
-
-                # Extract action from code block
-                action_str = parse_code_snippet(llm_response)
-
-                if action_str is None:
-                    # No code block found, try to extract directly
-                    # Look for action patterns
-                    for line in llm_response.split('\n'):
-                        line = line.strip()
-                        if validate_action(line):
-                            action_str = line
-                            break
+                with span("agent.llm", attempt=attempt + 1, n_messages=len(messages)):
+                    llm_response = self.chat_model(messages)
+
+                with span("agent.parse", attempt=attempt + 1):
+                    # Extract action from code block
+                    action_str = parse_code_snippet(llm_response)
+
+                    if action_str is None:
+                        # No code block found, try to extract directly
+                        # Look for action patterns
+                        for line in llm_response.split('\n'):
+                            line = line.strip()
+                            if validate_action(line):
+                                action_str = line
+                                break
 
                 if action_str and validate_action(action_str):
                     # Success!
@@ -403,9 +419,15 @@ What is the next action to achieve the goal? Output a single action in a code bl
             "action": action_str,
             "n_attempts": attempt + 1,
             "parsing_error": parsing_error,
-            "messages": messages,
         }
 
+        # Repeated prompt blocks are stored once per study; keep references only
+        store = store_from_env()
+        if store is not None:
+            agent_info["message_refs"] = store.refs(messages)
+        else:
+            agent_info["messages"] = messages
+
         # Add thinking if enabled
         if self.use_thinking and llm_response:
             # Extract thinking from response (before code block)
@@ -5,9 +5,6 @@ Acidwave Agent - Custom Web Agent for Music Player Tasks
 Specialized agents for Acidwave music player with custom prompting strategies.
 """
 
-# CRITICAL: Import benchmark to ensure tasks are registered in Ray workers
-import benchmark.acidwave
-
 from agentlab.agents.generic_agent import GenericAgentArgs, AGENT_4o, AGENT_4o_MINI
 from copy import deepcopy
 
@@ -1,9 +1,20 @@
 """
 Benchmark package for Acidwave tasks.
 
-Importing this module registers all Acidwave tasks so AgentLab and BrowserGym
-can discover them when creating environments (mirrors WebArena's registration
-pattern).
+Importing this package is cheap: tasks are registered on first lookup
+(benchmark/registration.py), and the Acidwave exports below are imported on
+first attribute access, so a worker that only runs MyDrive episodes never
+loads the Acidwave task or benchmark modules.
 """
 
-from .acidwave import *  # noqa: F401,F403
+import importlib
+
+_LAZY_EXPORTS = ("AcidwaveTask", "AcidwaveBenchmark", "ALL_ACIDWAVE_TASK_IDS")
+
+__all__ = list(_LAZY_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        return getattr(importlib.import_module(".acidwave", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,45 +2,27 @@
 Acidwave Benchmark Package
 ===========================
 
-Registers all Acidwave tasks with BrowserGym.
-
-Import this module to automatically register all tasks:
-    >>> from benchmark.acidwave import AcidwaveBenchmark
-    >>> # All tasks are now registered with Gymnasium
+Acidwave tasks are registered with BrowserGym lazily, by
+``benchmark.registration``, the first time an ``acidwave.*`` id is looked up
+(patch_agentlab installs the lookup hook). Importing this package registers
+nothing; to register explicitly:
+    >>> from benchmark.registration import register_namespace
+    >>> register_namespace("acidwave")
+
+``AcidwaveTask`` (playwright, BrowserGym) and ``AcidwaveBenchmark`` (pandas,
+AgentLab) are imported on first access.
 """
 
-import json
-from pathlib import Path
-from browsergym.core.registration import register_task
-from .task import AcidwaveTask
-from .benchmark import AcidwaveBenchmark
-
-# Load all task IDs from test.raw.json
-_task_file = Path(__file__).parent / "test.raw.json"
-with open(_task_file, 'r', encoding='utf-8') as f:
-    _all_tasks = json.load(f)
-
-ALL_ACIDWAVE_TASK_IDS = []
+import importlib
 
-# Register each task as a Gymnasium environment
-for task_config in _all_tasks:
-    task_id = task_config["task_id"]
-    gym_id = f"acidwave.task_{task_id}"
+from ..registration import task_names
 
-    # Register with BrowserGym
-    # Note: Only pass task_id as frozen parameter
-    # start_url and goal will be passed at environment creation time
-    register_task(
-        gym_id,
-        AcidwaveTask,
-        task_kwargs={
-            "task_id": task_id,
-        },
-    )
+ALL_ACIDWAVE_TASK_IDS = task_names("acidwave")
 
-    ALL_ACIDWAVE_TASK_IDS.append(gym_id)
-
-print(f"[OK] Registered {len(ALL_ACIDWAVE_TASK_IDS)} Acidwave tasks: {ALL_ACIDWAVE_TASK_IDS[:3]}...")
+_LAZY_EXPORTS = {
+    "AcidwaveTask": ".task",
+    "AcidwaveBenchmark": ".benchmark",
+}
 
 # Export public API
 __all__ = [
@@ -48,3 +30,11 @@ __all__ = [
     "AcidwaveBenchmark",
     "ALL_ACIDWAVE_TASK_IDS",
 ]
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -12,7 +12,6 @@ import json
 from pathlib import Path
 from typing import Iterable, List, Optional
 
-import pandas as pd
 from browsergym.experiments.benchmark.base import Benchmark, HighLevelActionSetArgs
 
 from agentlab.experiments.loop import EnvArgs
@@ -27,7 +26,7 @@ class AcidwaveBenchmark(Benchmark):
         difficulty: Optional[str] = None,
         max_steps: int = 30,
         headless: bool = True,
-        slow_mo: int = 100,
+        slow_mo: Optional[int] = None,
     ) -> None:
         # Load tasks from JSON (mirrors WebArena's evaluate loader)
         task_file = Path(__file__).parent / "test.raw.json"
@@ -75,6 +74,8 @@ class AcidwaveBenchmark(Benchmark):
             )
             env_args_list.append(env_args)
 
+        import pandas as pd  # only needed here; keeps pandas out of episode workers
+
         # Minimal metadata for dependency graph helper (no dependencies column -> assumes none)
         task_metadata = pd.DataFrame(
             [
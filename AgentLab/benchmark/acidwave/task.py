@@ -8,62 +8,20 @@ Based on BrowserGym's AbstractBrowserTask.
 
 import json
 import logging
-import os
 from pathlib import Path
 from typing import Optional
 import playwright.sync_api
 
 from browsergym.core.task import AbstractBrowserTask
 
-logger = logging.getLogger(__name__)
-
-
-# CRITICAL: Auto-register all Acidwave tasks when this module is imported
-# This ensures tasks are available even in Ray workers
-def _ensure_tasks_registered():
-    """Ensure all Acidwave tasks are registered with Gymnasium."""
-    try:
-        import gymnasium as gym
-        from browsergym.core.registration import register_task
-        
-        # Check if tasks are already registered
-        registry = gym.envs.registry
-        acidwave_tasks = [env_id for env_id in registry if 'acidwave' in env_id]
-        
-        if acidwave_tasks:
-            # Tasks already registered
-            #logger.debug(f"[task.py] Acidwave tasks already registered ({len(acidwave_tasks)} tasks)")
-            return
-        
-        # Load and register all tasks
-        task_file = Path(__file__).parent / "test.raw.json"
-        with open(task_file, 'r', encoding='utf-8') as f:
-            all_tasks = json.load(f)
-        
-        for task_config in all_tasks:
-            task_id = task_config["task_id"]
-            gym_id = f"acidwave.task_{task_id}"
-            
-            # Register with BrowserGym (will be idempotent due to Gymnasium)
-            try:
-                register_task(
-                    gym_id,
-                    "benchmark.acidwave.task:AcidwaveTask",  # Use string to avoid circular import
-                    task_kwargs={
-                        "task_id": task_id,
-                    },
-                )
-            except Exception:
-                pass  # Task might already be registered
-        
-        #print(f"[task.py] Registered {len(all_tasks)} Acidwave tasks in PID {os.getpid()}")
-        
-    except Exception as e:
-        logger.warning(f"[task.py] Failed to auto-register tasks: {e}")
-
+from ..browser_state import BrowserStateManager
+from ..env_pool import no_reset, pool_from_env, rebase_url
+from ..pacing import ReadinessWaiter, get_profile
+from ..replay import ReplayHarness
+from ..routing import RouteInterceptor, get_route_policy
+from ..tracing import span, traced
 
-# Auto-register tasks on module import
-_ensure_tasks_registered()
+logger = logging.getLogger(__name__)
 
 
 class AcidwaveTask(AbstractBrowserTask):
@@ -102,11 +60,6 @@ class AcidwaveTask(AbstractBrowserTask):
         self.start_url = start_url
         self._goal = goal
 
-        # Browser configuration
-        self.viewport = {"width": 1280, "height": 720}
-        self.slow_mo = 100  # ms - slower for UI interactions
-        self.timeout = 10000  # ms
-
         # Load task configuration from test.raw.json
         task_file = Path(__file__).parent / "test.raw.json"
         with open(task_file, 'r', encoding='utf-8') as f:
@@ -126,8 +79,31 @@ class AcidwaveTask(AbstractBrowserTask):
         if self._goal is None:
             self._goal = self.config["intent"]
 
+        # Readiness-based pacing replaces a fixed per-operation slow_mo
+        site = (self.config.get("sites") or ["acidwave"])[0]
+        self.pacing = get_profile(site, self.config.get("pacing"))
+        # Media/font stubbing and a shared JS/CSS cache for headless runs
+        self.router = RouteInterceptor(get_route_policy(site, self.config.get("routing")))
+        # Optional record/replay of backend traffic (ACIDWAVE_REPLAY=record|replay)
+        self.replay = ReplayHarness.from_config(
+            site,
+            self.config.get("replay"),
+            skip_types=self.router.policy.block + self.router.policy.stub,
+            scope=f"task_{task_id}",
+        )
+        # In-browser state reset/login instead of restarting the app
+        self.browser_state = BrowserStateManager(site, reset_hooks=self.config.get("reset_hooks"))
+        # Instance leased from the registry's pool (ACIDWAVE_ENV_POOL)
+        self.lease = None
+
+        # Browser configuration
+        self.viewport = {"width": 1280, "height": 720}
+        self.slow_mo = self.pacing.slow_mo  # ms
+        self.timeout = 10000  # ms
+
         logger.info(f"Initialized Acidwave task {task_id}: {self._goal[:60]}...")
 
+    @traced("task.setup")
     def setup(self, page: playwright.sync_api.Page) -> tuple[str, dict]:
         """
         Set up the task environment.
@@ -141,22 +117,53 @@ class AcidwaveTask(AbstractBrowserTask):
         Returns:
             Tuple of (goal string, info dict)
         """
+        # One episode per instance: lease one when the runner spread the study over several
+        pool = pool_from_env()
+        if pool is not None:
+            self.lease = pool.acquire(reset_fn=no_reset)
+            if self.lease is None:
+                raise RuntimeError("No Acidwave instance could be leased from the pool")
+            self.start_url = rebase_url(self.start_url, self.lease.url)
+            logger.info(f"Using instance {self.lease.name} (waited {self.lease.wait_s:.2f}s)")
+
+        # Intercept requests before the first navigation; replay is installed
+        # last so it answers before the asset cache does
+        self.router.install(page.context)
+        self.replay.start_episode()
+        self.replay.install(page.context)
+
+        # Baseline/auth state goes in before any app code runs
+        with span("task.setup.state"):
+            self.browser_state.apply(
+                page,
+                require_reset=self.config.get("require_reset", True),
+                require_login=self.config.get("require_login", False),
+            )
+
         # Navigate to Acidwave
         logger.info(f"Navigating to {self.start_url}")
-        page.goto(self.start_url, wait_until="domcontentloaded")
-
-        # Wait for app to load (look for navigation elements)
-        try:
-            page.wait_for_selector('[role="button"]', timeout=5000)
+        with span("task.setup.goto"):
+            page.goto(self.start_url, wait_until="domcontentloaded")
+            self.browser_state.after_load(page)
+
+        # Wait for app readiness (ready selectors, network idle, DOM quiescence)
+        waiter = ReadinessWaiter(self.pacing)
+        with span("task.setup.ready"):
+            ready = waiter.wait_until_ready(page, self.config.get("ready_selectors", ()))
+        if ready:
             logger.info("Acidwave app loaded successfully")
-        except Exception as e:
-            logger.warning(f"Acidwave may not have loaded properly: {e}")
+        else:
+            logger.warning("Acidwave may not have loaded properly (readiness budget exhausted)")
 
         # Return goal and metadata
         return self._goal, {
             "task_id": self.task_id,
             "difficulty": self.config.get("difficulty", "unknown"),
             "start_url": self.start_url,
+            "pacing": waiter.summary(),
+            "routing": self.router.summary(),
+            "replay": self.replay.summary(),
+            "state": self.browser_state.report,
         }
 
     def teardown(self) -> None:
@@ -166,8 +173,16 @@ class AcidwaveTask(AbstractBrowserTask):
         For Acidwave, no special cleanup is needed since each task
         starts fresh from the homepage.
         """
+        logger.info(f"Task {self.task_id} routing: {self.router.summary()}")
+        if self.lease is not None:
+            pool_from_env().release(self.lease)
+            self.lease = None
+        if self.replay.enabled:
+            self.replay.finish(f"task_{self.task_id}")
+            logger.info(f"Task {self.task_id} replay: {self.replay.summary()}")
         logger.info(f"Task {self.task_id} teardown complete")
 
+    @traced("task.validate")
     def validate(
         self,
         page: playwright.sync_api.Page,
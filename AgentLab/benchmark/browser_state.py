@@ -0,0 +1,313 @@
+"""
+Browser State Manager
+=====================
+
+Cheap, in-browser app state control for task setup.
+
+Client-side app state (liked songs, playlists, auth tokens) lives in cookies,
+localStorage and IndexedDB. Instead of restarting containers to get a clean
+app, tasks snapshot and restore that state directly:
+
+- ``snapshot(page)`` captures cookies plus localStorage and IndexedDB of the
+  page's origin, in Playwright ``storage_state`` format extended with an
+  ``indexedDB`` list per origin.
+- ``apply(page, ...)`` runs before the first navigation. It loads cookies and
+  installs an init script that seeds localStorage before any app code runs.
+- ``after_load(page)`` restores IndexedDB (which is async, so it needs a
+  loaded origin), runs the site's reset hooks and reloads only if needed.
+
+States live in ``ACIDWAVE_STATE_DIR`` (default ``AgentLab/browser_states``):
+
+- ``<site>_baseline.json``: restored when a task has ``require_reset``.
+  ``acidwave_baseline.json`` ships empty (the app's first-visit state);
+- ``<site>_auth.json``: injected when a task has ``require_login``.
+
+A task that requires a state that was never saved fails in setup instead of
+silently running from whatever the context holds. Record states with:
+
+    python -m benchmark.browser_state record acidwave auth --url http://localhost:5173
+    python -m benchmark.browser_state record acidwave baseline --empty
+
+Tasks with ``require_reset: false`` skip the reset entirely.
+
+Example:
+    >>> manager = BrowserStateManager("acidwave", reset_hooks=task_config.get("reset_hooks"))
+    >>> manager.apply(page, require_reset=True, require_login=False)
+    >>> page.goto(start_url)
+    >>> manager.after_load(page)
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import time
+import urllib.request
+from pathlib import Path
+from typing import List, Optional
+from urllib.parse import urljoin, urlsplit
+
+import playwright.sync_api
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_DIR = Path(__file__).parent.parent / "browser_states"
+
+_DUMP_STORAGE_JS = """
+async () => {
+    const req = (r) => new Promise((resolve, reject) => {
+        r.onsuccess = () => resolve(r.result);
+        r.onerror = () => reject(r.error);
+    });
+    const localStorageItems = Object.entries(window.localStorage).map(([name, value]) => ({name, value}));
+    const databases = [];
+    const infos = indexedDB.databases ? await indexedDB.databases() : [];
+    for (const info of infos) {
+        const db = await req(indexedDB.open(info.name));
+        const stores = [];
+        for (const name of Array.from(db.objectStoreNames)) {
+            const store = db.transaction(name, "readonly").objectStore(name);
+            const [keys, values] = await Promise.all([req(store.getAllKeys()), req(store.getAll())]);
+            stores.push({
+                name,
+                keyPath: store.keyPath,
+                autoIncrement: store.autoIncrement,
+                records: keys.map((key, i) => ({key, value: values[i]})),
+            });
+        }
+        databases.push({name: db.name, version: db.version, stores});
+        db.close();
+    }
+    return {origin: location.origin, localStorage: localStorageItems, indexedDB: databases};
+}
+"""
+
+_RESTORE_INDEXEDDB_JS = """
+async (databases) => {
+    const req = (r) => new Promise((resolve, reject) => {
+        r.onsuccess = () => resolve(r.result);
+        r.onerror = () => reject(r.error);
+        r.onblocked = () => resolve(null);
+    });
+    const existing = indexedDB.databases ? await indexedDB.databases() : [];
+    for (const info of existing) {
+        await req(indexedDB.deleteDatabase(info.name));
+    }
+    for (const spec of databases) {
+        const open = indexedDB.open(spec.name, spec.version);
+        open.onupgradeneeded = () => {
+            for (const s of spec.stores) {
+                open.result.createObjectStore(s.name, {keyPath: s.keyPath, autoIncrement: s.autoIncrement});
+            }
+        };
+        const db = await req(open);
+        for (const s of spec.stores) {
+            const store = db.transaction(s.name, "readwrite").objectStore(s.name);
+            for (const r of s.records) {
+                await req(s.keyPath === null ? store.put(r.value, r.key) : store.put(r.value));
+            }
+        }
+        db.close();
+    }
+    return databases.length;
+}
+"""
+
+# Seeds localStorage before app code runs; once per tab so in-episode changes survive reloads
+_SEED_LOCAL_STORAGE_JS = """
+(() => {
+    const seeds = %s;
+    const items = seeds[location.origin];
+    if (!items || sessionStorage.getItem("__agentlab_state_seeded")) return;
+    localStorage.clear();
+    for (const {name, value} of items) localStorage.setItem(name, value);
+    sessionStorage.setItem("__agentlab_state_seeded", "1");
+})();
+"""
+
+
+EMPTY_STATE = {"cookies": [], "origins": []}
+
+
+def _state_dir() -> Path:
+    return Path(os.environ.get("ACIDWAVE_STATE_DIR", DEFAULT_STATE_DIR))
+
+
+class MissingStateError(FileNotFoundError):
+    """A task requires a saved browser state that does not exist."""
+
+
+class BrowserStateManager:
+    """
+    Snapshot/restore client-side app state and run app reset hooks.
+
+    Args:
+        site: Site name; selects ``<site>_baseline.json`` / ``<site>_auth.json``
+        reset_hooks: Extra reset steps, each ``{"js": "<expression>"}`` evaluated
+            in the page or ``{"http": "/path", "method": "POST"}`` sent to the app origin
+        state_dir: Directory holding saved states
+    """
+
+    def __init__(self, site: str, reset_hooks: Optional[List[dict]] = None, state_dir: Optional[Path] = None) -> None:
+        self.site = site
+        self.reset_hooks = list(reset_hooks or [])
+        self.state_dir = Path(state_dir) if state_dir else _state_dir()
+        self._pending_indexeddb: dict = {}
+        self._run_hooks = False
+        self.report: dict = {}
+
+    # ---------------------------------------------------------------- storage
+
+    def require_state(self, name: str) -> dict:
+        state = self.load_state(name)
+        if state is None:
+            raise MissingStateError(
+                f"[state:{self.site}] Task requires {self.state_dir / f'{self.site}_{name}.json'}; record it with "
+                f"'python -m benchmark.browser_state record {self.site} {name} --url <app url>'"
+            )
+        return state
+
+    def load_state(self, name: str) -> Optional[dict]:
+        path = self.state_dir / f"{self.site}_{name}.json"
+        if not path.exists():
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def snapshot(self, page: playwright.sync_api.Page) -> dict:
+        """Capture cookies, localStorage and IndexedDB of the page's origin."""
+        origin_state = page.evaluate(_DUMP_STORAGE_JS)
+        return {"cookies": page.context.cookies(), "origins": [origin_state]}
+
+    def save_state(self, page: Optional[playwright.sync_api.Page], name: str) -> Path:
+        """Snapshot the page (or an empty state if ``page`` is None) and store it as ``<site>_<name>.json``."""
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        path = self.state_dir / f"{self.site}_{name}.json"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(page) if page is not None else EMPTY_STATE, f, indent=2)
+        logger.info(f"[state:{self.site}] Saved {name} state to {path}")
+        return path
+
+    # ------------------------------------------------------------------ setup
+
+    def apply(self, page: playwright.sync_api.Page, require_reset: bool = True, require_login: bool = False) -> dict:
+        """
+        Prepare the context before the first navigation.
+
+        Args:
+            page: Page whose context receives the state
+            require_reset: Restore the baseline state and run reset hooks
+            require_login: Inject the saved authenticated state
+
+        Returns:
+            Report dict (also kept in ``self.report``)
+
+        Raises:
+            MissingStateError: A required state was never saved
+        """
+        start = time.monotonic()
+        states = []
+        if require_reset:
+            states.append(self.require_state("baseline"))
+        if require_login:
+            states.append(self.require_state("auth"))
+
+        cookies = []
+        seeds = {}
+        for state in states:
+            cookies.extend(state.get("cookies", []))
+            for origin in state.get("origins", []):
+                seeds.setdefault(origin["origin"], []).extend(origin.get("localStorage", []))
+                if origin.get("indexedDB"):
+                    self._pending_indexeddb[origin["origin"]] = origin["indexedDB"]
+
+        context = page.context
+        if require_reset:
+            context.clear_cookies()
+        if cookies:
+            context.add_cookies(cookies)
+        if seeds:
+            context.add_init_script(_SEED_LOCAL_STORAGE_JS % json.dumps(seeds))
+        self._run_hooks = require_reset and bool(self.reset_hooks)
+
+        self.report = {
+            "reset": require_reset,
+            "login": require_login,
+            "cookies": len(cookies),
+            "local_storage_items": sum(len(v) for v in seeds.values()),
+            "apply_ms": round((time.monotonic() - start) * 1000, 1),
+        }
+        return self.report
+
+    def after_load(self, page: playwright.sync_api.Page) -> dict:
+        """Restore IndexedDB and run reset hooks once the app origin is loaded."""
+        start = time.monotonic()
+        reload_needed = False
+
+        origin = "{0.scheme}://{0.netloc}".format(urlsplit(page.url))
+        databases = self._pending_indexeddb.pop(origin, None)
+        if databases:
+            restored = page.evaluate(_RESTORE_INDEXEDDB_JS, databases)
+            self.report["indexeddb_databases"] = restored
+            reload_needed = True
+
+        if self._run_hooks:
+            for hook in self.reset_hooks:
+                try:
+                    if "js" in hook:
+                        page.evaluate(hook["js"])
+                    elif "http" in hook:
+                        req = urllib.request.Request(urljoin(page.url, hook["http"]), method=hook.get("method", "POST"))
+                        with urllib.request.urlopen(req, timeout=10):
+                            pass
+                    reload_needed = reload_needed or hook.get("reload", False)
+                except Exception as e:
+                    logger.warning(f"[state:{self.site}] Reset hook {hook} failed: {e}")
+            self.report["hooks"] = len(self.reset_hooks)
+
+        if reload_needed:
+            page.reload(wait_until="domcontentloaded")
+        self.report["after_load_ms"] = round((time.monotonic() - start) * 1000, 1)
+        return self.report
+
+
+def record(site: str, name: str, url: Optional[str] = None, empty: bool = False,
+           state_dir: Optional[Path] = None) -> Path:
+    """
+    Save a state from a headed browser: the page opens at ``url``, you set
+    the app up (e.g. log in), then press Enter in the terminal.
+    """
+    manager = BrowserStateManager(site, state_dir=state_dir)
+    if empty:
+        return manager.save_state(None, name)
+    if not url:
+        raise ValueError("--url is required unless --empty is given")
+    with playwright.sync_api.sync_playwright() as p:
+        browser = p.chromium.launch(headless=False)
+        page = browser.new_context().new_page()
+        page.goto(url)
+        input(f"Set up the {name} state in the browser, then press Enter to save it... ")
+        path = manager.save_state(page, name)
+        browser.close()
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record browser states for task setup")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rec = sub.add_parser("record", help="Save <site>_<name>.json from a headed browser")
+    rec.add_argument("site", help="Site name, e.g. acidwave")
+    rec.add_argument("name", help="State name: baseline or auth")
+    rec.add_argument("--url", help="App URL to open")
+    rec.add_argument("--empty", action="store_true", help="Save an empty state (first-visit baseline)")
+    rec.add_argument("--state-dir", type=Path, help="Output directory (default: ACIDWAVE_STATE_DIR)")
+    args = parser.parse_args()
+
+    path = record(args.site, args.name, url=args.url, empty=args.empty, state_dir=args.state_dir)
+    print(f"✅ Saved {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""
+Token Budget
+============
+
+Per-step token accounting and a study-wide spend cap.
+
+Recording (once ``install()`` ran, which patch_agentlab does):
+
+- every chat completion made while an agent picks an action is read from
+  the API response (OpenAI, and Anthropic when installed): prompt tokens,
+  the cached part of them, and completion tokens;
+- the step's stats get ``input_tokens``, ``cached_input_tokens``,
+  ``output_tokens`` and ``cost``, so every ``summary_info.json`` carries the
+  episode totals as ``stats.cum_*``; ``agent_info`` gets the same numbers
+  under ``usage`` (``extra_info["usage"]`` for AgentLab's ``AgentInfo``);
+- cost uses ``PRICES`` (cached prompt tokens at the cached rate) and falls
+  back to the agent's own cost tracker for models without a price.
+
+Budget (when ``ACIDWAVE_BUDGET`` names a budget directory):
+
+- every step appends one line to ``<dir>/usage.jsonl``. ``O_APPEND`` writes
+  of one short line do not interleave, so all workers on the machine share
+  one live ledger without locks; each process only reads the lines added
+  since it last looked;
+- before an episode starts, the totals are compared with the caps in
+  ``<dir>/budget.json``. Once a cap is reached, new episodes return without
+  running. They have no ``summary_info.json``, so ``--resume`` runs them
+  later. AgentLab relaunches such episodes, so ``skipped`` counts distinct
+  episodes, not skip events. Episodes already running finish, so a study overshoots by at most
+  ``n_jobs`` episodes.
+
+The runners create the directory inside the study and export
+``ACIDWAVE_BUDGET`` (patch_agentlab forwards ``ACIDWAVE_*`` variables to Ray
+workers).
+
+Example:
+    >>> budget = Budget.create(study.dir / "budget", max_cost=20.0, max_tokens=5_000_000)
+    >>> os.environ[BUDGET_ENV] = str(budget.budget_dir)
+    >>> study.run(n_jobs=4)
+    >>> budget.totals()
+    {'input_tokens': 812345, 'cached_input_tokens': 401280, 'output_tokens': 20311, 'cost': 1.69, ...}
+"""
+
+import functools
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BUDGET_ENV = "ACIDWAVE_BUDGET"
+
+# USD per million tokens: (prompt, cached prompt, completion); longest prefix wins
+PRICES = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+}
+
+USAGE_KEYS = ("input_tokens", "cached_input_tokens", "output_tokens", "cost")
+
+
+def price(model: Optional[str], input_tokens: int, cached_input_tokens: int, output_tokens: int) -> Optional[float]:
+    """Cost in USD of one call, or None if the model has no price."""
+    if not model:
+        return None
+    model = model.split("/")[-1]
+    for prefix in sorted(PRICES, key=len, reverse=True):
+        if model.startswith(prefix):
+            prompt, cached, completion = PRICES[prefix]
+            uncached = max(0, input_tokens - cached_input_tokens)
+            return (uncached * prompt + cached_input_tokens * cached + output_tokens * completion) / 1e6
+    return None
+
+
+@dataclass
+class Usage:
+    """Tokens and cost of the LLM calls of one step."""
+
+    input_tokens: int = 0
+    cached_input_tokens: int = 0
+    output_tokens: int = 0
+    cost: float = 0.0
+    calls: int = 0
+    # Calls of models missing from PRICES
+    unpriced: int = 0
+
+    def add_call(self, model: Optional[str], input_tokens: int, cached_input_tokens: int, output_tokens: int) -> None:
+        self.calls += 1
+        self.input_tokens += input_tokens
+        self.cached_input_tokens += cached_input_tokens
+        self.output_tokens += output_tokens
+        cost = price(model, input_tokens, cached_input_tokens, output_tokens)
+        if cost is None:
+            self.unpriced += 1
+        else:
+            self.cost += cost
+
+
+# ------------------------------------------------------------------ recording
+
+_step_usage: Optional[Usage] = None
+# Episode running in this process, for ledger lines
+_current_exp = ""
+
+
+def _openai_usage(response) -> Optional[Tuple[int, int, int]]:
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return None
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) or 0
+    return usage.prompt_tokens or 0, cached, usage.completion_tokens or 0
+
+
+def _anthropic_usage(response) -> Optional[Tuple[int, int, int]]:
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return None
+    # Anthropic counts cache reads and writes apart from input_tokens
+    cached = getattr(usage, "cache_read_input_tokens", None) or 0
+    written = getattr(usage, "cache_creation_input_tokens", None) or 0
+    return (usage.input_tokens or 0) + cached + written, cached, usage.output_tokens or 0
+
+
+def _wrap_create(cls, read) -> bool:
+    """Count the usage of every ``cls.create`` response made during a step."""
+    original = cls.create
+    if getattr(original, "_acidwave_usage", False):
+        return False
+
+    @functools.wraps(original)
+    def create(self, *args, **kwargs):
+        response = original(self, *args, **kwargs)
+        if _step_usage is not None:
+            counts = read(response)
+            if counts is not None:
+                _step_usage.add_call(getattr(response, "model", None) or kwargs.get("model"), *counts)
+        return response
+
+    create._acidwave_usage = True
+    cls.create = create
+    return True
+
+
+def _attach(agent_info, usage: dict) -> None:
+    if isinstance(agent_info, dict):
+        agent_info["usage"] = usage
+    elif agent_info is not None:
+        extra = getattr(agent_info, "extra_info", None) or {}
+        extra["usage"] = usage
+        agent_info.extra_info = extra
+
+
+def _record_step(step_info, usage: Usage, exp_name: str) -> None:
+    stats = getattr(step_info, "stats", None)
+    if stats is None:
+        stats = step_info.stats = {}
+    if usage.calls:
+        stats["input_tokens"] = usage.input_tokens
+        stats["cached_input_tokens"] = usage.cached_input_tokens
+        stats["output_tokens"] = usage.output_tokens
+        # Unpriced models: keep the agent's cost tracker figure
+        if not usage.unpriced:
+            stats["cost"] = usage.cost
+    step_usage = {key: stats.get(key, 0) for key in USAGE_KEYS}
+    _attach(getattr(step_info, "agent_info", None), step_usage)
+
+    budget = budget_from_env()
+    if budget is not None and (usage.calls or step_usage["cost"]):
+        budget.record(exp_name, step_usage)
+
+
+# --------------------------------------------------------------------- budget
+
+class Budget:
+    """
+    Directory-backed usage ledger with optional caps.
+
+    Args:
+        budget_dir: Directory holding ``budget.json`` and ``usage.jsonl``
+    """
+
+    def __init__(self, budget_dir: Path) -> None:
+        self.budget_dir = Path(budget_dir)
+        with open(self.budget_dir / "budget.json", "r", encoding="utf-8") as f:
+            self.caps = json.load(f)
+        self._offset = 0
+        self._totals = {key: 0 for key in USAGE_KEYS}
+        self._totals["steps"] = 0
+        # Relaunches skip the same episode again; count each one once
+        self._skipped = set()
+
+    @classmethod
+    def create(cls, budget_dir: Path, max_cost: Optional[float] = None,
+               max_tokens: Optional[int] = None) -> "Budget":
+        """Start an empty ledger; a cap of None is unlimited."""
+        budget_dir = Path(budget_dir)
+        budget_dir.mkdir(parents=True, exist_ok=True)
+        with open(budget_dir / "budget.json", "w", encoding="utf-8") as f:
+            json.dump({"max_cost": max_cost, "max_tokens": max_tokens}, f, indent=2)
+        (budget_dir / "usage.jsonl").unlink(missing_ok=True)
+        return cls(budget_dir)
+
+    def _append(self, event: dict) -> None:
+        line = json.dumps({**event, "t": time.time(), "pid": os.getpid()}) + "\n"
+        fd = os.open(self.budget_dir / "usage.jsonl", os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, line.encode("utf-8"))
+        finally:
+            os.close(fd)
+
+    def record(self, exp_name: str, usage: dict) -> None:
+        """Add one step's usage to the shared ledger."""
+        self._append({"event": "step", "exp": exp_name, **usage})
+
+    def skip(self, exp_name: str) -> None:
+        self._append({"event": "skip", "exp": exp_name})
+
+    def totals(self) -> dict:
+        """Study-wide totals so far, plus ``tokens``, ``steps`` and ``skipped`` episodes."""
+        path = self.budget_dir / "usage.jsonl"
+        if path.exists():
+            with open(path, "rb") as f:
+                f.seek(self._offset)
+                data = f.read()
+            # A line still being written is read next time
+            complete = data[:data.rfind(b"\n") + 1]
+            self._offset += len(complete)
+            for line in complete.splitlines():
+                event = json.loads(line)
+                if event["event"] == "skip":
+                    self._skipped.add(event["exp"])
+                    continue
+                self._totals["steps"] += 1
+                for key in USAGE_KEYS:
+                    self._totals[key] += event.get(key) or 0
+        totals = dict(self._totals, skipped=len(self._skipped))
+        totals["tokens"] = totals["input_tokens"] + totals["output_tokens"]
+        totals["cost"] = round(totals["cost"], 6)
+        return totals
+
+    def exceeded(self) -> Optional[str]:
+        """Why no new episode may start, or None while within budget."""
+        totals = self.totals()
+        max_cost, max_tokens = self.caps.get("max_cost"), self.caps.get("max_tokens")
+        if max_cost is not None and totals["cost"] >= max_cost:
+            return f"spend ${totals['cost']:.2f} reached the ${max_cost:.2f} cap"
+        if max_tokens is not None and totals["tokens"] >= max_tokens:
+            return f"{totals['tokens']} tokens reached the {max_tokens} cap"
+        return None
+
+
+_BUDGET: Optional[Budget] = None
+
+
+def budget_from_env() -> Optional[Budget]:
+    """The budget named by ``ACIDWAVE_BUDGET`` in this process, or None."""
+    global _BUDGET
+    budget_dir = os.environ.get(BUDGET_ENV)
+    if not budget_dir:
+        return None
+    if _BUDGET is None or _BUDGET.budget_dir != Path(budget_dir):
+        _BUDGET = Budget(Path(budget_dir))
+    return _BUDGET
+
+
+# -------------------------------------------------------------------- install
+
+_INSTALLED = False
+
+
+def install() -> bool:
+    """
+    Record per-step usage in AgentLab episodes and gate episode starts on the budget.
+
+    Returns:
+        True if AgentLab episodes are accounted
+    """
+    global _INSTALLED
+    if _INSTALLED:
+        return True
+    try:
+        from agentlab.experiments.loop import ExpArgs, StepInfo
+    except ImportError as e:
+        logger.debug(f"[budget] AgentLab not available: {e}")
+        return False
+
+    try:
+        from openai.resources.chat.completions import Completions
+        _wrap_create(Completions, _openai_usage)
+    except ImportError:
+        pass
+    try:
+        from anthropic.resources.messages import Messages
+        _wrap_create(Messages, _anthropic_usage)
+    except ImportError:
+        pass
+
+    _original_from_action = StepInfo.from_action
+    _original_run = ExpArgs.run
+
+    def from_action(self, agent, *args, **kwargs):
+        global _step_usage
+        previous, _step_usage = _step_usage, Usage()
+        try:
+            action = _original_from_action(self, agent, *args, **kwargs)
+            usage = _step_usage
+        finally:
+            _step_usage = previous
+        _record_step(self, usage, _current_exp)
+        return action
+
+    def run(self, *args, **kwargs):
+        global _current_exp
+        budget = budget_from_env()
+        if budget is not None:
+            reason = budget.exceeded()
+            if reason:
+                logger.warning(f"[budget] {reason}; not starting {self.exp_name}")
+                budget.skip(self.exp_name)
+                return None
+        _current_exp = self.exp_name
+        return _original_run(self, *args, **kwargs)
+
+    StepInfo.from_action = from_action
+    ExpArgs.run = run
+    _INSTALLED = True
+    return True
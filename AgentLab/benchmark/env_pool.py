@@ -0,0 +1,283 @@
+"""
+Environment Standby Pool
+========================
+
+Keeps several backend instances (or tenants) pre-reset so episodes never wait
+for a reset.
+
+Without a pool, ``MyDriveTask.setup`` posts to ``/api/dev/reset`` and the
+worker idles until the database is rebuilt. With a pool:
+
+- each episode leases an instance that is already reset (``acquire``),
+- the instance is handed back dirty in ``teardown`` (``release``),
+- a background resetter in the runner process resets dirty instances while
+  other episodes run, then marks them ready again.
+
+Episodes run in separate worker processes, so the pool state lives in a
+directory: one ``<instance>.<state>`` file per instance, where the state is
+``ready``, ``leased``, ``dirty`` or ``resetting``. State changes are atomic
+``os.rename`` calls, so two workers can never lease the same instance.
+Acquire, reset and timeout events are appended to ``events.jsonl`` and
+summarized by ``metrics()`` (queue depth, wait times, reset times).
+
+The runner creates the pool and exports its directory as ``ACIDWAVE_ENV_POOL``
+(patch_agentlab forwards ``ACIDWAVE_*`` variables to Ray workers); tasks pick
+it up with ``pool_from_env()``. The same pool leases the instances of the
+environment registry (experiments/env_registry.py); sites without a backend
+reset use ``no_reset`` so an instance is only ever held by one episode.
+
+Example:
+    >>> pool = EnvPool.create(pool_dir, ["http://localhost:3000", "http://localhost:3001"])
+    >>> pool.start(reset_database)            # runner process
+    >>> lease = pool.acquire(reset_fn=reset_database)   # task setup
+    >>> pool.release(lease)                   # task teardown
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+POOL_ENV = "ACIDWAVE_ENV_POOL"
+
+STATES = ("ready", "leased", "dirty", "resetting")
+
+
+def rebase_url(url: str, base: str) -> str:
+    """Move ``url`` onto the scheme/host/port of ``base``, keeping its path and query."""
+    target = urlsplit(base)
+    parts = urlsplit(url)
+    return urlunsplit((target.scheme, target.netloc, parts.path or "/", parts.query, parts.fragment))
+
+
+def no_reset(url: str) -> bool:
+    """Reset function for sites whose instances need no reset between episodes (leasing only)."""
+    return True
+
+
+@dataclass
+class Lease:
+    """An instance handed to one episode."""
+
+    name: str
+    url: str
+    wait_s: float
+    # True when no ready instance was available and the episode reset one itself
+    synchronous: bool = False
+
+
+class EnvPool:
+    """
+    Directory-backed standby queue of backend instances.
+
+    Args:
+        pool_dir: Directory holding ``instances.json``, state files and ``events.jsonl``
+    """
+
+    def __init__(self, pool_dir: Path) -> None:
+        self.pool_dir = Path(pool_dir)
+        with open(self.pool_dir / "instances.json", "r", encoding="utf-8") as f:
+            self.instances: Dict[str, str] = json.load(f)
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @classmethod
+    def create(cls, pool_dir: Path, urls: List[str]) -> "EnvPool":
+        """Register instances; all start dirty so the first pass resets them."""
+        pool_dir = Path(pool_dir)
+        pool_dir.mkdir(parents=True, exist_ok=True)
+        instances = {f"env{i}": url for i, url in enumerate(urls)}
+        with open(pool_dir / "instances.json", "w", encoding="utf-8") as f:
+            json.dump(instances, f, indent=2)
+        for name in instances:
+            for state in STATES:
+                (pool_dir / f"{name}.{state}").unlink(missing_ok=True)
+            (pool_dir / f"{name}.dirty").touch()
+        return cls(pool_dir)
+
+    # ------------------------------------------------------------------ state
+
+    def _path(self, name: str, state: str) -> Path:
+        return self.pool_dir / f"{name}.{state}"
+
+    def _move(self, name: str, src: str, dst: str) -> bool:
+        """Atomically change an instance's state; False if another process got there first."""
+        try:
+            os.rename(self._path(name, src), self._path(name, dst))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _in_state(self, state: str) -> List[str]:
+        return sorted(p.stem for p in self.pool_dir.glob(f"*.{state}"))
+
+    def _event(self, kind: str, **fields) -> None:
+        line = json.dumps({"event": kind, "t": time.time(), "pid": os.getpid(), **fields}) + "\n"
+        # O_APPEND writes of one short line do not interleave across processes
+        fd = os.open(self.pool_dir / "events.jsonl", os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, line.encode("utf-8"))
+        finally:
+            os.close(fd)
+
+    def depth(self) -> Dict[str, int]:
+        """Number of instances in each state."""
+        return {state: len(self._in_state(state)) for state in STATES}
+
+    # ---------------------------------------------------------------- leasing
+
+    def acquire(self, timeout: float = 120.0, poll_s: float = 0.05,
+                reset_fn: Optional[Callable[[str], bool]] = None) -> Optional[Lease]:
+        """
+        Lease a ready instance, waiting up to ``timeout`` seconds.
+
+        Args:
+            timeout: Seconds to wait for a ready instance
+            poll_s: Polling interval while the queue is empty
+            reset_fn: If given and the wait times out, lease a dirty instance
+                and reset it synchronously instead of giving up
+
+        Returns:
+            Lease, or None if no instance could be leased
+        """
+        start = time.monotonic()
+        depth = len(self._in_state("ready"))
+        while True:
+            for name in self._in_state("ready"):
+                if self._move(name, "ready", "leased"):
+                    wait_s = time.monotonic() - start
+                    self._event("acquire", instance=name, wait_s=round(wait_s, 4), depth=depth)
+                    return Lease(name=name, url=self.instances[name], wait_s=wait_s)
+            if time.monotonic() - start >= timeout:
+                break
+            time.sleep(poll_s)
+
+        self._event("timeout", wait_s=round(time.monotonic() - start, 4))
+        if reset_fn is not None:
+            for name in self._in_state("dirty"):
+                if self._move(name, "dirty", "leased"):
+                    reset_fn(self.instances[name])
+                    wait_s = time.monotonic() - start
+                    self._event("acquire", instance=name, wait_s=round(wait_s, 4), depth=0, synchronous=True)
+                    return Lease(name=name, url=self.instances[name], wait_s=wait_s, synchronous=True)
+        logger.warning(f"[env_pool] No instance available after {timeout:.0f}s")
+        return None
+
+    def release(self, lease: Lease) -> None:
+        """Hand an instance back for a background reset."""
+        if not self._move(lease.name, "leased", "dirty"):
+            logger.warning(f"[env_pool] {lease.name} was not leased")
+        self._event("release", instance=lease.name)
+
+    # -------------------------------------------------------------- resetting
+
+    def _reset_one(self, name: str, reset_fn: Callable[[str], bool]) -> bool:
+        if not self._move(name, "dirty", "resetting"):
+            return False
+        start = time.monotonic()
+        try:
+            ok = bool(reset_fn(self.instances[name]))
+        except Exception as e:
+            logger.warning(f"[env_pool] Reset of {name} raised: {e}")
+            ok = False
+        reset_s = time.monotonic() - start
+        self._move(name, "resetting", "ready" if ok else "dirty")
+        self._event("reset", instance=name, reset_s=round(reset_s, 4), ok=ok)
+        return ok
+
+    def reset_pending(self, reset_fn: Callable[[str], bool], max_workers: int = 4) -> int:
+        """Reset every dirty instance concurrently; returns the number made ready."""
+        dirty = self._in_state("dirty")
+        if not dirty:
+            return 0
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(dirty))) as executor:
+            return sum(executor.map(lambda name: self._reset_one(name, reset_fn), dirty))
+
+    def start(self, reset_fn: Callable[[str], bool], interval_s: float = 0.2, max_workers: int = 4) -> None:
+        """Run ``reset_pending`` in a background thread until ``stop()``."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+
+        def _loop():
+            while not self._stop.is_set():
+                # Failed resets stay dirty; wait a full interval before retrying
+                self.reset_pending(reset_fn, max_workers)
+                self._stop.wait(interval_s)
+
+        self._thread = threading.Thread(target=_loop, name="env-pool-resetter", daemon=True)
+        self._thread.start()
+        logger.info(f"[env_pool] Background resetter started for {len(self.instances)} instances")
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def wait_ready(self, min_ready: int = 1, timeout: float = 300.0) -> bool:
+        """Block until at least ``min_ready`` instances are ready."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if len(self._in_state("ready")) >= min_ready:
+                return True
+            time.sleep(0.1)
+        return False
+
+    # ---------------------------------------------------------------- metrics
+
+    def metrics(self) -> dict:
+        """Queue depth now, plus wait/reset statistics from the event log."""
+        waits: List[float] = []
+        resets: List[float] = []
+        counts = {"timeouts": 0, "synchronous": 0, "failed_resets": 0}
+        events = self.pool_dir / "events.jsonl"
+        if events.exists():
+            with open(events, "r", encoding="utf-8") as f:
+                for line in f:
+                    event = json.loads(line)
+                    if event["event"] == "acquire":
+                        waits.append(event["wait_s"])
+                        counts["synchronous"] += bool(event.get("synchronous"))
+                    elif event["event"] == "reset":
+                        resets.append(event["reset_s"])
+                        counts["failed_resets"] += not event["ok"]
+                    elif event["event"] == "timeout":
+                        counts["timeouts"] += 1
+
+        def _stats(values: List[float]) -> dict:
+            if not values:
+                return {"n": 0}
+            ordered = sorted(values)
+            return {
+                "n": len(ordered),
+                "mean_s": round(sum(ordered) / len(ordered), 3),
+                "p95_s": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 3),
+                "max_s": round(ordered[-1], 3),
+            }
+
+        return {"depth": self.depth(), "wait": _stats(waits), "reset": _stats(resets), **counts}
+
+
+_POOL: Optional[EnvPool] = None
+
+
+def pool_from_env() -> Optional[EnvPool]:
+    """The pool named by ``ACIDWAVE_ENV_POOL`` in this process, or None."""
+    global _POOL
+    pool_dir = os.environ.get(POOL_ENV)
+    if not pool_dir:
+        return None
+    if _POOL is None or _POOL.pool_dir != Path(pool_dir):
+        _POOL = EnvPool(Path(pool_dir))
+    return _POOL
@@ -1,3 +1,17 @@
-from .task import MyDriveTask
+import importlib
 
 ALL_MYDRIVE_TASK_IDS = [0, 1]
+
+_LAZY_EXPORTS = {
+    "MyDriveTask": ".task",
+    "MyDriveBenchmark": ".benchmark",
+}
+
+
+def __getattr__(name):
+    # Deferred so importing the package does not load playwright, pandas or AgentLab
+    if name in _LAZY_EXPORTS:
+        value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,306 @@
+"""
+MyDrive API Client
+==================
+
+Typed, authenticated access to the MyDrive backend for state-based
+validation.
+
+Validators that scrape ``page.inner_text("body")`` depend on whichever view
+the agent ended on. ``MyDriveClient`` asks the backend directly instead:
+
+- Signs in per agent through the next-auth credentials flow
+  (``/api/auth/csrf`` then ``/api/auth/callback/credentials``) and keeps the
+  session cookie; a 401 triggers one re-login.
+- Reuses keep-alive HTTP connections from a small per-client pool.
+- Clients are cached per (origin, agent) via ``client_for``, so repeated
+  validations in one worker skip both the login and the TCP handshake.
+
+Example:
+    >>> client = client_for("http://localhost:3000/agent1-login", "agent1")
+    >>> client.resolve_path("folder3/file11.txt")
+    DriveItem(id='...', name='file11.txt', kind='file', path='folder3/file11.txt', ...)
+    >>> client.shares_for("shared_doc.txt")
+"""
+
+from __future__ import annotations
+
+import http.client
+import json
+import logging
+import os
+import queue
+import threading
+from dataclasses import dataclass
+from http.cookies import SimpleCookie
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlparse
+
+logger = logging.getLogger(__name__)
+
+# Credentials created by prisma/seed.ts
+AGENT_CREDENTIALS = {
+    "agent1": ("agent1@test.com", "password"),
+    "agent2": ("agent2@test.com", "password"),
+}
+
+# UI labels in the share dialog -> Prisma Permission enum
+PERMISSION_ALIASES = {
+    "viewer": "READ",
+    "read": "READ",
+    "commenter": "COMMENT",
+    "comment": "COMMENT",
+    "editor": "EDIT",
+    "edit": "EDIT",
+}
+
+
+def normalize_permission(value: str) -> str:
+    """Map 'Editor'/'edit'/'EDIT' style values to the backend enum."""
+    return PERMISSION_ALIASES.get(value.strip().lower(), value.strip().upper())
+
+
+class MyDriveAPIError(Exception):
+    """Raised when the MyDrive API answers with an unexpected status."""
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+
+
+@dataclass
+class DriveItem:
+    """A file or folder as seen by one agent."""
+
+    id: str
+    name: str
+    kind: str
+    path: str
+    parent_id: Optional[str] = None
+    owner_email: Optional[str] = None
+    size: Optional[int] = None
+    mime_type: Optional[str] = None
+
+
+class MyDriveClient:
+    """
+    Session-authenticated client for one MyDrive user.
+
+    Args:
+        base_url: Any URL on the MyDrive host (only scheme/host/port are used)
+        email: Login email
+        password: Login password
+        pool_size: Maximum idle keep-alive connections kept
+        timeout: Socket timeout in seconds
+    """
+
+    def __init__(self, base_url: str, email: str, password: str, pool_size: int = 4, timeout: float = 10.0) -> None:
+        parsed = urlparse(base_url)
+        self.scheme = parsed.scheme or "http"
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port
+        self.email = email
+        self.password = password
+        self.timeout = timeout
+        self.cookies: Dict[str, str] = {}
+        self._pool: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue(maxsize=pool_size)
+        self._auth_lock = threading.Lock()
+        self._authenticated = False
+
+    # ------------------------------------------------------------- transport
+
+    def _connection(self) -> http.client.HTTPConnection:
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            return cls(self.host, self.port, timeout=self.timeout)
+
+    def _release(self, conn: http.client.HTTPConnection) -> None:
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def _request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[dict] = None,
+        body: Optional[bytes] = None,
+        content_type: Optional[str] = None,
+    ) -> Tuple[int, bytes]:
+        if params:
+            path = f"{path}?{urlencode({k: v for k, v in params.items() if v is not None})}"
+        headers = {"Accept": "application/json"}
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        if content_type:
+            headers["Content-Type"] = content_type
+
+        # A pooled keep-alive connection may have been closed by the server; retry once
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+            except (http.client.HTTPException, ConnectionError, OSError):
+                conn.close()
+                if attempt:
+                    raise
+                continue
+            for header in response.headers.get_all("Set-Cookie") or []:
+                for name, morsel in SimpleCookie(header).items():
+                    self.cookies[name] = morsel.value
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(conn)
+            return response.status, data
+        raise MyDriveAPIError(0, f"{method} {path} failed")
+
+    # ------------------------------------------------------------------ auth
+
+    def login(self) -> None:
+        """Sign in through the next-auth credentials provider."""
+        self.cookies.clear()
+        status, data = self._request("GET", "/api/auth/csrf")
+        if status != 200:
+            raise MyDriveAPIError(status, "Could not fetch CSRF token")
+        csrf = json.loads(data)["csrfToken"]
+        form = urlencode({
+            "email": self.email,
+            "password": self.password,
+            "csrfToken": csrf,
+            "callbackUrl": "/",
+            "json": "true",
+        }).encode("utf-8")
+        status, _ = self._request(
+            "POST", "/api/auth/callback/credentials", body=form, content_type="application/x-www-form-urlencoded"
+        )
+        if not any("session-token" in name for name in self.cookies):
+            raise MyDriveAPIError(status, f"Login failed for {self.email}")
+        self._authenticated = True
+        logger.debug(f"[mydrive-api] Signed in as {self.email}")
+
+    def _get_json(self, path: str, params: Optional[dict] = None):
+        with self._auth_lock:
+            if not self._authenticated:
+                self.login()
+        status, data = self._request("GET", path, params)
+        if status == 401:
+            with self._auth_lock:
+                self.login()
+            status, data = self._request("GET", path, params)
+        if status != 200:
+            raise MyDriveAPIError(status, data.decode("utf-8", "replace")[:200])
+        return json.loads(data)
+
+    # ------------------------------------------------------------- endpoints
+
+    def list_folder(self, parent_id: Optional[str] = None) -> dict:
+        """Raw ``GET /api/folders`` body (root when ``parent_id`` is None)."""
+        return self._get_json("/api/folders", {"parentId": parent_id})
+
+    def search(self, q: str, parent_id: Optional[str] = None) -> List[DriveItem]:
+        """Name search over owned and shared items; ``path`` is the parent path."""
+        body = self._get_json("/api/search", {"q": q, "parentId": parent_id})
+        return [
+            DriveItem(
+                id=r["id"],
+                name=r["name"],
+                kind=r["kind"],
+                path=r.get("path", "/"),
+                parent_id=r.get("parentId", r.get("folderId")),
+                owner_email=(r.get("owner") or {}).get("email"),
+                size=r.get("size"),
+                mime_type=r.get("mimeType"),
+            )
+            for r in body.get("results", [])
+        ]
+
+    def shares(self) -> List[dict]:
+        """Shares created by this user (``file``/``folder``, ``sharedWithUser``, ``permission``)."""
+        return self._get_json("/api/shares")
+
+    def shared_with_me(self) -> List[dict]:
+        """Shares whose recipient is this user."""
+        return self._get_json("/api/shared-with-me")
+
+    def resolve_path(self, path: str) -> Optional[DriveItem]:
+        """
+        Look up a file or folder by its path from this user's root.
+
+        Args:
+            path: Slash-separated path such as ``"folder3/file11.txt"``
+                (``"."`` or ``""`` is the root)
+
+        Returns:
+            DriveItem, or None if any component does not exist
+        """
+        parts = [p for p in path.strip("/").split("/") if p and p != "."]
+        parent_id: Optional[str] = None
+        item: Optional[DriveItem] = None
+        walked: List[str] = []
+        for i, name in enumerate(parts):
+            listing = self.list_folder(parent_id)
+            walked.append(name)
+            last = i == len(parts) - 1
+            folder = next((f for f in listing.get("folders", []) if f["name"] == name), None)
+            if folder is not None:
+                item = DriveItem(
+                    id=folder["id"], name=name, kind="folder", path="/".join(walked),
+                    parent_id=parent_id, owner_email=(folder.get("owner") or {}).get("email"),
+                )
+                parent_id = folder["id"]
+                continue
+            file = next((f for f in listing.get("files", []) if f["name"] == name), None) if last else None
+            if file is None:
+                return None
+            item = DriveItem(
+                id=file["id"], name=name, kind="file", path="/".join(walked), parent_id=parent_id,
+                owner_email=(file.get("owner") or {}).get("email"), size=file.get("size"),
+                mime_type=file.get("mimeType"),
+            )
+        if not parts:
+            return DriveItem(id="", name="", kind="folder", path="")
+        return item
+
+    def shares_for(self, path: str) -> List[dict]:
+        """Shares this user created for the item at ``path``."""
+        item = self.resolve_path(path)
+        if item is None or not item.id:
+            return []
+        key = "file" if item.kind == "file" else "folder"
+        return [s for s in self.shares() if (s.get(key) or {}).get("id") == item.id]
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_CLIENTS: Dict[Tuple[str, str], MyDriveClient] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def agent_credentials(agent: str) -> Tuple[str, str]:
+    """Seeded credentials for an agent (override with MYDRIVE_<AGENT>_EMAIL/_PASSWORD)."""
+    email, password = AGENT_CREDENTIALS.get(agent, (f"{agent}@test.com", "password"))
+    prefix = f"MYDRIVE_{agent.upper()}"
+    return os.environ.get(f"{prefix}_EMAIL", email), os.environ.get(f"{prefix}_PASSWORD", password)
+
+
+def client_for(base_url: str, agent: str) -> MyDriveClient:
+    """Return the cached client for an agent on the MyDrive host of ``base_url``."""
+    parsed = urlparse(base_url)
+    key = (f"{parsed.scheme}://{parsed.netloc}", agent)
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            email, password = agent_credentials(agent)
+            client = MyDriveClient(key[0], email, password)
+            _CLIENTS[key] = client
+        return client
@@ -12,7 +12,6 @@ import os
 from pathlib import Path
 from typing import Iterable, List, Optional
 
-import pandas as pd
 from browsergym.experiments.benchmark.base import Benchmark, HighLevelActionSetArgs
 
 from agentlab.experiments.loop import EnvArgs
@@ -26,7 +25,7 @@ class MyDriveBenchmark(Benchmark):
         task_subset: Optional[Iterable[int]] = None,
         max_steps: int = 30,
         headless: bool = True,
-        slow_mo: int = 100,
+        slow_mo: Optional[int] = None,
         task_file: str = "test.raw.json",
         viewport: dict = None,
     ) -> None:
@@ -74,6 +73,8 @@ class MyDriveBenchmark(Benchmark):
             )
             env_args_list.append(env_args)
 
+        import pandas as pd  # only needed here; keeps pandas out of episode workers
+
         # Minimal metadata
         task_metadata = pd.DataFrame(
             [
@@ -0,0 +1,313 @@
+"""
+MyDrive Composite Episode Runner
+================================
+
+Coordinated execution of multi-agent (composite) MyDrive tasks.
+
+Running each sub-task as an independent AgentLab experiment has two problems:
+every sub-episode's ``setup`` resets the shared database (wiping the other
+agent's progress), and dependent agents burn LLM steps polling for state that
+another agent has not produced yet.
+
+``CompositeEpisodeRunner`` runs one composite episode as a unit:
+
+1. Reset the shared database once.
+2. Start one process per sub-agent, each with its own browser and context
+   (sub-task setup skips the reset).
+3. Synchronize sub-agents with ``CompositeSignals``: a start barrier, named
+   events (e.g. ``item_shared``) and a finish barrier.
+4. Validate the combined outcome once, after every sub-agent has finished.
+   The finish barrier has no timeout by default (an LLM episode can run for
+   a long time); if it breaks because a sibling failed, each remaining agent
+   still validates and keeps its own result.
+
+Sub-task configs declare their coordination in the composite task file:
+
+    "emits": [{"event": "item_shared", "when": {<eval config>}}]
+    "waits_for": ["item_shared"]
+
+An ``emits`` condition is any MyDrive eval config; it is checked after every
+step of the emitting agent (no LLM call). A waiting agent blocks before its
+first step until the event is set, then reloads its page.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, List, Optional
+
+from .task import load_task_configs, reset_database
+
+logger = logging.getLogger(__name__)
+
+
+class CompositeSignals:
+    """
+    Barriers and named events shared by the sub-agent processes of one episode.
+
+    Built on ``multiprocessing.Manager`` proxies so the object can be pickled
+    into worker processes.
+    """
+
+    def __init__(self, manager, event_names: List[str], n_parties: int) -> None:
+        self.events = {name: manager.Event() for name in event_names}
+        self.start = manager.Barrier(n_parties)
+        self.finish = manager.Barrier(n_parties)
+
+    def set(self, name: str) -> None:
+        """Signal that an event happened."""
+        self.events[name].set()
+
+    def is_set(self, name: str) -> bool:
+        return self.events[name].is_set()
+
+    def wait(self, name: str, timeout: Optional[float] = None) -> bool:
+        """Block until an event is set; returns False on timeout."""
+        return self.events[name].wait(timeout)
+
+    def abort(self) -> None:
+        """Break both barriers so other sub-agents do not wait on a failed one."""
+        self.start.abort()
+        self.finish.abort()
+
+
+@dataclass
+class SubAgentSpec:
+    """Everything a worker process needs to run one sub-agent."""
+
+    index: int
+    agent_name: str
+    agent_args: Any
+    env_args: Any
+    exp_dir: Path
+    eval_config: dict
+    emits: List[dict] = field(default_factory=list)
+    waits_for: List[str] = field(default_factory=list)
+    max_steps: int = 30
+    wait_timeout: float = 300.0
+    # None waits for the slowest sibling however long its episode runs
+    finish_timeout: Optional[float] = None
+
+
+def _run_sub_agent(spec: SubAgentSpec, signals: CompositeSignals) -> dict:
+    """
+    Run one sub-agent episode inside a worker process.
+
+    Returns:
+        Dict with steps taken, emitted events, wait time and the final
+        validation of this sub-agent's eval against the combined state.
+    """
+    result = {
+        "index": spec.index,
+        "agent": spec.agent_name,
+        "n_steps": 0,
+        "emitted": [],
+        "blocked_s": 0.0,
+        "err_msg": None,
+    }
+    env = None
+    agent = None
+    pending_emits = list(spec.emits)
+    spec.exp_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        spec.agent_args.prepare()
+        agent = spec.agent_args.make_agent()
+        env = spec.env_args.make_env(
+            action_mapping=agent.action_set.to_python_code,
+            exp_dir=spec.exp_dir,
+        )
+        obs, _ = env.reset(seed=spec.env_args.task_seed)
+        page = env.unwrapped.page
+        task = env.unwrapped.task
+
+        # Everyone is logged in before anyone acts
+        try:
+            signals.start.wait(spec.wait_timeout)
+        except threading.BrokenBarrierError:
+            logger.warning(f"[{spec.agent_name}] Start barrier broken (a sibling failed or timed out), starting anyway")
+
+        # Block on dependencies instead of polling with LLM steps
+        for event in spec.waits_for:
+            start = time.monotonic()
+            if not signals.wait(event, spec.wait_timeout):
+                logger.warning(f"[{spec.agent_name}] Timed out waiting for '{event}', starting anyway")
+            result["blocked_s"] += time.monotonic() - start
+        if spec.waits_for:
+            page.reload(wait_until="domcontentloaded")
+            obs, *_ = env.step("noop()")
+
+        obs = agent.obs_preprocessor(obs)
+        for _ in range(spec.max_steps):
+            action, _agent_info = agent.get_action(obs)
+            if action is None:
+                break
+            obs, _reward, terminated, truncated, _info = env.step(action)
+            obs = agent.obs_preprocessor(obs)
+            result["n_steps"] += 1
+
+            # Cheap state checks, no LLM involved
+            for emit in list(pending_emits):
+                _, ok, _, _ = task._validate_config(emit["when"], page)
+                if ok:
+                    signals.set(emit["event"])
+                    result["emitted"].append(emit["event"])
+                    pending_emits.remove(emit)
+                    logger.info(f"[{spec.agent_name}] Emitted '{emit['event']}'")
+
+            if terminated or truncated:
+                break
+
+        # Validate only once every sub-agent is done with the shared state
+        try:
+            signals.finish.wait(spec.finish_timeout)
+        except threading.BrokenBarrierError:
+            # A sibling failed; this agent's own outcome still counts
+            logger.warning(f"[{spec.agent_name}] Finish barrier broken, validating current state")
+        page.reload(wait_until="domcontentloaded")
+        reward, success, message, _ = task._validate_config(spec.eval_config, page)
+        result.update({"reward": reward, "success": success, "message": message})
+
+    except Exception as e:
+        logger.exception(f"[{spec.agent_name}] Sub-agent failed")
+        result.update({"reward": 0.0, "success": False, "err_msg": str(e)})
+        signals.abort()
+        # Unblock agents waiting on events this one will never emit
+        for emit in pending_emits:
+            signals.set(emit["event"])
+    finally:
+        if env is not None:
+            env.close()
+        try:
+            spec.agent_args.close()
+        except Exception:
+            pass
+    return result
+
+
+class CompositeEpisodeRunner:
+    """
+    Run a composite MyDrive task as one coordinated multi-agent episode.
+
+    Example:
+        >>> runner = CompositeEpisodeRunner(task_id=102, agent_args=ACIDWAVE_AGENT,
+        ...                                 exp_root=Path("results/composite"))
+        >>> outcome = runner.run()
+        >>> outcome["success"]
+    """
+
+    def __init__(
+        self,
+        task_id: int,
+        agent_args: Any,
+        exp_root: Path,
+        max_steps: int = 30,
+        headless: bool = True,
+        slow_mo: Optional[int] = None,
+        viewport: Optional[dict] = None,
+        wait_timeout: float = 300.0,
+        finish_timeout: Optional[float] = None,
+    ) -> None:
+        self.task_id = task_id
+        self.agent_args = agent_args
+        self.exp_root = Path(exp_root)
+        self.max_steps = max_steps
+        self.headless = headless
+        self.slow_mo = slow_mo
+        self.viewport = viewport or {"width": 1280, "height": 720}
+        self.wait_timeout = wait_timeout
+        self.finish_timeout = finish_timeout
+
+        self.config = load_task_configs().get(task_id)
+        if not self.config or self.config.get("eval", {}).get("type") != "composite":
+            raise ValueError(f"Task {task_id} is not a composite MyDrive task")
+        self.sub_tasks = self.config["eval"].get("sub_tasks", [])
+        self.operator = self.config["eval"].get("operator", "AND").upper()
+
+    def _build_specs(self) -> List[SubAgentSpec]:
+        from agentlab.experiments.loop import EnvArgs
+
+        specs = []
+        for idx, sub in enumerate(self.sub_tasks):
+            agent_name = sub.get("agent", f"agent{idx + 1}")
+            env_args = EnvArgs(
+                task_name=f"mydrive.task_{self.task_id}",
+                task_seed=idx,
+                task_kwargs={"sub_task_id": idx, "skip_reset": True},
+                max_steps=self.max_steps,
+                headless=self.headless,
+                slow_mo=self.slow_mo,
+                viewport=self.viewport,
+                record_video=False,
+            )
+            specs.append(
+                SubAgentSpec(
+                    index=idx,
+                    agent_name=agent_name,
+                    agent_args=self.agent_args,
+                    env_args=env_args,
+                    exp_dir=self.exp_root / f"{agent_name}_{idx}",
+                    eval_config=sub.get("eval", {}),
+                    emits=sub.get("emits", []),
+                    waits_for=sub.get("waits_for", []),
+                    max_steps=self.max_steps,
+                    wait_timeout=self.wait_timeout,
+                    finish_timeout=self.finish_timeout,
+                )
+            )
+        return specs
+
+    def run(self) -> dict:
+        """
+        Reset once, run all sub-agents concurrently and validate the outcome.
+
+        Returns:
+            Dict with combined reward/success and per-agent results; also
+            written to ``<exp_root>/composite_result.json``.
+        """
+        specs = self._build_specs()
+        event_names = sorted(
+            {e["event"] for s in specs for e in s.emits} | {w for s in specs for w in s.waits_for}
+        )
+        self.exp_root.mkdir(parents=True, exist_ok=True)
+
+        start_url = self.config.get("start_url", "http://localhost:3000")
+        if not reset_database(start_url):
+            logger.warning("Shared database reset failed; continuing with current state")
+
+        start = time.monotonic()
+        with multiprocessing.Manager() as manager:
+            signals = CompositeSignals(manager, event_names, n_parties=len(specs))
+            with ProcessPoolExecutor(max_workers=len(specs)) as pool:
+                futures = [pool.submit(_run_sub_agent, spec, signals) for spec in specs]
+                results = [f.result() for f in futures]
+
+        outcomes = [r.get("success", False) for r in results]
+        if self.operator == "OR":
+            success = any(outcomes)
+        else:
+            success = all(outcomes)
+
+        outcome = {
+            "task_id": self.task_id,
+            "operator": self.operator,
+            "success": success,
+            "reward": 1.0 if success else 0.0,
+            "n_steps": sum(r["n_steps"] for r in results),
+            "elapsed_s": round(time.monotonic() - start, 2),
+            "sub_agents": results,
+        }
+        with open(self.exp_root / "composite_result.json", "w", encoding="utf-8") as f:
+            json.dump(outcome, f, indent=2, default=str)
+
+        logger.info(
+            f"Composite task {self.task_id}: success={success} "
+            f"steps={outcome['n_steps']} elapsed={outcome['elapsed_s']}s"
+        )
+        return outcome
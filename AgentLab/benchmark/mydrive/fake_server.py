@@ -0,0 +1,775 @@
+"""
+Fake MyDrive Server
+===================
+
+In-process stand-in for the MyDrive dev and files APIs, for testing and
+benchmarking the evaluator and setup paths without Next.js, Postgres or S3.
+
+The server keeps an in-memory user/folder/file model seeded from
+``mydrive/Media`` (same layout and seed users as ``prisma/seed.ts``) and
+answers on an ephemeral localhost port from a background thread:
+
+- ``POST /api/dev/reset``        -> ``{success, result: {message, users}}``
+- ``POST|GET /api/dev/dump?agent=&dir=`` -> writes ``<dump_root>/[<dir>/]<agent>_dump``, ``{ok, path, items}``
+- ``GET /api/dev/manifest``      -> ``{agent, items: [{path, kind, size}]}`` (fake only;
+  the real app has no manifest endpoint, it lets tests assert on state without a dump)
+- ``GET /api/auth/csrf``, ``POST /api/auth/callback/credentials``, ``GET /api/auth/session``
+- ``GET /agent<N>-login``        -> logs in the seeded ``agent<N>`` and redirects to ``/``
+- ``GET /api/folders?parentId=`` -> ``{parentId, permission, breadcrumbs, folders, files}``
+- ``GET /api/search?q=&parentId=`` -> ``{results: [... kind, path]}``
+- ``GET|POST /api/shares``, ``GET /api/shared-with-me`` -> share lists / created share
+
+Response bodies follow the real route handlers in ``mydrive/src/app/api``.
+Tests drive agent-side changes through ``server.state`` (``create_folder``,
+``add_file``, ``delete``, ``share``).
+
+Example:
+    >>> with FakeMyDriveServer(dump_root=tmp_path) as server:
+    ...     os.environ["MYDRIVE_DUMP_DIR"] = str(tmp_path)
+    ...     server.state.create_folder("agent1", "COMP 222/Lectures")
+    ...     task.start_url = server.url
+    ...     task.validate(page, [])
+"""
+
+from __future__ import annotations
+
+import hashlib
+import itertools
+import json
+import logging
+import mimetypes
+import re
+import secrets
+import shutil
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+# <repo>/mydrive/Media, next to the AgentLab directory
+DEFAULT_MEDIA_ROOT = Path(__file__).resolve().parents[3] / "mydrive" / "Media"
+
+SESSION_COOKIE = "next-auth.session-token"
+
+# Mirrors the agents defined in prisma/seed.ts
+SEED_AGENTS = [
+    {"dir": "agent1", "email": "agent1@test.com", "password": "password", "name": "Agent 1", "username": "agent1"},
+    {"dir": "agent2", "email": "agent2@test.com", "password": "password", "name": "Agent 2", "username": "agent2"},
+]
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+@dataclass
+class FakeUser:
+    id: str
+    email: str
+    username: str
+    name: str
+    password_hash: str
+
+    def brief(self) -> dict:
+        return {"id": self.id, "name": self.name, "email": self.email}
+
+
+@dataclass
+class FakeFolder:
+    id: str
+    name: str
+    owner_id: str
+    parent_id: Optional[str]
+    created_at: str = field(default_factory=_now)
+
+
+@dataclass
+class FakeFile:
+    id: str
+    name: str
+    owner_id: str
+    folder_id: Optional[str]
+    size: int
+    mime_type: str
+    # Seeded files point at their Media source; uploaded files carry bytes
+    source: Optional[Path] = None
+    content: Optional[bytes] = None
+    created_at: str = field(default_factory=_now)
+
+    def read(self) -> bytes:
+        if self.content is not None:
+            return self.content
+        return self.source.read_bytes()
+
+
+@dataclass
+class FakeShare:
+    id: str
+    owner_id: str
+    shared_with_user_id: str
+    permission: str
+    file_id: Optional[str] = None
+    folder_id: Optional[str] = None
+    created_at: str = field(default_factory=_now)
+
+
+class FakeDriveState:
+    """
+    Thread-safe in-memory model of MyDrive users, folders and files.
+
+    The Media tree is scanned once; ``reset()`` rebuilds the model from that
+    scan without touching the disk, so resets cost microseconds.
+    """
+
+    def __init__(self, media_root: Optional[Path] = None) -> None:
+        self.media_root = Path(media_root) if media_root else DEFAULT_MEDIA_ROOT
+        self.lock = threading.RLock()
+        self._seed_cache: Dict[str, List[Tuple[Tuple[str, ...], bool, Path, int]]] = {}
+        self.users: Dict[str, FakeUser] = {}
+        self.folders: Dict[str, FakeFolder] = {}
+        self.files: Dict[str, FakeFile] = {}
+        self.shares: Dict[str, FakeShare] = {}
+        self.sessions: Dict[str, str] = {}
+        self._ids = itertools.count(1)
+        self.reset_count = 0
+        self.reset()
+
+    # ------------------------------------------------------------------ seed
+
+    def _scan_media(self, agent_dir: str) -> List[Tuple[Tuple[str, ...], bool, Path, int]]:
+        """Depth-first listing of one agent's Media directory (cached)."""
+        if agent_dir not in self._seed_cache:
+            entries = []
+            root = self.media_root / agent_dir
+
+            def walk(path: Path, parts: Tuple[str, ...]) -> None:
+                for child in sorted(path.iterdir(), key=lambda p: p.name):
+                    child_parts = parts + (child.name,)
+                    if child.is_dir():
+                        entries.append((child_parts, True, child, 0))
+                        walk(child, child_parts)
+                    else:
+                        entries.append((child_parts, False, child, child.stat().st_size))
+
+            if root.is_dir():
+                walk(root, ())
+            self._seed_cache[agent_dir] = entries
+        return self._seed_cache[agent_dir]
+
+    def _new_id(self, prefix: str) -> str:
+        return f"{prefix}-{next(self._ids)}"
+
+    def reset(self) -> dict:
+        """Rebuild the seed state; same response body as ``/api/dev/reset``."""
+        with self.lock:
+            self.users.clear()
+            self.folders.clear()
+            self.files.clear()
+            self.shares.clear()
+            # Seeded user ids are stable, so sessions survive a reset (JWT behaviour)
+            created = []
+            for agent in SEED_AGENTS:
+                user = FakeUser(
+                    id=f"user-{agent['username']}",
+                    email=agent["email"],
+                    username=agent["username"],
+                    name=agent["name"],
+                    password_hash=hashlib.sha256(agent["password"].encode()).hexdigest(),
+                )
+                self.users[user.id] = user
+                created.append({"email": user.email, "id": user.id})
+
+                folder_ids: Dict[Tuple[str, ...], Optional[str]] = {(): None}
+                for parts, is_dir, path, size in self._scan_media(agent["dir"]):
+                    parent_id = folder_ids[parts[:-1]]
+                    if is_dir:
+                        folder = FakeFolder(self._new_id("folder"), parts[-1], user.id, parent_id)
+                        self.folders[folder.id] = folder
+                        folder_ids[parts] = folder.id
+                    else:
+                        self._insert_file(user.id, parent_id, parts[-1], size=size, source=path)
+            self.reset_count += 1
+            return {"message": "Seeding complete", "users": created}
+
+    def _insert_file(self, owner_id, folder_id, name, size, source=None, content=None) -> FakeFile:
+        mime_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        f = FakeFile(self._new_id("file"), name, owner_id, folder_id, size, mime_type, source, content)
+        self.files[f.id] = f
+        return f
+
+    # --------------------------------------------------------------- lookups
+
+    def user_by(self, email: Optional[str] = None, username: Optional[str] = None) -> Optional[FakeUser]:
+        for user in self.users.values():
+            if (email and user.email == email) or (username and user.username == username):
+                return user
+        return None
+
+    def folder_path(self, folder_id: Optional[str]) -> str:
+        """Slash-joined folder names from the owner's root ('' for root)."""
+        parts = []
+        while folder_id:
+            folder = self.folders[folder_id]
+            parts.append(folder.name)
+            folder_id = folder.parent_id
+        return "/".join(reversed(parts))
+
+    def resolve_folder(self, username: str, path: str) -> Optional[str]:
+        """Folder id for an owner-relative path; raises KeyError if missing."""
+        owner = self.user_by(username=username)
+        folder_id = None
+        for name in [p for p in path.strip("/").split("/") if p]:
+            match = next(
+                (f for f in self.folders.values()
+                 if f.owner_id == owner.id and f.parent_id == folder_id and f.name == name),
+                None,
+            )
+            if match is None:
+                raise KeyError(f"No folder '{path}' for {username}")
+            folder_id = match.id
+        return folder_id
+
+    def _direct_share(self, user_id: str, file_id: Optional[str] = None, folder_id: Optional[str] = None):
+        for share in self.shares.values():
+            if share.shared_with_user_id == user_id and (
+                (file_id and share.file_id == file_id) or (folder_id and share.folder_id == folder_id)
+            ):
+                return share
+        return None
+
+    def _effective_permission(self, folder_id: Optional[str], user_id: str) -> Optional[str]:
+        """'EDIT'/'VIEW' like getEffectivePermissions in the folders route; None if no access."""
+        while folder_id:
+            folder = self.folders.get(folder_id)
+            if folder is None:
+                return None
+            if folder.owner_id == user_id:
+                return "EDIT"
+            share = self._direct_share(user_id, folder_id=folder_id)
+            if share is not None:
+                return "EDIT" if share.permission == "EDIT" else "VIEW"
+            folder_id = folder.parent_id
+        return None
+
+    def _can_access(self, folder_id: Optional[str], user_id: str) -> bool:
+        return self._effective_permission(folder_id, user_id) is not None
+
+    # -------------------------------------------------------------- mutation
+
+    def create_folder(self, username: str, path: str) -> str:
+        """Create every missing folder along ``path`` for a user; returns the leaf id."""
+        with self.lock:
+            owner = self.user_by(username=username)
+            folder_id = None
+            for name in [p for p in path.strip("/").split("/") if p]:
+                match = next(
+                    (f for f in self.folders.values()
+                     if f.owner_id == owner.id and f.parent_id == folder_id and f.name == name),
+                    None,
+                )
+                if match is None:
+                    match = FakeFolder(self._new_id("folder"), name, owner.id, folder_id)
+                    self.folders[match.id] = match
+                folder_id = match.id
+            return folder_id
+
+    def add_file(self, username: str, path: str, content: bytes = b"") -> str:
+        """Upload a file at ``path`` (parent folders are created); returns its id."""
+        with self.lock:
+            owner = self.user_by(username=username)
+            parent, _, name = path.strip("/").rpartition("/")
+            folder_id = self.create_folder(username, parent) if parent else None
+            return self._insert_file(owner.id, folder_id, name, size=len(content), content=content).id
+
+    def delete(self, username: str, path: str) -> None:
+        """Delete a file or a folder (recursively) at ``path``."""
+        with self.lock:
+            owner = self.user_by(username=username)
+            parent, _, name = path.strip("/").rpartition("/")
+            parent_id = self.resolve_folder(username, parent)
+            for f in list(self.files.values()):
+                if f.owner_id == owner.id and f.folder_id == parent_id and f.name == name:
+                    del self.files[f.id]
+                    self._drop_orphan_shares()
+                    return
+            folder_id = self.resolve_folder(username, path)
+            doomed = {folder_id}
+            changed = True
+            while changed:
+                changed = False
+                for folder in self.folders.values():
+                    if folder.parent_id in doomed and folder.id not in doomed:
+                        doomed.add(folder.id)
+                        changed = True
+            self.files = {k: f for k, f in self.files.items() if f.folder_id not in doomed}
+            self.folders = {k: f for k, f in self.folders.items() if k not in doomed}
+            self._drop_orphan_shares()
+
+    def _drop_orphan_shares(self) -> None:
+        self.shares = {
+            k: s for k, s in self.shares.items()
+            if (s.file_id in self.files) or (s.folder_id in self.folders)
+        }
+
+    def share(self, username: str, path: str, with_user: str, permission: str = "READ") -> str:
+        """Share the item at ``path`` with a user (email or username); returns the share id."""
+        with self.lock:
+            owner = self.user_by(username=username)
+            recipient = self.user_by(email=with_user, username=with_user)
+            if recipient is None:
+                raise KeyError(with_user)
+            parent, _, name = path.strip("/").rpartition("/")
+            parent_id = self.resolve_folder(username, parent)
+            file = next(
+                (f for f in self.files.values()
+                 if f.owner_id == owner.id and f.folder_id == parent_id and f.name == name),
+                None,
+            )
+            share = FakeShare(
+                self._new_id("share"), owner.id, recipient.id, permission,
+                file_id=file.id if file else None,
+                folder_id=None if file else self.resolve_folder(username, path),
+            )
+            self.shares[share.id] = share
+            return share.id
+
+    def _share_body(self, share: FakeShare, counterpart: str) -> dict:
+        """Share as returned by the shares routes (``sharedWithUser`` or ``owner`` included)."""
+        file = self.files.get(share.file_id) if share.file_id else None
+        folder = self.folders.get(share.folder_id) if share.folder_id else None
+        other = self.users[share.shared_with_user_id if counterpart == "sharedWithUser" else share.owner_id]
+        return {
+            "id": share.id,
+            "ownerId": share.owner_id,
+            "fileId": share.file_id,
+            "folderId": share.folder_id,
+            "sharedWithUserId": share.shared_with_user_id,
+            "linkToken": None,
+            "permission": share.permission,
+            "createdAt": share.created_at,
+            "file": {"id": file.id, "name": file.name, "mimeType": file.mime_type, "size": file.size} if file else None,
+            "folder": {"id": folder.id, "name": folder.name} if folder else None,
+            counterpart: {"id": other.id, "email": other.email, "name": other.name, "username": other.username},
+        }
+
+    def shares_owned(self, user: FakeUser) -> List[dict]:
+        with self.lock:
+            owned = [s for s in self.shares.values() if s.owner_id == user.id]
+            return [self._share_body(s, "sharedWithUser") for s in reversed(owned)]
+
+    def shared_with_me(self, user: FakeUser) -> List[dict]:
+        with self.lock:
+            received = [s for s in self.shares.values() if s.shared_with_user_id == user.id]
+            return [self._share_body(s, "owner") for s in reversed(received)]
+
+    def create_share(self, user: FakeUser, body: dict) -> Tuple[int, dict]:
+        """``POST /api/shares`` for user-to-user shares."""
+        with self.lock:
+            file_id, folder_id = body.get("fileId"), body.get("folderId")
+            if body.get("permission") not in ("READ", "COMMENT", "EDIT"):
+                return 400, {"error": "Invalid body"}
+            if not file_id and not folder_id:
+                return 400, {"error": "Must specify fileId or folderId"}
+            if file_id and getattr(self.files.get(file_id), "owner_id", None) != user.id:
+                return 404, {"error": "File not found or not owned"}
+            if folder_id and getattr(self.folders.get(folder_id), "owner_id", None) != user.id:
+                return 404, {"error": "Folder not found or not owned"}
+            email = body.get("sharedWithEmail")
+            if not email:
+                return 400, {"error": "Must specify sharedWithEmail or linkShare"}
+            recipient = self.user_by(email=email, username=email)
+            if recipient is None:
+                return 404, {"error": "User not found"}
+            share = FakeShare(self._new_id("share"), user.id, recipient.id, body["permission"], file_id, folder_id)
+            self.shares[share.id] = share
+            return 200, self._share_body(share, "sharedWithUser")
+
+    # ------------------------------------------------------------ endpoints
+
+    def manifest(self, username: str) -> List[dict]:
+        """Every folder and file owned by a user, as owner-relative paths."""
+        with self.lock:
+            owner = self.user_by(username=username)
+            if owner is None:
+                raise KeyError(username)
+            items = [
+                {"path": self.folder_path(f.id), "kind": "folder", "size": 0}
+                for f in self.folders.values() if f.owner_id == owner.id
+            ]
+            for f in self.files.values():
+                if f.owner_id == owner.id:
+                    parent = self.folder_path(f.folder_id)
+                    items.append({"path": f"{parent}/{f.name}" if parent else f.name, "kind": "file", "size": f.size})
+            return sorted(items, key=lambda i: i["path"])
+
+    def dump(self, username: str, dump_root: Path) -> dict:
+        """Write a user's tree to ``<dump_root>/<username>_dump`` like the real dump route."""
+        with self.lock:
+            owner = self.user_by(username=username)
+            if owner is None:
+                raise KeyError(username)
+            folders = [f for f in self.folders.values() if f.owner_id == owner.id]
+            files = [f for f in self.files.values() if f.owner_id == owner.id]
+            target = Path(dump_root) / f"{username}_dump"
+            shutil.rmtree(target, ignore_errors=True)
+            target.mkdir(parents=True, exist_ok=True)
+            for folder in folders:
+                (target / self.folder_path(folder.id)).mkdir(parents=True, exist_ok=True)
+            for f in files:
+                dest = target / self.folder_path(f.folder_id) / f.name
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                if f.content is None:
+                    shutil.copyfile(f.source, dest)
+                else:
+                    dest.write_bytes(f.content)
+            return {"ok": True, "path": str(target), "items": len(folders) + len(files)}
+
+    def list_folder(self, user: FakeUser, parent_id: Optional[str]) -> Optional[dict]:
+        """Body of ``GET /api/folders``; None when the folder is not accessible."""
+        with self.lock:
+            permission = self._effective_permission(parent_id, user.id) if parent_id else "EDIT"
+            if permission is None:
+                return None
+
+            def owner_brief(owner_id):
+                return self.users[owner_id].brief()
+
+            folders = [
+                {"id": f.id, "name": f.name, "parentId": f.parent_id, "createdAt": f.created_at,
+                 "ownerId": f.owner_id, "owner": owner_brief(f.owner_id)}
+                for f in self.folders.values()
+                if f.parent_id == parent_id and (parent_id or f.owner_id == user.id)
+            ]
+            files = [
+                {"id": f.id, "name": f.name, "size": f.size, "mimeType": f.mime_type, "folderId": f.folder_id,
+                 "createdAt": f.created_at, "ownerId": f.owner_id, "owner": owner_brief(f.owner_id)}
+                for f in self.files.values()
+                if f.folder_id == parent_id and (parent_id or f.owner_id == user.id)
+            ]
+            breadcrumbs = []
+            current = parent_id
+            while current and self._can_access(current, user.id):
+                folder = self.folders[current]
+                breadcrumbs.insert(0, {"id": folder.id, "name": folder.name})
+                current = folder.parent_id
+            return {
+                "parentId": parent_id,
+                "permission": permission,
+                "breadcrumbs": breadcrumbs,
+                "folders": folders,
+                "files": files,
+            }
+
+    def search(self, user: FakeUser, q: str, parent_id: Optional[str]) -> List[dict]:
+        """Body items of ``GET /api/search`` (case-insensitive name match, scoped)."""
+        with self.lock:
+            needle = q.lower()
+
+            def scoped_path(folder_id: Optional[str]) -> Optional[str]:
+                parts = []
+                while folder_id:
+                    if folder_id == parent_id:
+                        return "/".join(reversed(parts))
+                    folder = self.folders[folder_id]
+                    parts.append(folder.name)
+                    folder_id = folder.parent_id
+                return "/".join(reversed(parts)) if parent_id is None else None
+
+            def owner_info(owner_id):
+                owner = self.users[owner_id]
+                return {"email": owner.email, "name": owner.name, "username": owner.username}
+
+            results = []
+            for f in self.folders.values():
+                visible = f.owner_id == user.id or self._direct_share(user.id, folder_id=f.id)
+                if not visible or needle not in f.name.lower() or f.id == parent_id:
+                    continue
+                path = scoped_path(f.parent_id)
+                if path is not None:
+                    results.append({"id": f.id, "name": f.name, "parentId": f.parent_id,
+                                    "owner": owner_info(f.owner_id), "kind": "folder",
+                                    "path": f"/{path}" if path else "/"})
+            for f in self.files.values():
+                visible = f.owner_id == user.id or self._direct_share(user.id, file_id=f.id)
+                if not visible or needle not in f.name.lower():
+                    continue
+                path = scoped_path(f.folder_id)
+                if path is not None:
+                    results.append({"id": f.id, "name": f.name, "folderId": f.folder_id,
+                                    "mimeType": f.mime_type, "size": f.size,
+                                    "owner": owner_info(f.owner_id), "kind": "file",
+                                    "path": f"/{path}" if path else "/"})
+            return results
+
+    def login(self, email: str, password: str) -> Optional[str]:
+        """Check credentials; returns a new session token."""
+        with self.lock:
+            user = self.user_by(email=email)
+            if user is None or user.password_hash != hashlib.sha256(password.encode()).hexdigest():
+                return None
+            token = secrets.token_hex(16)
+            self.sessions[token] = user.id
+            return token
+
+    def login_as(self, username: str) -> Optional[str]:
+        with self.lock:
+            user = self.user_by(username=username)
+            if user is None:
+                return None
+            token = secrets.token_hex(16)
+            self.sessions[token] = user.id
+            return token
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "FakeMyDrive/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def state(self) -> FakeDriveState:
+        return self.server.state
+
+    def log_message(self, fmt, *args) -> None:
+        logger.debug(f"[fake-mydrive] {fmt % args}")
+
+    # ------------------------------------------------------------- plumbing
+
+    def _send(self, status: int, body=None, headers: Optional[dict] = None, content_type="application/json") -> None:
+        payload = b"" if body is None else (
+            body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+        )
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _body(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        if not raw:
+            return {}
+        if "application/json" in (self.headers.get("Content-Type") or ""):
+            return json.loads(raw)
+        return {k: v[0] for k, v in parse_qs(raw.decode("utf-8")).items()}
+
+    def _session_user(self) -> Optional[FakeUser]:
+        cookie = SimpleCookie(self.headers.get("Cookie") or "")
+        morsel = cookie.get(SESSION_COOKIE)
+        user_id = self.state.sessions.get(morsel.value) if morsel else None
+        return self.state.users.get(user_id) if user_id else None
+
+    def _session_headers(self, token: str) -> dict:
+        return {"Set-Cookie": f"{SESSION_COOKIE}={token}; Path=/; HttpOnly; SameSite=Lax"}
+
+    @staticmethod
+    def _parent_id(query: dict) -> Optional[str]:
+        value = query.get("parentId", [None])[0]
+        return None if not value or value == "null" else value
+
+    # -------------------------------------------------------------- routing
+
+    def do_GET(self) -> None:
+        self._route("GET")
+
+    def do_POST(self) -> None:
+        self._route("POST")
+
+    def _route(self, method: str) -> None:
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        path = url.path.rstrip("/") or "/"
+        try:
+            handler = self.server.routes.get((method, path))
+            if handler is None and path.startswith("/agent") and path.endswith("-login") and method == "GET":
+                handler = _Handler._agent_login
+            if handler is None:
+                self._send(404, {"error": "Not found"})
+                return
+            handler(self, path, query)
+        except Exception as e:
+            logger.exception(f"[fake-mydrive] {method} {path} failed")
+            self._send(500, {"error": "Internal Server Error", "details": str(e)})
+
+    # ------------------------------------------------------------ endpoints
+
+    def _reset(self, path, query) -> None:
+        self._body()
+        self._send(200, {"success": True, "result": self.state.reset()})
+
+    def _dump(self, path, query) -> None:
+        agent = query.get("agent", ["agent1"])[0]
+        instance_dir = query.get("dir", [""])[0]
+        if instance_dir and (not re.fullmatch(r"[A-Za-z0-9_.-]+", instance_dir) or instance_dir == "." or ".." in instance_dir):
+            self._send(400, {"error": f"Invalid dump dir '{instance_dir}'"})
+            return
+        try:
+            self._send(200, self.state.dump(agent, self.server.dump_root / instance_dir))
+        except KeyError:
+            self._send(404, {"error": f"Agent user '{agent}' not found"})
+
+    def _manifest(self, path, query) -> None:
+        agent = query.get("agent", ["agent1"])[0]
+        try:
+            self._send(200, {"agent": agent, "items": self.state.manifest(agent)})
+        except KeyError:
+            self._send(404, {"error": f"Agent user '{agent}' not found"})
+
+    def _csrf(self, path, query) -> None:
+        self._send(200, {"csrfToken": secrets.token_hex(16)})
+
+    def _credentials(self, path, query) -> None:
+        body = self._body()
+        token = self.state.login(body.get("email", ""), body.get("password", ""))
+        if token is None:
+            self._send(401, {"url": "/api/auth/error?error=CredentialsSignin"})
+            return
+        self._send(200, {"url": body.get("callbackUrl", "/")}, headers=self._session_headers(token))
+
+    def _session(self, path, query) -> None:
+        user = self._session_user()
+        if user is None:
+            self._send(200, {})
+            return
+        self._send(200, {"user": {"name": user.name, "email": user.email, "username": user.username, "id": user.id}})
+
+    def _agent_login(self, path, query) -> None:
+        username = path.strip("/")[: -len("-login")]
+        token = self.state.login_as(username)
+        if token is None:
+            self._send(404, {"error": f"Agent user '{username}' not found"})
+            return
+        headers = self._session_headers(token)
+        headers["Location"] = "/"
+        self._send(302, headers=headers)
+
+    def _home(self, path, query) -> None:
+        user = self._session_user()
+        if user is None:
+            self._send(302, headers={"Location": "/login"})
+            return
+        html = f"<html><body><button aria-label='New'>New</button><p>{user.name}</p></body></html>"
+        self._send(200, html.encode("utf-8"), content_type="text/html")
+
+    def _login_page(self, path, query) -> None:
+        self._send(200, b"<html><body><form>Sign in</form></body></html>", content_type="text/html")
+
+    def _folders(self, path, query) -> None:
+        user = self._session_user()
+        if user is None:
+            self._send(401, {"error": "Unauthorized"})
+            return
+        body = self.state.list_folder(user, self._parent_id(query))
+        if body is None:
+            self._send(404, {"error": "Folder not found or access denied"})
+            return
+        self._send(200, body)
+
+    def _search(self, path, query) -> None:
+        user = self._session_user()
+        if user is None:
+            self._send(401, {"error": "Unauthorized"})
+            return
+        q = query.get("q", [""])[0]
+        results = self.state.search(user, q, self._parent_id(query)) if q else []
+        self._send(200, {"results": results})
+
+    def _shares(self, path, query) -> None:
+        user = self._session_user()
+        if user is None:
+            self._send(401, {"error": "Unauthorized"})
+            return
+        if self.command == "POST":
+            self._send(*self.state.create_share(user, self._body()))
+        else:
+            self._send(200, self.state.shares_owned(user))
+
+    def _shared_with_me(self, path, query) -> None:
+        user = self._session_user()
+        if user is None:
+            self._send(401, {"error": "Unauthorized"})
+            return
+        self._send(200, self.state.shared_with_me(user))
+
+
+_ROUTES = {
+    ("POST", "/api/dev/reset"): _Handler._reset,
+    ("POST", "/api/dev/dump"): _Handler._dump,
+    ("GET", "/api/dev/dump"): _Handler._dump,
+    ("GET", "/api/dev/manifest"): _Handler._manifest,
+    ("GET", "/api/auth/csrf"): _Handler._csrf,
+    ("POST", "/api/auth/callback/credentials"): _Handler._credentials,
+    ("GET", "/api/auth/session"): _Handler._session,
+    ("GET", "/"): _Handler._home,
+    ("GET", "/login"): _Handler._login_page,
+    ("GET", "/api/folders"): _Handler._folders,
+    ("GET", "/api/search"): _Handler._search,
+    ("GET", "/api/shares"): _Handler._shares,
+    ("POST", "/api/shares"): _Handler._shares,
+    ("GET", "/api/shared-with-me"): _Handler._shared_with_me,
+}
+
+
+class FakeMyDriveServer:
+    """
+    Background-thread HTTP server exposing a ``FakeDriveState``.
+
+    Args:
+        media_root: Seed directory (defaults to the repo's ``mydrive/Media``)
+        dump_root: Where ``/api/dev/dump`` writes (defaults to ``MYDRIVE_DUMP_DIR``
+            or ``AgentLab/directory_downloads``, like the task validators)
+        host: Bind address
+        port: Bind port (0 picks a free port)
+    """
+
+    def __init__(
+        self,
+        media_root: Optional[Path] = None,
+        dump_root: Optional[Path] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        from .task import dump_root as default_dump_root
+
+        self.state = FakeDriveState(media_root)
+        self.dump_root = Path(dump_root) if dump_root else default_dump_root()
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.state = self.state
+        self._httpd.dump_root = self.dump_root
+        self._httpd.routes = _ROUTES
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeMyDriveServer":
+        self._thread = threading.Thread(
+            # Short poll interval keeps stop() fast when servers are started per test
+            target=self._httpd.serve_forever, kwargs={"poll_interval": 0.05}, name="fake-mydrive", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Fake MyDrive listening on {self.url}")
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def __enter__(self) -> "FakeMyDriveServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -0,0 +1,218 @@
+"""
+Streaming Multi-Term Matcher
+============================
+
+Single-pass, constant-memory search for several terms in a (possibly large,
+possibly binary) file.
+
+- Terms are compiled into one Aho-Corasick automaton over bytes (a full DFA,
+  one 256-entry transition row per state).
+- The file is read in fixed-size chunks; the automaton state carries across
+  chunk boundaries, so matches spanning two chunks are found without any
+  overlap buffer.
+- Nothing is decoded: ``str`` terms are encoded with each configured encoding
+  (e.g. UTF-8 and UTF-16-LE) and bytes terms are used as-is, so media files
+  such as ``.mp4``/``.jpg`` are scanned like any other file.
+- While the automaton sits in its root state, a compiled byte class jumps to
+  the next byte that can start a match, so long stretches of irrelevant data
+  are skipped in C.
+
+Example:
+    >>> matcher = StreamingMatcher(["line 1", "line 2"], case_sensitive=False)
+    >>> result = matcher.scan_file(path, stop_when_all_found=True)
+    >>> result.missing(), result.offsets
+"""
+
+from __future__ import annotations
+
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Tuple, Union
+
+Term = Union[str, bytes]
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton over bytes, compiled to a full transition table."""
+
+    def __init__(self, patterns: Sequence[bytes]) -> None:
+        if not patterns or any(len(p) == 0 for p in patterns):
+            raise ValueError("Patterns must be a non-empty list of non-empty byte strings")
+        self.patterns = list(patterns)
+        self.lengths = [len(p) for p in self.patterns]
+
+        # Trie
+        goto: List[Dict[int, int]] = [{}]
+        out: List[List[int]] = [[]]
+        for idx, pattern in enumerate(self.patterns):
+            state = 0
+            for byte in pattern:
+                nxt = goto[state].get(byte)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][byte] = nxt
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append(idx)
+
+        # Failure links (BFS) folded into a full DFA
+        delta: List[List[int]] = [[0] * 256 for _ in goto]
+        for byte, nxt in goto[0].items():
+            delta[0][byte] = nxt
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            out[state] = out[state] + out[fail[state]]
+            row = delta[state]
+            fallback = delta[fail[state]]
+            for byte in range(256):
+                nxt = goto[state].get(byte)
+                if nxt is None:
+                    row[byte] = fallback[byte]
+                else:
+                    fail[nxt] = fallback[byte]
+                    row[byte] = nxt
+                    queue.append(nxt)
+
+        self.delta = delta
+        self.out = [tuple(o) for o in out]
+        first_bytes = sorted({p[0] for p in self.patterns})
+        self._first_byte = re.compile(b"[" + b"".join(re.escape(bytes([b])) for b in first_bytes) + b"]")
+
+    def feed(self, chunk: bytes, offset: int, state: int, on_match) -> int:
+        """
+        Advance the automaton over one chunk.
+
+        Args:
+            chunk: Bytes to scan
+            offset: Absolute offset of ``chunk[0]`` in the stream
+            state: Automaton state after the previous chunk
+            on_match: Callback ``(pattern_index, start_offset) -> bool``;
+                returning True stops the scan early
+
+        Returns:
+            State after the chunk, or -1 if ``on_match`` asked to stop
+        """
+        delta, out, lengths = self.delta, self.out, self.lengths
+        skip = self._first_byte.search
+        i, n = 0, len(chunk)
+        while i < n:
+            if state == 0:
+                m = skip(chunk, i)
+                if m is None:
+                    return 0
+                i = m.start()
+            state = delta[state][chunk[i]]
+            if out[state]:
+                for idx in out[state]:
+                    if on_match(idx, offset + i - lengths[idx] + 1):
+                        return -1
+            i += 1
+        return state
+
+
+@dataclass
+class MatchResult:
+    """Byte offsets found for each term."""
+
+    terms: List[Term]
+    offsets: Dict[Term, List[int]] = field(default_factory=dict)
+    bytes_scanned: int = 0
+
+    def found(self, term: Term) -> bool:
+        return bool(self.offsets.get(term))
+
+    def missing(self) -> List[Term]:
+        return [t for t in self.terms if not self.found(t)]
+
+
+class StreamingMatcher:
+    """
+    Find many terms in a stream with one pass and constant memory.
+
+    Args:
+        terms: Terms to look for (str or bytes); an empty term is always
+            found at offset 0, as with ``"" in text``
+        encodings: Encodings used to turn str terms into byte patterns
+        case_sensitive: If False, ASCII letters match regardless of case
+        max_offsets: Offsets kept per term (memory stays bounded)
+    """
+
+    def __init__(
+        self,
+        terms: Iterable[Term],
+        encodings: Sequence[str] = ("utf-8",),
+        case_sensitive: bool = True,
+        max_offsets: int = 16,
+    ) -> None:
+        self.terms: List[Term] = list(dict.fromkeys(terms))
+        self.case_sensitive = case_sensitive
+        self.max_offsets = max_offsets
+
+        patterns: List[bytes] = []
+        self._owner: List[Term] = []
+        for term in self.terms:
+            if not term:
+                continue
+            variants = [term] if isinstance(term, bytes) else self._encode(term, encodings)
+            for pattern in dict.fromkeys(variants):
+                patterns.append(pattern if case_sensitive else pattern.lower())
+                self._owner.append(term)
+        self.automaton = AhoCorasick(patterns) if patterns else None
+
+    @staticmethod
+    def _encode(term: str, encodings: Sequence[str]) -> List[bytes]:
+        variants = []
+        for encoding in encodings:
+            try:
+                variants.append(term.encode(encoding))
+            except UnicodeEncodeError:
+                continue
+        return variants
+
+    def scan_chunks(self, chunks: Iterable[bytes], stop_when_all_found: bool = False) -> MatchResult:
+        """Scan an iterable of byte chunks as one continuous stream."""
+        result = MatchResult(terms=self.terms, offsets={t: [0] if not t else [] for t in self.terms})
+        if self.automaton is None:
+            return result
+
+        remaining = {t for t in self.terms if t}
+
+        def on_match(idx: int, start: int) -> bool:
+            term = self._owner[idx]
+            hits = result.offsets[term]
+            if len(hits) < self.max_offsets:
+                hits.append(start)
+            remaining.discard(term)
+            return stop_when_all_found and not remaining
+
+        state, offset = 0, 0
+        for chunk in chunks:
+            if not self.case_sensitive:
+                chunk = chunk.lower()
+            state = self.automaton.feed(chunk, offset, state, on_match)
+            offset += len(chunk)
+            if state < 0:
+                break
+        result.bytes_scanned = offset
+        return result
+
+    def scan_bytes(self, data: bytes, stop_when_all_found: bool = False) -> MatchResult:
+        return self.scan_chunks([data], stop_when_all_found=stop_when_all_found)
+
+    def scan_file(self, path: Path, chunk_size: int = 1 << 20, stop_when_all_found: bool = False) -> MatchResult:
+        """Scan a file in ``chunk_size`` pieces (memory use is one chunk)."""
+        with open(path, "rb") as f:
+            return self.scan_chunks(iter(lambda: f.read(chunk_size), b""), stop_when_all_found=stop_when_all_found)
+
+
+def find_terms(path: Path, terms: Iterable[Term], **kwargs) -> Tuple[List[Term], Dict[Term, List[int]]]:
+    """Convenience wrapper: return (missing terms, offsets by term) for a file."""
+    stop = kwargs.pop("stop_when_all_found", True)
+    chunk_size = kwargs.pop("chunk_size", 1 << 20)
+    result = StreamingMatcher(terms, **kwargs).scan_file(path, chunk_size=chunk_size, stop_when_all_found=stop)
+    return result.missing(), result.offsets
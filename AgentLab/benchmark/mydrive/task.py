@@ -18,44 +18,87 @@ from urllib.parse import urljoin
 
 from browsergym.core.task import AbstractBrowserTask
 
+from ..env_pool import pool_from_env, rebase_url
+from ..pacing import ReadinessWaiter, get_profile
+from ..routing import RouteInterceptor, get_route_policy
+from ..tracing import span, traced
+from .api import MyDriveClient, client_for, normalize_permission
+from .matcher import StreamingMatcher
+from .treediff import diff_against_paths, diff_trees
+
 logger = logging.getLogger(__name__)
 
-# CRITICAL: Auto-register all MyDrive tasks when this module is imported
-def _ensure_tasks_registered():
-    """Ensure all MyDrive tasks are registered with Gymnasium."""
+# Regular and composite task files; task IDs are unique across both
+TASK_FILES = ["test.raw.json", "test_composite.raw.json"]
+
+
+def load_task_configs() -> dict:
+    """Load every MyDrive task config keyed by task_id."""
+    configs = {}
+    for task_filename in TASK_FILES:
+        task_file = Path(__file__).parent / task_filename
+        if not task_file.exists():
+            continue
+        with open(task_file, 'r', encoding='utf-8') as f:
+            for task_config in json.load(f):
+                configs[task_config["task_id"]] = task_config
+    return configs
+
+
+def dump_root() -> Path:
+    """Directory the dump endpoint writes ``<agent>_dump`` folders into."""
+    return Path(os.environ.get("MYDRIVE_DUMP_DIR", Path(__file__).parent.parent.parent / "directory_downloads"))
+
+
+def instance_key(url: str) -> str:
+    """Filesystem-safe name of the instance serving ``url``, e.g. ``localhost_3001``."""
+    netloc = urllib.parse.urlparse(url).netloc or "default"
+    return "".join(c if c.isalnum() or c in "_.-" else "_" for c in netloc)
+
+
+def _shared_item_named(share: dict, name: str) -> bool:
+    """Whether a share's file or folder is ``name`` or ``name`` plus one extension."""
+    item = share.get("file") or share.get("folder") or {}
+    item_name = item.get("name") or ""
+    return item_name == name or os.path.splitext(item_name)[0] == name
+
+
+def _recipients(shares: list) -> dict:
+    """Permissions per recipient email and username."""
+    recipients: dict = {}
+    for share in shares:
+        recipient = share.get("sharedWithUser") or {}
+        for key in (recipient.get("email"), recipient.get("username")):
+            if key:
+                recipients.setdefault(key, set()).add(share.get("permission"))
+    return recipients
+
+
+def reset_database(base_url: str) -> bool:
+    """
+    Reset the MyDrive database and storage via the dev endpoint.
+
+    Args:
+        base_url: Any URL on the MyDrive host (the path is replaced)
+
+    Returns:
+        True if the reset endpoint answered with status 200
+    """
+    reset_url = urljoin(base_url, "/api/dev/reset")
     try:
-        import gymnasium as gym
-        from browsergym.core.registration import register_task
-        
-        # Load tasks from both regular and composite task files
-        task_files = ["test.raw.json", "test_composite.raw.json"]
-        
-        for task_filename in task_files:
-            task_file = Path(__file__).parent / task_filename
-            if not task_file.exists():
-                continue
-                
-            with open(task_file, 'r', encoding='utf-8') as f:
-                all_tasks = json.load(f)
-            
-            for task_config in all_tasks:
-                task_id = task_config["task_id"]
-                gym_id = f"mydrive.task_{task_id}"
-                
-                # Register with BrowserGym
-                try:
-                    register_task(
-                        gym_id,
-                        MyDriveTask,
-                        task_kwargs={
-                            "task_id": task_id,
-                        },
-                    )
-                except Exception:
-                    pass
-        
+        logger.info(f"Resetting database via {reset_url}")
+        req = urllib.request.Request(reset_url, method="POST")
+        with urllib.request.urlopen(req) as response:
+            resp_body = response.read().decode('utf-8')
+            logger.info(f"Reset Response: {resp_body}")
+            if response.status != 200:
+                logger.warning(f"Database reset failed with status {response.status}")
+                return False
+            return True
     except Exception as e:
-        logger.warning(f"[mydrive/task.py] Failed to auto-register tasks: {e}")
+        logger.warning(f"Failed to reset database: {e}")
+        return False
+
 
 class MyDriveTask(AbstractBrowserTask):
     """
@@ -69,15 +112,12 @@ class MyDriveTask(AbstractBrowserTask):
         start_url: Optional[str] = None,
         goal: Optional[str] = None,
         sub_task_id: Optional[int] = None,
+        skip_reset: bool = False,
     ) -> None:
         super().__init__(seed)
 
-        # Load config
-        task_file = Path(__file__).parent / "test.raw.json"
-        with open(task_file, 'r', encoding='utf-8') as f:
-            all_tasks = json.load(f)
-            
-        self.all_tasks_map = {t["task_id"]: t for t in all_tasks}
+        # Load config (regular and composite task files)
+        self.all_tasks_map = load_task_configs()
         self.config = self.all_tasks_map.get(task_id)
         if not self.config:
             raise ValueError(f"Task ID {task_id} not found")
@@ -108,30 +148,43 @@ class MyDriveTask(AbstractBrowserTask):
             self.start_url = os.environ.get("MYDRIVE_BASE_URL", "http://localhost:3000/login")
             
         self.task_id = task_id
+        # Set by coordinated runners that already reset the shared database once
+        self.skip_reset = skip_reset
+        # Pre-reset instance leased from the standby pool (ACIDWAVE_ENV_POOL)
+        self.lease = None
+        # Readiness-based pacing replaces the fixed 500ms per-operation slow_mo
+        self.pacing = get_profile("mydrive", self.config.get("pacing"))
+        # Safari media previews are blocked/stubbed; JS/CSS bundles come from a shared cache
+        self.router = RouteInterceptor(get_route_policy("mydrive", self.config.get("routing")))
         self.viewport = {"width": 1280, "height": 720}
-        self.slow_mo = 500
+        self.slow_mo = self.pacing.slow_mo
         self._goal = goal
 
         if self._goal is None:
             self._goal = self.config["intent"]
 
+    @traced("task.setup")
     def setup(self, page: playwright.sync_api.Page) -> tuple[str, dict]:
         # Clear cookies to ensure fresh session
         logger.info("Clearing browser cookies")
         page.context.clear_cookies()
+        self.router.install(page.context)
 
         # Reset database
-        reset_url = urljoin(self.start_url, "/api/dev/reset")
-        try:
-            logger.info(f"Resetting database via {reset_url}")
-            req = urllib.request.Request(reset_url, method="POST")
-            with urllib.request.urlopen(req) as response:
-                resp_body = response.read().decode('utf-8')
-                logger.info(f"Reset Response: {resp_body}")
-                if response.status != 200:
-                    logger.warning(f"Database reset failed with status {response.status}")
-        except Exception as e:
-            logger.warning(f"Failed to reset database: {e}")
+        with span("task.setup.reset"):
+            pool = pool_from_env()
+            if self.skip_reset:
+                logger.info("Skipping database reset (already reset by the episode runner)")
+            elif pool is not None:
+                self.lease = pool.acquire(reset_fn=reset_database)
+                if self.lease is None:
+                    # Falling back to the config URL could share an instance with a running episode
+                    raise RuntimeError("No MyDrive instance could be leased from the pool")
+            if self.lease is not None:
+                self.start_url = rebase_url(self.start_url, self.lease.url)
+                logger.info(f"Using pre-reset instance {self.lease.name} (waited {self.lease.wait_s:.2f}s)")
+            elif not self.skip_reset:
+                reset_database(self.start_url)
 
         # Authenticate via auto-login page IF not starting at login
         # For composite/sub-tasks, "composite" check might still fail if we swapped config.
@@ -160,24 +213,42 @@ class MyDriveTask(AbstractBrowserTask):
             auth_url = urljoin(self.start_url, f"/{agent_name}-login")
             
             logger.info(f"Authenticating via {auth_url}")
-            page.goto(auth_url)
-            
-            try:
-                # Timeout reduced to 7s as requested
-                page.wait_for_url(lambda u: u.rstrip('/') == self.start_url.rstrip('/'), timeout=7000)
-                logger.info("Authentication successful (redirected to root)")
-            except Exception as e:
-                logger.warning(f"Auth redirect timed out (>7s) or failed: {e}")
+            with span("task.setup.login", agent=agent_name):
+                page.goto(auth_url)
+                
+                try:
+                    # Return as soon as auto-login redirects away from the /agentN-login route
+                    # (this branch only runs when start_url is not a login page)
+                    page.wait_for_url(lambda u: "login" not in urllib.parse.urlparse(u).path, timeout=self.pacing.max_wait_ms)
+                    logger.info("Authentication successful (redirected to root)")
+                except Exception as e:
+                    logger.warning(f"Auth redirect timed out (>{self.pacing.max_wait_ms}ms) or failed: {e}")
 
         # Ensure we are on the start page (home)
         logger.info(f"Navigating to {self.start_url}")
-        page.goto(self.start_url, wait_until="domcontentloaded")
-
-        return self._goal, {"task_id": self.task_id}
+        with span("task.setup.goto"):
+            page.goto(self.start_url, wait_until="domcontentloaded")
+
+        # Wait for the drive view to be ready instead of relying on slow_mo
+        waiter = ReadinessWaiter(self.pacing)
+        with span("task.setup.ready"):
+            ready = waiter.wait_until_ready(page, self.config.get("ready_selectors", ()))
+        if not ready:
+            logger.warning("MyDrive may not have loaded properly (readiness budget exhausted)")
+
+        info = {"task_id": self.task_id, "pacing": waiter.summary(), "routing": self.router.summary()}
+        if self.lease is not None:
+            info["env_pool"] = {"instance": self.lease.name, "wait_s": round(self.lease.wait_s, 3),
+                                "synchronous": self.lease.synchronous}
+        return self._goal, info
 
     def teardown(self) -> None:
-        pass
+        logger.info(f"Task {self.task_id} routing: {self.router.summary()}")
+        if self.lease is not None:
+            pool_from_env().release(self.lease)
+            self.lease = None
 
+    @traced("task.validate")
     def validate(
         self,
         page: playwright.sync_api.Page,
@@ -199,9 +270,13 @@ class MyDriveTask(AbstractBrowserTask):
 
         if eval_type == "download_file_contains":
              return self._validate_file_contains(eval_config, page)
+
+        if eval_type in ("item_exists", "item_absent", "shared_with", "api_state"):
+            return self._validate_api_state(eval_config, page)
              
         return 0.0, False, f"Unknown eval type: {eval_type}", {}
 
+    @traced("task.validate.composite")
     def _validate_composite(self, eval_config: dict, page: playwright.sync_api.Page) -> tuple[float, bool, str, dict]:
         sub_tasks = eval_config.get("sub_tasks", [])
         operator = eval_config.get("operator", "AND").upper()
@@ -235,42 +310,140 @@ class MyDriveTask(AbstractBrowserTask):
         reward = 1.0 if success else 0.0
         return reward, success, f"Composite {operator} Result: {success}. Details: {'; '.join(messages)}", {}
 
+    @traced("task.validate.string_match")
     def _validate_string_match(self, eval_config: dict, page: playwright.sync_api.Page) -> tuple[float, bool, str, dict]:
         reference = eval_config.get("reference_answers", {})
         must_include = reference.get("must_include", [])
         text = page.inner_text("body")
 
-        if must_include:
-            if all(term in text for term in must_include):
-                return 1.0, True, "Success: Found required text", {}
-            else:
-                return 0.0, False, f"Missing terms: {[t for t in must_include if t not in text]}", {}
+        must_not_include = reference.get("must_not_include", [])
+
+        missing = [t for t in must_include if t not in text]
+        if missing:
+            return 0.0, False, f"Missing terms: {missing}", {}
+        forbidden = [t for t in must_not_include if t in text]
+        if forbidden:
+            return 0.0, False, f"Unexpected terms: {forbidden}", {}
+        if must_include or must_not_include:
+            return 1.0, True, "Success: Found required text", {}
         return 1.0, True, "No terms required", {}
 
-    def _validate_downloads_match(self, eval_config: dict, page: playwright.sync_api.Page) -> tuple[float, bool, str, dict]:
-        agent_name = eval_config.get("agent", "agent1")
-        dump_url = urljoin(self.start_url, f"/api/dev/dump?agent={agent_name}")
-        
+    @traced("task.validate.api_state")
+    def _validate_api_state(self, eval_config: dict, page: playwright.sync_api.Page) -> tuple[float, bool, str, dict]:
+        """
+        Assert on backend state through the MyDrive API instead of page text.
+
+        ``item_exists``/``item_absent``/``shared_with`` are single checks;
+        ``api_state`` ANDs a list of them under ``"checks"``. A check reads its
+        fields from ``reference_answers`` (or from the check itself):
+
+            {"type": "item_exists", "reference_answers": {"path": "folder3/file11.txt", "kind": "file"}}
+            {"type": "shared_with", "reference_answers": {"path": "shared_doc.txt", "user": "agent2", "permission": "Editor"}}
+
+        ``shared_with`` also accepts ``"name"`` instead of a path: it then
+        passes if any item this agent shared is named ``name``, with or
+        without one extension, since the UI saves a new document ``page`` as
+        ``page.doc``.
+        """
+        agent_name = eval_config.get("agent", self.config.get("agent", "agent1"))
+        if eval_config.get("type") == "api_state":
+            checks = eval_config.get("checks", [])
+        else:
+            checks = [eval_config]
+
+        try:
+            client = client_for(self.start_url, agent_name)
+            failures = []
+            for check in checks:
+                ok, msg = self._run_api_check(client, check)
+                if not ok:
+                    failures.append(msg)
+        except Exception as e:
+            logger.error(f"API state check error: {e}")
+            return 0.0, False, f"API check error: {e}", {}
+
+        if failures:
+            return 0.0, False, f"Mismatch: {'; '.join(failures)}", {"failed_checks": failures}
+        return 1.0, True, f"Success: {len(checks)} state checks passed", {}
+
+    def _run_api_check(self, client: MyDriveClient, check: dict) -> tuple[bool, str]:
+        check_type = check.get("type")
+        reference = check.get("reference_answers", check)
+        paths = reference.get("paths") or [reference.get("path", "")]
+
+        if check_type in ("item_exists", "item_absent"):
+            kind = reference.get("kind")
+            for path in paths:
+                item = client.resolve_path(path)
+                exists = item is not None and (kind is None or item.kind == kind)
+                if check_type == "item_exists" and not exists:
+                    return False, f"'{path}' does not exist" + (f" as a {kind}" if kind else "")
+                if check_type == "item_absent" and exists:
+                    return False, f"'{path}' still exists"
+            return True, ""
+
+        if check_type == "shared_with":
+            user = reference.get("user", "")
+            permission = reference.get("permission")
+            if "name" in reference and "path" not in reference and "paths" not in reference:
+                name = reference["name"]
+                shares = [s for s in client.shares() if _shared_item_named(s, name)]
+                permissions = _recipients(shares).get(user, set())
+                if not permissions:
+                    return False, f"No item named '{name}' is shared with {user}"
+                if permission and normalize_permission(permission) not in permissions:
+                    return False, f"'{name}' is shared with {user} as {'/'.join(sorted(permissions))}, expected {normalize_permission(permission)}"
+                return True, ""
+            for path in paths:
+                permissions = _recipients(client.shares_for(path)).get(user, set())
+                if not permissions:
+                    return False, f"'{path}' is not shared with {user}"
+                if permission and normalize_permission(permission) not in permissions:
+                    return False, f"'{path}' is shared with {user} as {'/'.join(sorted(permissions))}, expected {normalize_permission(permission)}"
+            return True, ""
+
+        return False, f"Unknown API check type: {check_type}"
+
+    def _dump(self, agent_name: str) -> tuple[Optional[Path], str]:
+        """
+        Dump ``agent_name``'s tree and return its directory.
+
+        Dumps go to ``<dump_root>/<instance>/<agent>_dump`` so episodes on
+        different pooled instances never read or wipe each other's dump.
+
+        Returns:
+            (dump directory, "") or (None, error message)
+        """
+        instance = instance_key(self.start_url)
+        query = urllib.parse.urlencode({"agent": agent_name, "dir": instance})
+        dump_url = urljoin(self.start_url, f"/api/dev/dump?{query}")
         try:
             req = urllib.request.Request(dump_url, method="POST")
             with urllib.request.urlopen(req) as response:
-                    if response.status != 200:
-                        return 0.0, False, f"Dump failed: {response.status}", {}
+                if response.status != 200:
+                    return None, f"Dump failed: {response.status}"
         except Exception as e:
-                return 0.0, False, f"Dump trigger error: {e}", {}
-
-        base_dir = Path(__file__).parent.parent.parent / "directory_downloads"
-        dump_dir = base_dir / f"{agent_name}_dump"
+            logger.error(f"Dump trigger error: {e}")
+            return None, f"Dump trigger error: {e}"
 
+        dump_dir = dump_root() / instance / f"{agent_name}_dump"
         if not dump_dir.exists():
-            return 0.0, False, f"Dump directory not found at {dump_dir}", {}
+            return None, f"Dump directory not found at {dump_dir}"
+        return dump_dir, ""
+
+    @traced("task.validate.downloads_match")
+    def _validate_downloads_match(self, eval_config: dict, page: playwright.sync_api.Page) -> tuple[float, bool, str, dict]:
+        dump_dir, error = self._dump(eval_config.get("agent", "agent1"))
+        if error:
+            return 0.0, False, error, {}
 
         try:
             reference = eval_config.get("reference_answers", {})
             dir1_rel = reference.get("directory_1") 
             dir2_ref = reference.get("directory_2")
             
-            if not dir1_rel or not dir2_ref:
+            # An empty directory_2 list is valid (expects an empty folder)
+            if not dir1_rel or dir2_ref is None:
                     return 0.0, False, "Missing directory_1 or directory_2 in config", {}
 
             dir1_path = dump_dir / dir1_rel
@@ -278,44 +451,27 @@ class MyDriveTask(AbstractBrowserTask):
             if not dir1_path.exists():
                     return 0.0, False, f"Directory 1 not found in dump: {dir1_rel}", {}
             
-            dir1_files = set(f.name for f in dir1_path.iterdir())
-            
-            dir2_files = set()
             if isinstance(dir2_ref, list):
-                dir2_files = set(dir2_ref)
+                # Expected listing: direct children, or nested paths when "recursive"
+                diff = diff_against_paths(dir1_path, dir2_ref, recursive=reference.get("recursive", False))
             else:
                 dir2_path = dump_dir / dir2_ref
                 if not dir2_path.exists():
                         return 0.0, False, f"Directory 2 not found in dump: {dir2_ref}", {}
-                dir2_files = set(f.name for f in dir2_path.iterdir())
+                diff = diff_trees(dir1_path, dir2_path, compare_content=reference.get("compare_content", False))
             
-            if dir1_files == dir2_files:
-                return 1.0, True, f"Success: Directory contents match ({len(dir1_files)} items)", {}
+            if diff.matches:
+                return 1.0, True, f"Success: {diff.summary()}", {"tree_diff": diff.as_dict()}
             else:
-                missing = dir2_files - dir1_files
-                extra = dir1_files - dir2_files
-                return 0.0, False, f"Mismatch: Missing {missing}, Extra {extra}", {}
+                return 0.0, False, f"Mismatch: {diff.summary()}", {"tree_diff": diff.as_dict()}
         except Exception as e:
             return 0.0, False, f"Comparison error: {e}", {}
 
+    @traced("task.validate.file_contains")
     def _validate_file_contains(self, eval_config: dict, page: playwright.sync_api.Page) -> tuple[float, bool, str, dict]:
-        agent_name = eval_config.get("agent", "agent1")
-        dump_url = urljoin(self.start_url, f"/api/dev/dump?agent={agent_name}")
-        
-        try:
-            req = urllib.request.Request(dump_url, method="POST")
-            with urllib.request.urlopen(req) as response:
-                    if response.status != 200:
-                        return 0.0, False, f"Dump failed: {response.status}", {}
-        except Exception as e:
-                logger.error(f"Dump trigger error: {e}")
-                return 0.0, False, f"Dump trigger error: {e}", {}
-
-        base_dir = Path(__file__).parent.parent.parent / "directory_downloads"
-        dump_dir = base_dir / f"{agent_name}_dump"
-
-        if not dump_dir.exists():
-            return 0.0, False, f"Dump directory not found at {dump_dir}", {}
+        dump_dir, error = self._dump(eval_config.get("agent", "agent1"))
+        if error:
+            return 0.0, False, error, {}
 
         try:
             reference = eval_config.get("reference_answers", {})
@@ -330,18 +486,19 @@ class MyDriveTask(AbstractBrowserTask):
             if not file_path.exists():
                     return 0.0, False, f"File not found in dump: {file_rel}", {}
             
-            try:
-                content = file_path.read_text(encoding='utf-8')
-            except UnicodeDecodeError:
-                return 0.0, False, f"Could not read file {file_rel} as utf-8", {}
+            # One streaming pass over raw bytes; works on binary media too
+            matcher = StreamingMatcher(
+                must_include,
+                encodings=reference.get("encodings", ["utf-8"]),
+                case_sensitive=reference.get("case_sensitive", True),
+            )
+            result = matcher.scan_file(file_path, stop_when_all_found=True)
+            missing = result.missing()
+            info = {"match_offsets": {t: result.offsets[t] for t in must_include if result.found(t)}}
 
-            missing = [term for term in must_include if term not in content]
-            
             if not missing:
-                return 1.0, True, f"Success: Found all {len(must_include)} terms in {file_rel}", {}
+                return 1.0, True, f"Success: Found all {len(must_include)} terms in {file_rel}", info
             else:
-                return 0.0, False, f"Mismatch: Missing terms {missing} in {file_rel}", {}
+                return 0.0, False, f"Mismatch: Missing terms {missing} in {file_rel}", info
         except Exception as e:
             return 0.0, False, f"Content check error: {e}", {}
-
-_ensure_tasks_registered()
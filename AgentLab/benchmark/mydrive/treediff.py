@@ -0,0 +1,230 @@
+"""
+MyDrive Dump Tree Diff
+======================
+
+Recursive comparison of directory trees in the MyDrive dump directory.
+
+- Trees are walked once with ``os.scandir`` into a flat map of relative
+  POSIX paths (``"folder3/file12.txt"``) to size/mtime metadata.
+- Path sets are compared recursively; files whose sizes differ are reported
+  as changed without reading them.
+- Optional content comparison hashes same-size files in chunks on a thread
+  pool. Digests are cached by (path, size, mtime_ns), so re-validating an
+  unchanged dump does not reread any file.
+
+Example:
+    >>> diff = diff_trees(dump_dir / "folder1", dump_dir / "expected", compare_content=True)
+    >>> diff.matches, diff.summary()
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class TreeEntry:
+    """Metadata for one file or directory in a scanned tree."""
+
+    is_dir: bool
+    size: int
+    mtime_ns: int
+
+
+def scan_tree(root: Path) -> Dict[str, TreeEntry]:
+    """
+    Walk a directory recursively with ``os.scandir``.
+
+    Args:
+        root: Directory to scan
+
+    Returns:
+        Dict mapping relative POSIX paths to TreeEntry (root itself excluded)
+    """
+    tree: Dict[str, TreeEntry] = {}
+    stack: List[Tuple[str, str]] = [(str(root), "")]
+    while stack:
+        abs_dir, rel_dir = stack.pop()
+        with os.scandir(abs_dir) as it:
+            for entry in it:
+                rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                st = entry.stat(follow_symlinks=False)
+                is_dir = entry.is_dir(follow_symlinks=False)
+                tree[rel] = TreeEntry(is_dir=is_dir, size=0 if is_dir else st.st_size, mtime_ns=st.st_mtime_ns)
+                if is_dir:
+                    stack.append((entry.path, rel))
+    return tree
+
+
+class HashCache:
+    """
+    Thread-safe content digest cache keyed by (path, size, mtime_ns).
+
+    A file that is rewritten gets a new mtime (or size) and therefore a new
+    key, so stale digests are never returned.
+    """
+
+    def __init__(self, algorithm: str = "sha256", chunk_size: int = 1 << 20, max_workers: Optional[int] = None) -> None:
+        self.algorithm = algorithm
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers or min(8, (os.cpu_count() or 1) + 4)
+        self._digests: Dict[Tuple[str, int, int], str] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def digest(self, path: Path, entry: TreeEntry) -> str:
+        key = (str(path), entry.size, entry.mtime_ns)
+        with self._lock:
+            cached = self._digests.get(key)
+            if cached is not None:
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        h = hashlib.new(self.algorithm)
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(self.chunk_size), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+
+        with self._lock:
+            self._digests[key] = digest
+        return digest
+
+    def digest_many(self, items: Iterable[Tuple[Path, TreeEntry]]) -> List[str]:
+        """Hash several files concurrently, preserving input order."""
+        items = list(items)
+        if len(items) <= 1:
+            return [self.digest(p, e) for p, e in items]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return list(pool.map(lambda item: self.digest(*item), items))
+
+
+# Shared across validations in the same process (Ray workers run many episodes)
+DEFAULT_HASH_CACHE = HashCache()
+
+
+@dataclass
+class TreeDiff:
+    """Structured result of comparing an actual tree against an expected one."""
+
+    missing: List[str] = field(default_factory=list)
+    extra: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    type_mismatch: List[str] = field(default_factory=list)
+    compared: int = 0
+
+    @property
+    def matches(self) -> bool:
+        return not (self.missing or self.extra or self.changed or self.type_mismatch)
+
+    def summary(self) -> str:
+        if self.matches:
+            return f"Directory contents match ({self.compared} items)"
+        parts = [f"Missing {set(self.missing)}", f"Extra {set(self.extra)}"]
+        if self.changed:
+            parts.append(f"Changed {set(self.changed)}")
+        if self.type_mismatch:
+            parts.append(f"File/folder mismatch {set(self.type_mismatch)}")
+        return ", ".join(parts)
+
+    def as_dict(self) -> dict:
+        return {
+            "missing": self.missing,
+            "extra": self.extra,
+            "changed": self.changed,
+            "type_mismatch": self.type_mismatch,
+            "compared": self.compared,
+        }
+
+
+def diff_trees(
+    actual_root: Path,
+    expected_root: Path,
+    compare_content: bool = False,
+    cache: Optional[HashCache] = None,
+) -> TreeDiff:
+    """
+    Recursively compare two directories.
+
+    Args:
+        actual_root: Directory produced by the agent
+        expected_root: Reference directory
+        compare_content: Also compare file bytes (sizes first, then hashes)
+        cache: Digest cache (defaults to the process-wide cache)
+
+    Returns:
+        TreeDiff listing relative paths that are missing, extra or changed
+    """
+    actual = scan_tree(Path(actual_root))
+    expected = scan_tree(Path(expected_root))
+
+    diff = TreeDiff(
+        missing=sorted(expected.keys() - actual.keys()),
+        extra=sorted(actual.keys() - expected.keys()),
+    )
+    common = sorted(actual.keys() & expected.keys())
+    diff.compared = len(common)
+
+    to_hash = []
+    for rel in common:
+        a, e = actual[rel], expected[rel]
+        if a.is_dir != e.is_dir:
+            diff.type_mismatch.append(rel)
+        elif compare_content and not a.is_dir:
+            if a.size != e.size:
+                diff.changed.append(rel)
+            else:
+                to_hash.append(rel)
+
+    if to_hash:
+        cache = cache or DEFAULT_HASH_CACHE
+        items = []
+        for rel in to_hash:
+            items.append((Path(actual_root) / rel, actual[rel]))
+            items.append((Path(expected_root) / rel, expected[rel]))
+        digests = cache.digest_many(items)
+        for i, rel in enumerate(to_hash):
+            if digests[2 * i] != digests[2 * i + 1]:
+                diff.changed.append(rel)
+        diff.changed.sort()
+
+    return diff
+
+
+def diff_against_paths(actual_root: Path, expected_paths: Iterable[str], recursive: bool = False) -> TreeDiff:
+    """
+    Compare a directory against an expected listing.
+
+    Args:
+        actual_root: Directory produced by the agent
+        expected_paths: Expected names (top level) or relative paths (recursive)
+        recursive: Compare every nested path instead of only direct children;
+            parent folders of listed paths are implied
+
+    Returns:
+        TreeDiff (content is not compared)
+    """
+    expected = {p.strip("/") for p in expected_paths}
+
+    if recursive:
+        for rel in list(expected):
+            parts = rel.split("/")
+            expected.update("/".join(parts[:i]) for i in range(1, len(parts)))
+        actual = set(scan_tree(Path(actual_root)))
+    else:
+        with os.scandir(actual_root) as it:
+            actual = {entry.name for entry in it}
+
+    return TreeDiff(
+        missing=sorted(expected - actual),
+        extra=sorted(actual - expected),
+        compared=len(actual & expected),
+    )
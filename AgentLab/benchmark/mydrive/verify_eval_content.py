@@ -1,22 +1,20 @@
-
 import unittest
 import sys
 import os
-import shutil
-import zipfile
+import json
 import tempfile
+import urllib.error
+import urllib.parse
+import urllib.request
 from pathlib import Path
-from unittest.mock import MagicMock, patch
+from unittest.mock import patch
+
+# Add the AgentLab root to the path so the benchmark package imports normally
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
 
-# Add parent directory to path to allow importing task
-sys.path.append(os.path.dirname(__file__))
+from benchmark.mydrive.fake_server import FakeMyDriveServer
+from benchmark.mydrive.task import MyDriveTask
 
-# Import MyDriveTask by file path to bypass package issues
-import importlib.util
-spec = importlib.util.spec_from_file_location("task", os.path.join(os.path.dirname(__file__), "task.py"))
-task_module = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(task_module)
-MyDriveTask = task_module.MyDriveTask
 
 class MockPage:
     def context(self):
@@ -24,95 +22,234 @@ class MockPage:
     def inner_text(self, selector):
         return ""
 
-class TestDownloadFileContains(unittest.TestCase):
-    def setUp(self):
-        self.downloads_dir = Path(__file__).parent.parent.parent / "directory_downloads"
-        self.downloads_dir.mkdir(parents=True, exist_ok=True)
-        self.dump_path = self.downloads_dir / "agent1_dump.zip"
 
-        # Create a dummy zip file
-        with zipfile.ZipFile(self.dump_path, 'w') as zf:
-            zf.writestr('target.txt', 'This is a secret message containing foobar.')
-            zf.writestr('other.txt', 'Nothing here.')
+class FakeServerTestCase(unittest.TestCase):
+    """Runs validators against the in-process fake MyDrive server."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.server = FakeMyDriveServer(dump_root=Path(self.tmp.name)).start()
+        env = patch.dict(os.environ, {"MYDRIVE_DUMP_DIR": self.tmp.name})
+        env.start()
+        self.addCleanup(env.stop)
 
     def tearDown(self):
-        if self.dump_path.exists():
-            self.dump_path.unlink()
-
-    @patch('urllib.request.urlopen')
-    def test_download_file_contains_success(self, mock_urlopen):
-        # Mock 200 response
-        mock_response = MagicMock()
-        mock_response.status = 200
-        mock_response.__enter__.return_value = mock_response
-        mock_urlopen.return_value = mock_response
-
-        # Config for success
-        config = {
-            "task_id": 999,
-            "start_url": "http://localhost:3000",
-            "intent": "Test intent",
-            "eval": {
-                "type": "download_file_contains",
-                "agent": "agent1",
-                "reference_answers": {
-                    "file_path": "target.txt",
-                    "must_include": ["secret", "foobar"]
-                }
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def make_task(self, eval_config):
+        with patch.object(MyDriveTask, '__init__', return_value=None):
+            task = MyDriveTask(seed=0, task_id=999)
+        task.config = {"task_id": 999, "intent": "Test intent", "eval": eval_config}
+        task.start_url = self.server.url
+        return task
+
+
+class TestDownloadFileContains(FakeServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.server.state.add_file("agent1", "target.txt", b"This is a secret message containing foobar.")
+        self.server.state.add_file("agent1", "other.txt", b"Nothing here.")
+
+    def test_download_file_contains_success(self):
+        task = self.make_task({
+            "type": "download_file_contains",
+            "agent": "agent1",
+            "reference_answers": {
+                "file_path": "target.txt",
+                "must_include": ["secret", "foobar"]
+            }
+        })
+
+        reward, success, msg, info = task.validate(MockPage(), [])
+
+        print(f"Result: Reward={reward}, Success={success}, Msg={msg}")
+        self.assertEqual(reward, 1.0)
+        self.assertTrue(success)
+        self.assertIn("Success", msg)
+        self.assertEqual(info["match_offsets"]["foobar"], [36])
+
+    def test_download_file_contains_failure_missing_term(self):
+        task = self.make_task({
+            "type": "download_file_contains",
+            "agent": "agent1",
+            "reference_answers": {
+                "file_path": "target.txt",
+                "must_include": ["secret", "MISSING_TERM"]
+            }
+        })
+
+        reward, success, msg, info = task.validate(MockPage(), [])
+
+        print(f"Result: Reward={reward}, Success={success}, Msg={msg}")
+        self.assertEqual(reward, 0.0)
+        self.assertFalse(success)
+        self.assertIn("Missing terms", msg)
+        self.assertIn("MISSING_TERM", msg)
+
+    def test_download_file_contains_empty_term(self):
+        # An empty term is always found, as with `"" in text`
+        task = self.make_task({
+            "type": "download_file_contains",
+            "agent": "agent1",
+            "reference_answers": {
+                "file_path": "target.txt",
+                "must_include": ["", "secret"]
+            }
+        })
+
+        reward, success, msg, info = task.validate(MockPage(), [])
+
+        self.assertTrue(success, msg)
+
+    def test_download_file_contains_binary_media(self):
+        task = self.make_task({
+            "type": "download_file_contains",
+            "agent": "agent1",
+            "reference_answers": {
+                "file_path": "safari trip pictures/GiraffeVideo.mp4",
+                "must_include": ["ftyp"]
+            }
+        })
+
+        reward, success, msg, info = task.validate(MockPage(), [])
+
+        self.assertTrue(success, msg)
+
+
+class TestDownloadsMatch(FakeServerTestCase):
+    def test_folder_moved_into_place(self):
+        self.server.state.create_folder("agent1", "COMP 222/Lectures")
+        task = self.make_task({
+            "type": "downloadsmatch",
+            "agent": "agent1",
+            "reference_answers": {
+                "directory_1": "COMP 222",
+                "directory_2": ["A1.java", "A2.java", "A3.java", "Lectures"]
+            }
+        })
+
+        reward, success, msg, info = task.validate(MockPage(), [])
+
+        self.assertTrue(success, msg)
+
+    def test_reset_restores_seed(self):
+        self.server.state.delete("agent1", "COMP 222")
+        self.server.state.reset()
+        paths = {item["path"] for item in self.server.state.manifest("agent1")}
+
+        self.assertIn("COMP 222/A1.java", paths)
+
+    def test_instances_dump_to_separate_dirs(self):
+        # A second pooled instance writing into the same dump root
+        other = FakeMyDriveServer(dump_root=Path(self.tmp.name)).start()
+        self.addCleanup(other.stop)
+        self.server.state.create_folder("agent1", "COMP 222/Lectures")
+        eval_config = {
+            "type": "downloadsmatch",
+            "agent": "agent1",
+            "reference_answers": {
+                "directory_1": "COMP 222",
+                "directory_2": ["A1.java", "A2.java", "A3.java", "Lectures"]
             }
         }
-        
-        # Patch the config loading in MyDriveTask
-        with patch.object(MyDriveTask, '__init__', return_value=None) as mock_init:
-             task = MyDriveTask(seed=0, task_id=999)
-             task.config = config
-             task.start_url = "http://localhost:3000"
-             
-             # Call validate
-             reward, success, msg, info = task.validate(MockPage(), [])
-             
-             print(f"Result: Reward={reward}, Success={success}, Msg={msg}")
-             self.assertEqual(reward, 1.0)
-             self.assertTrue(success)
-             self.assertIn("Success", msg)
-
-    @patch('urllib.request.urlopen')
-    def test_download_file_contains_failure_missing_term(self, mock_urlopen):
-        # Mock 200 response
-        mock_response = MagicMock()
-        mock_response.status = 200
-        mock_response.__enter__.return_value = mock_response
-        mock_urlopen.return_value = mock_response
-
-        # Config for failure
+        task = self.make_task(eval_config)
+        other_task = self.make_task(eval_config)
+        other_task.start_url = other.url
+
+        _, other_success, _, _ = other_task.validate(MockPage(), [])
+        _, success, msg, _ = task.validate(MockPage(), [])
+
+        self.assertFalse(other_success)
+        self.assertTrue(success, msg)
+        self.assertEqual(len(list(Path(self.tmp.name).iterdir())), 2)
+
+    def test_dump_dir_cannot_escape_dump_root(self):
+        for bad in ("..", ".", "a..b", "../x"):
+            url = f"{self.server.url}/api/dev/dump?agent=agent1&dir={urllib.parse.quote(bad, safe='')}"
+            with self.assertRaises(urllib.error.HTTPError) as ctx:
+                urllib.request.urlopen(urllib.request.Request(url, method="POST"))
+            self.assertEqual(ctx.exception.code, 400, bad)
+
+
+class TestApiState(FakeServerTestCase):
+    def test_item_exists_and_absent(self):
+        self.server.state.delete("agent1", "COMP 222/A1.java")
+        self.server.state.add_file("agent1", "COMP 222/Lab1.java", b"class Lab1 {}")
+        task = self.make_task({
+            "type": "api_state",
+            "agent": "agent1",
+            "checks": [
+                {"type": "item_exists", "reference_answers": {"path": "COMP 222/Lab1.java", "kind": "file"}},
+                {"type": "item_absent", "reference_answers": {"path": "COMP 222/A1.java"}}
+            ]
+        })
+
+        reward, success, msg, info = task.validate(MockPage(), [])
+
+        self.assertTrue(success, msg)
+
+    def test_item_absent_failure(self):
+        task = self.make_task({
+            "type": "item_absent",
+            "agent": "agent1",
+            "reference_answers": {"path": "COMP 222/A1.java"}
+        })
+
+        reward, success, msg, info = task.validate(MockPage(), [])
+
+        self.assertFalse(success)
+        self.assertIn("still exists", msg)
+
+    def test_shared_with_permission(self):
+        self.server.state.add_file("agent1", "shared_doc.txt", b"")
+        self.server.state.share("agent1", "shared_doc.txt", "agent2", "EDIT")
         config = {
-            "task_id": 999,
-            "start_url": "http://localhost:3000",
-            "intent": "Test intent",
-            "eval": {
-                "type": "download_file_contains",
-                "agent": "agent1",
-                "reference_answers": {
-                    "file_path": "target.txt",
-                    "must_include": ["secret", "MISSING_TERM"]
-                }
-            }
+            "type": "shared_with",
+            "agent": "agent1",
+            "reference_answers": {"path": "shared_doc.txt", "user": "agent2", "permission": "Editor"}
         }
-        
-        # Patch the config loading in MyDriveTask
-        with patch.object(MyDriveTask, '__init__', return_value=None) as mock_init:
-             task = MyDriveTask(seed=0, task_id=999)
-             task.config = config
-             task.start_url = "http://localhost:3000"
-             
-             # Call validate
-             reward, success, msg, info = task.validate(MockPage(), [])
-             
-             print(f"Result: Reward={reward}, Success={success}, Msg={msg}")
-             self.assertEqual(reward, 0.0)
-             self.assertFalse(success)
-             self.assertIn("Missing terms", msg)
-             self.assertIn("MISSING_TERM", msg)
+
+        reward, success, msg, info = self.make_task(config).validate(MockPage(), [])
+        self.assertTrue(success, msg)
+
+        config["reference_answers"]["permission"] = "Viewer"
+        reward, success, msg, info = self.make_task(config).validate(MockPage(), [])
+        self.assertFalse(success)
+        self.assertIn("expected READ", msg)
+
+
+class TestCompositeEmit(FakeServerTestCase):
+    def emit_condition(self):
+        task_file = Path(__file__).parent / "test_composite.raw.json"
+        with open(task_file, "r", encoding="utf-8") as f:
+            sub_task = json.load(f)[0]["eval"]["sub_tasks"][0]
+        return sub_task["emits"][0]["when"]
+
+    def test_item_shared_fires_on_ui_file_name(self):
+        # The MyDrive UI saves a new document named 'page' as 'page.doc'
+        self.server.state.add_file("agent1", "page.doc", b"")
+        task = self.make_task(self.emit_condition())
+
+        reward, success, msg, info = task.validate(MockPage(), [])
+        self.assertFalse(success)
+
+        self.server.state.share("agent1", "page.doc", "agent2", "EDIT")
+        reward, success, msg, info = task.validate(MockPage(), [])
+        self.assertTrue(success, msg)
+
+    def test_item_shared_fires_on_bare_name(self):
+        self.server.state.add_file("agent1", "page", b"")
+        self.server.state.add_file("agent1", "pages.doc", b"")
+        self.server.state.share("agent1", "pages.doc", "agent2", "EDIT")
+        task = self.make_task(self.emit_condition())
+
+        reward, success, msg, info = task.validate(MockPage(), [])
+        self.assertFalse(success)
+
+        self.server.state.share("agent1", "page", "agent2", "EDIT")
+        reward, success, msg, info = task.validate(MockPage(), [])
+        self.assertTrue(success, msg)
 
 if __name__ == '__main__':
     unittest.main()
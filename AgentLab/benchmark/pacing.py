@@ -0,0 +1,230 @@
+"""
+Readiness Pacing
+================
+
+Adaptive waits for task setup.
+
+Instead of padding every browser operation with a large fixed ``slow_mo``,
+tasks wait on app-specific readiness signals and then hand control to the
+agent as soon as the app is actually ready:
+
+- network idle (Playwright's ``networkidle`` load state)
+- DOM mutation quiescence (no mutations for ``dom_quiet_ms``)
+- ready selectors declared by the site profile or by the task config
+
+Each site has a profile (see ``SITE_PROFILES``). Task configs can override
+profile fields with a ``"pacing"`` dict and add ``"ready_selectors"``.
+
+Every wait is measured, so the setup info dict reports how long setup
+actually waited on each signal.
+
+Example:
+    >>> profile = get_profile("mydrive", task_config.get("pacing"))
+    >>> waiter = ReadinessWaiter(profile)
+    >>> waiter.wait_until_ready(page, task_config.get("ready_selectors", ()))
+    >>> waiter.summary()["waited_ms"]
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional
+
+import playwright.sync_api
+
+logger = logging.getLogger(__name__)
+
+
+# Resolves to true once no mutation happened for `quietMs`, or false when
+# `maxMs` elapses first (the page keeps mutating, e.g. a progress bar).
+_DOM_QUIET_JS = """
+([quietMs, maxMs]) => new Promise((resolve) => {
+    let timer = null;
+    let cap = null;
+    const observer = new MutationObserver(() => {
+        clearTimeout(timer);
+        timer = setTimeout(() => finish(true), quietMs);
+    });
+    const finish = (quiet) => {
+        observer.disconnect();
+        clearTimeout(timer);
+        clearTimeout(cap);
+        resolve(quiet);
+    };
+    observer.observe(document, {
+        subtree: true, childList: true, attributes: true, characterData: true,
+    });
+    timer = setTimeout(() => finish(true), quietMs);
+    cap = setTimeout(() => finish(false), maxMs);
+})
+"""
+
+
+@dataclass(frozen=True)
+class SiteProfile:
+    """Readiness signals and pacing budget for one web app."""
+
+    name: str
+    # CSS selectors that only exist once the app shell has rendered
+    ready_selectors: tuple = ()
+    wait_network_idle: bool = True
+    dom_quiet_ms: int = 300
+    # Total budget shared by all signals of one wait
+    max_wait_ms: int = 10000
+    # Residual per-operation delay handed to the browser (replaces fixed slow_mo)
+    slow_mo: int = 0
+
+
+SITE_PROFILES = {
+    "acidwave": SiteProfile(
+        name="acidwave",
+        ready_selectors=("[aria-label='SONGS']",),
+        dom_quiet_ms=250,
+        slow_mo=0,
+    ),
+    "mydrive": SiteProfile(
+        name="mydrive",
+        ready_selectors=("[aria-label='New']",),
+        dom_quiet_ms=300,
+        slow_mo=0,
+    ),
+}
+
+DEFAULT_PROFILE = SiteProfile(name="default")
+
+
+def get_profile(site: Optional[str], overrides: Optional[dict] = None) -> SiteProfile:
+    """
+    Return the pacing profile for a site, with optional per-task overrides.
+
+    Args:
+        site: Site name (e.g. "acidwave", "mydrive"); unknown sites get the default
+        overrides: Profile fields to replace (from a task config's "pacing" dict)
+
+    Returns:
+        SiteProfile instance
+    """
+    profile = SITE_PROFILES.get((site or "").lower(), DEFAULT_PROFILE)
+    if overrides:
+        known = {f.name for f in dataclasses.fields(SiteProfile)}
+        unknown = set(overrides) - known
+        if unknown:
+            logger.warning(f"Ignoring unknown pacing fields for {profile.name}: {sorted(unknown)}")
+        values = {k: v for k, v in overrides.items() if k in known}
+        if "ready_selectors" in values:
+            values["ready_selectors"] = tuple(values["ready_selectors"])
+        profile = dataclasses.replace(profile, **values)
+    return profile
+
+
+@dataclass
+class PacingReport:
+    """Measured readiness waits for one task setup."""
+
+    profile: str
+    waits: List[dict] = field(default_factory=list)
+
+    def record(self, signal: str, waited_ms: float, ok: bool) -> None:
+        self.waits.append({"signal": signal, "waited_ms": round(waited_ms, 1), "ok": ok})
+
+    @property
+    def waited_ms(self) -> float:
+        return sum(w["waited_ms"] for w in self.waits)
+
+    def as_dict(self) -> dict:
+        return {
+            "profile": self.profile,
+            "waited_ms": round(self.waited_ms, 1),
+            "ready": all(w["ok"] for w in self.waits),
+            "waits": list(self.waits),
+        }
+
+
+class ReadinessWaiter:
+    """
+    Wait on a site's readiness signals within a single shared budget.
+
+    Signals are checked in order of cost: ready selectors first (the app shell
+    is rendered), then network idle, then DOM quiescence. A signal that times
+    out is recorded as not ready and the remaining signals still run with
+    whatever budget is left; setup never fails because of pacing.
+    """
+
+    def __init__(self, profile: SiteProfile) -> None:
+        self.profile = profile
+        self.report = PacingReport(profile=profile.name)
+
+    def wait_until_ready(
+        self,
+        page: playwright.sync_api.Page,
+        ready_selectors: Iterable[str] = (),
+    ) -> bool:
+        """
+        Block until the page is ready or the profile budget is spent.
+
+        Args:
+            page: Playwright page to wait on
+            ready_selectors: Extra task-declared selectors that must be attached
+
+        Returns:
+            True if every signal fired within budget
+        """
+        deadline = time.monotonic() + self.profile.max_wait_ms / 1000
+        ready = True
+
+        selectors = list(self.profile.ready_selectors) + list(ready_selectors)
+        for selector in selectors:
+            ready &= self._timed(
+                f"selector:{selector}",
+                deadline,
+                lambda remaining, s=selector: page.wait_for_selector(
+                    s, state="attached", timeout=remaining
+                ),
+            )
+
+        if self.profile.wait_network_idle:
+            ready &= self._timed(
+                "network_idle",
+                deadline,
+                lambda remaining: page.wait_for_load_state("networkidle", timeout=remaining),
+            )
+
+        if self.profile.dom_quiet_ms > 0:
+            ready &= self._timed(
+                "dom_quiet",
+                deadline,
+                lambda remaining: page.evaluate(
+                    _DOM_QUIET_JS, [self.profile.dom_quiet_ms, remaining]
+                ),
+            )
+
+        summary = self.summary()
+        logger.info(
+            f"[pacing:{self.profile.name}] ready={ready} waited={summary['waited_ms']}ms"
+        )
+        return ready
+
+    def _timed(self, signal: str, deadline: float, wait) -> bool:
+        """Run one wait with the remaining budget and record how long it took."""
+        remaining_ms = int((deadline - time.monotonic()) * 1000)
+        if remaining_ms <= 0:
+            self.report.record(signal, 0.0, False)
+            return False
+
+        start = time.monotonic()
+        try:
+            result = wait(remaining_ms)
+            # DOM quiescence resolves to False when the cap is hit
+            ok = result is not False
+        except Exception as e:
+            logger.debug(f"[pacing:{self.profile.name}] {signal} not ready: {e}")
+            ok = False
+        self.report.record(signal, (time.monotonic() - start) * 1000, ok)
+        return ok
+
+    def summary(self) -> dict:
+        """Report dict suitable for a task's setup info."""
+        return self.report.as_dict()
@@ -0,0 +1,199 @@
+"""
+Task Registration
+=================
+
+Lazy, explicit registration of benchmark task namespaces with BrowserGym.
+
+Previously every import of ``benchmark.acidwave`` registered all tasks,
+printed a banner and pulled in the task classes, and several hooks checked
+registration by scanning every key of ``gym.envs.registry``. Now:
+
+- a namespace (``acidwave``, ``mydrive``) is registered on the first lookup
+  of one of its ids (``ensure_registered``), reading only its JSON catalog;
+- task classes are registered as import paths (``LazyTaskClass``) and
+  imported on first instantiation;
+- registered namespaces are kept in a set, so every later lookup is O(1)
+  no matter how large the registry is or how many benchmarks exist.
+
+``install()`` hooks the two lookup points (Gymnasium's ``_find_spec`` for
+direct ``gym.make`` calls and AgentLab's ``loop._get_env_name`` for
+experiments); patch_agentlab calls it in the main process and in workers.
+Code that does neither can call ``register_namespace("acidwave")`` directly.
+
+Example:
+    >>> from benchmark import registration
+    >>> registration.install()
+    >>> gym.make("browsergym/acidwave.task_3")   # registers "acidwave" here
+    >>> registration.registered_namespaces()
+    frozenset({'acidwave'})
+"""
+
+from __future__ import annotations
+
+import importlib
+import json
+import logging
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_DIR = Path(__file__).parent
+
+
+@dataclass(frozen=True)
+class TaskNamespace:
+    """A benchmark whose tasks are registered as ``<name>.task_<id>``."""
+
+    name: str
+    task_class: str
+    task_files: Tuple[str, ...]
+
+    def task_ids(self) -> List[int]:
+        ids = {}
+        for filename in self.task_files:
+            path = BENCHMARK_DIR / self.name / filename
+            if path.exists():
+                with open(path, "r", encoding="utf-8") as f:
+                    # Later files override earlier ones, as in mydrive's load_task_configs
+                    ids.update((task["task_id"], None) for task in json.load(f))
+        return list(ids)
+
+
+NAMESPACES: Dict[str, TaskNamespace] = {
+    "acidwave": TaskNamespace("acidwave", "benchmark.acidwave.task:AcidwaveTask", ("test.raw.json",)),
+    "mydrive": TaskNamespace(
+        "mydrive", "benchmark.mydrive.task:MyDriveTask", ("test.raw.json", "test_composite.raw.json")
+    ),
+}
+
+_REGISTERED: Set[str] = set()
+_LOCK = threading.Lock()
+
+
+class LazyTaskClass:
+    """Stands in for a task class and imports it on first use."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._cls = None
+
+    def resolve(self):
+        if self._cls is None:
+            module, _, name = self.path.partition(":")
+            self._cls = getattr(importlib.import_module(module), name)
+        return self._cls
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __getattr__(self, name):
+        # Class attributes (e.g. get_task_id) are looked up on the real class.
+        # Private and dunder names are not: copy and pickle probe them (e.g.
+        # __setstate__) on an instance whose path/_cls are not set yet, and
+        # resolving then would recurse through this method.
+        if name.startswith("_") or "path" not in self.__dict__:
+            raise AttributeError(name)
+        return getattr(self.resolve(), name)
+
+    def __repr__(self) -> str:
+        return f"LazyTaskClass({self.path!r})"
+
+
+def namespace_of(env_id: str) -> str:
+    """``"browsergym/acidwave.task_3"`` or ``"acidwave.task_3"`` -> ``"acidwave"``."""
+    return env_id.rsplit("/", 1)[-1].split(".", 1)[0]
+
+
+def register_namespace(name: str) -> bool:
+    """
+    Register every task of a namespace once per process.
+
+    Returns:
+        True if the namespace is registered (now or before)
+    """
+    if name in _REGISTERED:
+        return True
+    namespace = NAMESPACES.get(name)
+    if namespace is None:
+        return False
+    with _LOCK:
+        if name in _REGISTERED:
+            return True
+        from browsergym.core.registration import register_task
+
+        task_class = LazyTaskClass(namespace.task_class)
+        ids = namespace.task_ids()
+        for task_id in ids:
+            register_task(f"{name}.task_{task_id}", task_class, task_kwargs={"task_id": task_id})
+        _REGISTERED.add(name)
+    logger.debug(f"[registration] Registered {len(ids)} {name} tasks")
+    return True
+
+
+def ensure_registered(env_id: str) -> bool:
+    """Register the namespace of ``env_id`` if it is one of ours; O(1) once registered."""
+    name = namespace_of(env_id)
+    if name in _REGISTERED:
+        return True
+    if name not in NAMESPACES:
+        return False
+    return register_namespace(name)
+
+
+def registered_namespaces() -> frozenset:
+    return frozenset(_REGISTERED)
+
+
+def task_names(name: str) -> List[str]:
+    """Task names of a namespace (``acidwave.task_0``, ...) without registering anything."""
+    return [f"{name}.task_{task_id}" for task_id in NAMESPACES[name].task_ids()]
+
+
+_INSTALLED = False
+
+
+def install() -> bool:
+    """
+    Resolve our namespaces on lookup in Gymnasium and AgentLab.
+
+    Returns:
+        True if at least one lookup point was hooked
+    """
+    global _INSTALLED
+    if _INSTALLED:
+        return True
+    hooked = False
+
+    try:
+        from gymnasium.envs import registration as gym_registration
+
+        _original_find_spec = gym_registration._find_spec
+
+        def _find_spec(env_id: str):
+            ensure_registered(env_id)
+            return _original_find_spec(env_id)
+
+        gym_registration._find_spec = _find_spec
+        hooked = True
+    except (ImportError, AttributeError) as e:
+        logger.debug(f"[registration] Gymnasium lookup not hooked: {e}")
+
+    try:
+        from agentlab.experiments import loop
+
+        _original_get_env_name = loop._get_env_name
+
+        def _get_env_name(task_name: str):
+            ensure_registered(task_name)
+            return _original_get_env_name(task_name)
+
+        loop._get_env_name = _get_env_name
+        hooked = True
+    except (ImportError, AttributeError) as e:
+        logger.debug(f"[registration] AgentLab lookup not hooked: {e}")
+
+    _INSTALLED = hooked
+    return hooked
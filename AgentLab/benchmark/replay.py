@@ -0,0 +1,298 @@
+"""
+HTTP Record and Replay
+======================
+
+Deterministic, offline episodes against a recorded backend.
+
+In ``record`` mode every request of an episode goes to the network and the
+response is captured into a HAR-like archive (``{"log": {"entries": [...]}}``,
+bodies base64-encoded). In ``replay`` mode the same requests are answered from
+the archives without touching the network:
+
+- Requests are matched on method, path, query and request body. The origin is
+  ignored by default, so an archive recorded against the Railway deployment
+  replays for ``localhost`` as well.
+- Volatile query parameters (cache busters) are dropped before matching.
+- A request recorded several times is answered with its recorded responses
+  in order (the last one repeats), so stateful sequences such as
+  "like song, then list liked songs" replay faithfully.
+- Unrecorded requests go through ``fallback_rules``: the first rule whose
+  regex matches the URL picks the action (``network``, ``abort``, ``empty``
+  or ``404``); ``default_fallback`` applies otherwise.
+
+Archives are scoped per task: each recording episode writes its own file
+(no cross-worker write races) to ``<site>/<scope>/`` (``task_<id>``), and
+replay serves only the newest recording of that task, so a task never gets
+responses recorded for another one. The response cursors restart with
+every episode (``start_episode``).
+
+Select the mode with ``ACIDWAVE_REPLAY=record|replay`` (or a task config
+``"replay": {"mode": ...}``); archives live under ``ACIDWAVE_REPLAY_DIR``
+(default ``AgentLab/replay_archives``).
+
+Example:
+    >>> harness = ReplayHarness.from_config("acidwave", task_config.get("replay"), scope=f"task_{task_id}")
+    >>> harness.start_episode()
+    >>> harness.install(page.context)
+    >>> ...
+    >>> harness.finish(f"task_{task_id}")
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARCHIVE_ROOT = Path(__file__).parent.parent / "replay_archives"
+
+# Query parameters that only defeat caches
+VOLATILE_PARAMS = ("_", "t", "ts", "timestamp", "cb", "v")
+
+# Task-config "replay" keys passed on to the constructor
+CONFIG_KEYS = ("fallback_rules", "default_fallback", "match_origin")
+
+# Response headers that must not be replayed verbatim
+_HOP_HEADERS = {"content-length", "content-encoding", "transfer-encoding", "connection", "set-cookie"}
+
+
+def request_key(method: str, url: str, post_data: Optional[bytes], match_origin: bool = False,
+                volatile: Tuple[str, ...] = VOLATILE_PARAMS) -> str:
+    """Normalized matching key for a request."""
+    parts = urlsplit(url)
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in volatile))
+    origin = f"{parts.scheme}://{parts.netloc}" if match_origin else ""
+    body = hashlib.sha256(post_data).hexdigest()[:16] if post_data else ""
+    return f"{method.upper()} {origin}{parts.path}?{query} {body}"
+
+
+def _post_bytes(request: dict) -> Optional[bytes]:
+    """Raw body of an archived request (``postData`` text, base64 for binary bodies)."""
+    post = request.get("postData", {})
+    text = post.get("text")
+    if not text:
+        return None
+    if post.get("encoding") == "base64":
+        return base64.b64decode(text)
+    return text.encode("utf-8")
+
+
+@dataclass
+class ReplayStats:
+    """Per-episode record/replay counters."""
+
+    recorded: int = 0
+    hits: int = 0
+    misses: int = 0
+    fallbacks: Dict[str, int] = field(default_factory=dict)
+
+
+class ReplayHarness:
+    """
+    Record HTTP traffic into an archive, or serve it back.
+
+    Args:
+        mode: "record", "replay" or "off"
+        archive_dir: Directory holding the task's ``*.har.json`` archives
+        skip_types: Resource types left to other handlers (e.g. stubbed media)
+        fallback_rules: ``[{"pattern": regex, "action": ...}]`` for unrecorded requests
+        default_fallback: Action when no rule matches ("404", "abort", "empty", "network")
+        match_origin: Include scheme/host/port in the matching key
+    """
+
+    def __init__(
+        self,
+        mode: str,
+        archive_dir: Path,
+        skip_types: Tuple[str, ...] = (),
+        fallback_rules: Optional[List[dict]] = None,
+        default_fallback: str = "404",
+        match_origin: bool = False,
+    ) -> None:
+        self.mode = mode
+        self.archive_dir = Path(archive_dir)
+        self.skip_types = tuple(skip_types)
+        self.fallback_rules = [(re.compile(r["pattern"]), r["action"]) for r in (fallback_rules or [])]
+        self.default_fallback = default_fallback
+        self.match_origin = match_origin
+        self.stats = ReplayStats()
+        self._entries: List[dict] = []
+        self._index: Dict[str, List[dict]] = defaultdict(list)
+        self._cursor: Dict[str, int] = defaultdict(int)
+        if mode == "replay":
+            self._load()
+
+    @classmethod
+    def from_config(cls, site: str, config: Optional[dict] = None, skip_types: Tuple[str, ...] = (),
+                    scope: Optional[str] = None) -> "ReplayHarness":
+        """
+        Build a harness from env vars and an optional task-config ``"replay"`` dict.
+
+        Args:
+            site: Site name (first archive directory level)
+            config: Task-config ``"replay"`` dict (``mode``, ``archive_root`` and
+                ``CONFIG_KEYS``; other keys are ignored with a warning)
+            skip_types: Resource types left to other handlers
+            scope: Archive subdirectory of the task, e.g. ``"task_3"``
+        """
+        config = dict(config or {})
+        mode = os.environ.get("ACIDWAVE_REPLAY", config.pop("mode", "off")).lower()
+        root = Path(os.environ.get("ACIDWAVE_REPLAY_DIR", config.pop("archive_root", DEFAULT_ARCHIVE_ROOT)))
+        archive_dir = root / site / scope if scope else root / site
+        unknown = sorted(k for k in config if k not in CONFIG_KEYS)
+        if unknown:
+            logger.warning(f"[replay] Ignoring unknown replay config keys: {unknown}")
+        options = {k: v for k, v in config.items() if k in CONFIG_KEYS}
+        return cls(mode=mode, archive_dir=archive_dir, skip_types=skip_types, **options)
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode in ("record", "replay")
+
+    # ---------------------------------------------------------------- archive
+
+    def _load(self) -> None:
+        # Several recordings of one task would interleave their sequences; replay the newest
+        recordings = sorted(self.archive_dir.glob("*.har.json"), key=lambda p: p.stat().st_mtime)
+        files = recordings[-1:]
+        for path in files:
+            with open(path, "r", encoding="utf-8") as f:
+                for entry in json.load(f)["log"]["entries"]:
+                    request = entry["request"]
+                    key = request_key(request["method"], request["url"], _post_bytes(request), self.match_origin)
+                    self._index[key].append(entry["response"])
+        logger.info(
+            f"[replay] Loaded {sum(len(v) for v in self._index.values())} responses from {files[0] if files else 'no archive'}"
+            f" ({len(recordings)} recordings in {self.archive_dir})"
+        )
+
+    def start_episode(self) -> None:
+        """Restart the response sequences and counters for a new episode."""
+        self._entries = []
+        self._cursor.clear()
+        self.stats = ReplayStats()
+
+    def finish(self, name: str) -> Optional[Path]:
+        """Write the recorded entries (record mode only) to ``<archive_dir>/<name>-<ts>-<pid>.har.json``."""
+        if self.mode != "record" or not self._entries:
+            return None
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        path = self.archive_dir / f"{name}-{int(time.time())}-{os.getpid()}.har.json"
+        archive = {
+            "log": {
+                "version": "1.2",
+                "creator": {"name": "agentlab-replay", "version": "1"},
+                "entries": self._entries,
+            }
+        }
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(archive, f)
+        os.replace(tmp, path)
+        logger.info(f"[replay] Recorded {len(self._entries)} responses to {path}")
+        return path
+
+    # ---------------------------------------------------------------- routing
+
+    def install(self, context) -> bool:
+        """Register on a Playwright ``BrowserContext``; install after other route handlers so it runs first."""
+        if not self.enabled:
+            return False
+        context.route("**/*", self._handle)
+        logger.info(f"[replay] {self.mode} mode, archive dir {self.archive_dir}")
+        return True
+
+    def _handle(self, route, request) -> None:
+        if request.resource_type in self.skip_types:
+            route.fallback()
+            return
+        post = request.post_data_buffer
+        key = request_key(request.method, request.url, post, self.match_origin)
+        if self.mode == "record":
+            self._record(route, request, post)
+        else:
+            self._replay(route, request, key)
+
+    def _record(self, route, request, post: Optional[bytes]) -> None:
+        try:
+            response = route.fetch()
+            body = response.body()
+        except Exception as e:
+            logger.debug(f"[replay] Not recorded {request.url}: {e}")
+            route.fallback()
+            return
+        headers = [{"name": k, "value": v} for k, v in response.headers.items()]
+        entry = {
+            "startedDateTime": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "request": {"method": request.method, "url": request.url},
+            "response": {
+                "status": response.status,
+                "headers": headers,
+                "content": {
+                    "mimeType": response.headers.get("content-type", ""),
+                    "size": len(body),
+                    "encoding": "base64",
+                    "text": base64.b64encode(body).decode("ascii"),
+                },
+            },
+        }
+        if post:
+            post_data = {"mimeType": request.headers.get("content-type", "")}
+            try:
+                post_data["text"] = post.decode("utf-8")
+            except UnicodeDecodeError:
+                # Binary bodies are kept byte-exact so their key matches on replay
+                post_data.update(encoding="base64", text=base64.b64encode(post).decode("ascii"))
+            entry["request"]["postData"] = post_data
+        self._entries.append(entry)
+        self.stats.recorded += 1
+        route.fulfill(response=response, body=body)
+
+    def _replay(self, route, request, key: str) -> None:
+        responses = self._index.get(key)
+        if responses:
+            i = min(self._cursor[key], len(responses) - 1)
+            self._cursor[key] += 1
+            recorded = responses[i]
+            headers = {h["name"]: h["value"] for h in recorded["headers"] if h["name"].lower() not in _HOP_HEADERS}
+            self.stats.hits += 1
+            route.fulfill(
+                status=recorded["status"],
+                headers=headers,
+                body=base64.b64decode(recorded["content"]["text"]),
+            )
+            return
+
+        self.stats.misses += 1
+        action = next((a for pattern, a in self.fallback_rules if pattern.search(request.url)), self.default_fallback)
+        self.stats.fallbacks[action] = self.stats.fallbacks.get(action, 0) + 1
+        logger.debug(f"[replay] Unrecorded {request.method} {request.url} -> {action}")
+        if action == "network":
+            route.fallback()
+        elif action == "abort":
+            route.abort("internetdisconnected")
+        elif action == "empty":
+            route.fulfill(status=204, body=b"")
+        else:
+            route.fulfill(status=404, content_type="application/json", body=b'{"error":"not recorded"}')
+
+    def summary(self) -> dict:
+        """Report dict suitable for a task's info dict."""
+        return {
+            "mode": self.mode,
+            "recorded": self.stats.recorded,
+            "hits": self.stats.hits,
+            "misses": self.stats.misses,
+            "fallbacks": dict(self.stats.fallbacks),
+        }
@@ -0,0 +1,290 @@
+"""
+Request Routing
+===============
+
+Per-site request interception for headless episodes.
+
+Agents read the accessibility tree, not pixels or audio, so album art,
+audio, video and web fonts are pure transfer cost, and with Acidwave's
+remote deployment that cost depends on network bandwidth. A
+``RouteInterceptor`` installed on the browser context:
+
+- blocks resource types the site never needs (aborted requests),
+- stubs others with tiny placeholders (1x1 GIF, silent WAV, empty font) so
+  the app still sees successful loads and fires its usual events,
+- serves JS/CSS bundles whose file names carry a content hash from a
+  content-addressed on-disk cache shared by all episodes and workers on the
+  machine (``AssetCache``); unhashed bundles (e.g. a dev server's) are not
+  proxied through Python at all,
+- passes everything else on unchanged (``route.fallback()``, so handlers
+  registered earlier, e.g. replay, still see the request).
+
+Each site has a policy (see ``SITE_ROUTE_POLICIES``). Task configs can
+override policy fields with a ``"routing"`` dict; ``ACIDWAVE_ROUTING=0``
+disables interception entirely.
+
+Example:
+    >>> router = RouteInterceptor(get_route_policy("acidwave", task_config.get("routing")))
+    >>> router.install(page.context)
+    >>> router.summary()["bytes_saved"]
+"""
+
+from __future__ import annotations
+
+import base64
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import re
+import struct
+import tempfile
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path(
+    os.environ.get("ACIDWAVE_ASSET_CACHE", Path.home() / ".cache" / "agentlab" / "assets")
+)
+
+# Smallest valid payloads for stubbed resource types
+_GIF_1X1 = base64.b64decode("R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7")
+
+
+def _silent_wav(samples: int = 800, rate: int = 8000) -> bytes:
+    """0.1s of 8-bit mono silence."""
+    data = b"\x80" * samples
+    return (
+        b"RIFF" + struct.pack("<I", 36 + len(data)) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, 1, 1, rate, rate, 1, 8)
+        + b"data" + struct.pack("<I", len(data)) + data
+    )
+
+
+STUBS = {
+    "image": ("image/gif", _GIF_1X1),
+    "media": ("audio/wav", _silent_wav()),
+    "font": ("font/woff2", b""),
+}
+
+# Fingerprinted bundle names: a hex content hash (Vite 4/webpack/Next:
+# index-3f9a1c2b.js, main.8c1d2e4f.css) or Vite 5's 8-char base64url hash,
+# which always mixes in digits and capitals (index-BqM1x0aZ.js). Plain names
+# such as main-component.js or app-bundle.js are mutable and not cached.
+_HASHED_ASSET = re.compile(
+    r"[.-](?:[0-9a-f]{8,}|(?=[0-9A-Za-z_-]*\d)(?=[0-9A-Za-z_-]*[A-Z])[0-9A-Za-z_-]{8})\.(?:js|mjs|css)$"
+)
+
+
+@dataclass(frozen=True)
+class RoutePolicy:
+    """What to do with each Playwright resource type for one site."""
+
+    name: str
+    enabled: bool = True
+    block: tuple = ()
+    stub: tuple = ("image", "media", "font")
+    cache: tuple = ("script", "stylesheet")
+    # Only cache fingerprinted assets (unhashed dev bundles change)
+    cache_unhashed: bool = False
+
+
+SITE_ROUTE_POLICIES = {
+    # Album art and audio are stubbed so the player still reports playback
+    "acidwave": RoutePolicy(name="acidwave", stub=("image", "media", "font")),
+    # Safari .jpg/.mp4 previews are never needed; downloads are not media requests
+    "mydrive": RoutePolicy(name="mydrive", block=("media",), stub=("image", "font")),
+}
+
+DEFAULT_ROUTE_POLICY = RoutePolicy(name="default", stub=(), cache=())
+
+
+def get_route_policy(site: Optional[str], overrides: Optional[dict] = None) -> RoutePolicy:
+    """
+    Return the routing policy for a site, with optional per-task overrides.
+
+    Args:
+        site: Site name (e.g. "acidwave", "mydrive"); unknown sites only pass through
+        overrides: Policy fields to replace (from a task config's "routing" dict)
+
+    Returns:
+        RoutePolicy instance
+    """
+    policy = SITE_ROUTE_POLICIES.get((site or "").lower(), DEFAULT_ROUTE_POLICY)
+    if overrides:
+        known = {f.name for f in dataclasses.fields(RoutePolicy)}
+        unknown = set(overrides) - known
+        if unknown:
+            logger.warning(f"Ignoring unknown routing fields for {policy.name}: {sorted(unknown)}")
+        values = {k: tuple(v) if isinstance(v, list) else v for k, v in overrides.items() if k in known}
+        policy = dataclasses.replace(policy, **values)
+    if os.environ.get("ACIDWAVE_ROUTING", "1") == "0":
+        policy = dataclasses.replace(policy, enabled=False)
+    return policy
+
+
+class AssetCache:
+    """
+    Content-addressed cache of static responses.
+
+    Bodies are stored once per SHA-256 under ``blobs/``; ``index/`` maps a
+    URL hash to the body digest and response headers. Files are written
+    atomically, so concurrent workers can share one directory.
+    """
+
+    def __init__(self, root: Path = DEFAULT_CACHE_DIR) -> None:
+        self.root = Path(root)
+        self._index: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def _index_path(self, url: str) -> Path:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.root / "index" / key[:2] / f"{key}.json"
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.root / "blobs" / digest[:2] / digest
+
+    @staticmethod
+    def _atomic_write(path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def get(self, url: str) -> Optional[tuple]:
+        """Return ``(headers, body)`` for a cached URL, or None."""
+        with self._lock:
+            meta = self._index.get(url)
+        if meta is None:
+            path = self._index_path(url)
+            if not path.exists():
+                return None
+            meta = json.loads(path.read_text(encoding="utf-8"))
+            with self._lock:
+                self._index[url] = meta
+        blob = self._blob_path(meta["digest"])
+        try:
+            return meta["headers"], blob.read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def put(self, url: str, headers: dict, body: bytes) -> None:
+        digest = hashlib.sha256(body).hexdigest()
+        blob = self._blob_path(digest)
+        if not blob.exists():
+            self._atomic_write(blob, body)
+        keep = {k: v for k, v in headers.items() if k.lower() in ("content-type", "cache-control", "etag")}
+        meta = {"digest": digest, "headers": keep, "size": len(body)}
+        self._atomic_write(self._index_path(url), json.dumps(meta).encode("utf-8"))
+        with self._lock:
+            self._index[url] = meta
+
+
+# One cache object per process; the directory is shared across processes
+_SHARED_CACHE: Optional[AssetCache] = None
+
+
+def shared_asset_cache() -> AssetCache:
+    global _SHARED_CACHE
+    if _SHARED_CACHE is None:
+        _SHARED_CACHE = AssetCache()
+    return _SHARED_CACHE
+
+
+@dataclass
+class RoutingStats:
+    """Per-episode interception counters."""
+
+    blocked: int = 0
+    stubbed: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    passed: int = 0
+    # Network bytes avoided by cache hits (blocked/stubbed bodies are never fetched,
+    # so their size is unknown and they are only counted)
+    bytes_saved: int = 0
+    by_type: Dict[str, int] = field(default_factory=dict)
+
+    def as_dict(self) -> dict:
+        return dataclasses.asdict(self)
+
+
+class RouteInterceptor:
+    """
+    Apply a ``RoutePolicy`` to every request of a browser context.
+
+    Args:
+        policy: Site routing policy
+        cache: Asset cache (defaults to the process-wide shared cache)
+    """
+
+    def __init__(self, policy: RoutePolicy, cache: Optional[AssetCache] = None) -> None:
+        self.policy = policy
+        self.cache = cache
+        self.stats = RoutingStats()
+
+    def install(self, context) -> bool:
+        """Register the handler on a Playwright ``BrowserContext`` (or ``Page``)."""
+        if not self.policy.enabled:
+            return False
+        if self.policy.cache and self.cache is None:
+            self.cache = shared_asset_cache()
+        context.route("**/*", self._handle)
+        logger.info(f"[routing:{self.policy.name}] Interception installed")
+        return True
+
+    def _cacheable(self, request) -> bool:
+        """Decided from the URL alone, so uncacheable bundles never go through ``route.fetch``."""
+        if request.method != "GET":
+            return False
+        return self.policy.cache_unhashed or bool(_HASHED_ASSET.search(request.url.split("?", 1)[0]))
+
+    def _handle(self, route, request) -> None:
+        resource_type = request.resource_type
+        self.stats.by_type[resource_type] = self.stats.by_type.get(resource_type, 0) + 1
+        try:
+            if resource_type in self.policy.block:
+                self.stats.blocked += 1
+                route.abort("blockedbyclient")
+                return
+
+            if resource_type in self.policy.stub and resource_type in STUBS:
+                content_type, body = STUBS[resource_type]
+                self.stats.stubbed += 1
+                route.fulfill(status=200, content_type=content_type, body=body)
+                return
+
+            if resource_type in self.policy.cache and self._cacheable(request):
+                hit = self.cache.get(request.url)
+                if hit is not None:
+                    headers, body = hit
+                    self.stats.cache_hits += 1
+                    self.stats.bytes_saved += len(body)
+                    route.fulfill(status=200, headers=headers, body=body)
+                    return
+                response = route.fetch()
+                body = response.body()
+                self.stats.cache_misses += 1
+                if response.status == 200:
+                    self.cache.put(request.url, response.headers, body)
+                route.fulfill(response=response, body=body)
+                return
+
+            self.stats.passed += 1
+            route.fallback()
+        except Exception as e:
+            # Never break a page load because of the interception layer
+            logger.debug(f"[routing:{self.policy.name}] {request.url} fell through: {e}")
+            try:
+                route.fallback()
+            except Exception:
+                pass
+
+    def summary(self) -> dict:
+        """Report dict suitable for a task's info dict."""
+        return {"policy": self.policy.name, **self.stats.as_dict()}
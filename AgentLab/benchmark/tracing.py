@@ -0,0 +1,278 @@
+"""
+Step Tracing
+============
+
+Lightweight spans showing where the time of an episode goes.
+
+    >>> from benchmark.tracing import span, traced
+    >>> with span("agent.llm", attempt=1):
+    ...     response = chat_model(messages)
+    >>> @traced("task.validate")
+    ... def validate(self, page, chat_messages): ...
+
+Spans nest; each records its name, start offset and duration relative to
+the episode start, nesting depth, parent and any attributes. They are
+buffered in memory and written once, at the end of the episode, to
+``<exp_dir>/trace.jsonl`` (one JSON object per span); an episode that
+AgentLab relaunches replaces its earlier trace rather than adding to it.
+
+Tracing is off unless ``ACIDWAVE_TRACE=1``. When it is off, or no episode
+is being traced, ``span`` returns a shared no-op context manager and
+``traced`` adds one global lookup per call.
+
+``install()`` (called by patch_agentlab when tracing is on) traces every
+AgentLab episode into its directory and adds environment spans:
+``env.reset``, ``env.step`` (action execution) and ``env.observation``.
+Spans inside the code base: ``agent.*`` (acidwave_agent), ``task.setup*``
+and ``task.validate*`` (Acidwave and MyDrive tasks).
+
+``summarize`` aggregates trace files into count, total, p50, p95 and p99
+per span name (see experiments/trace_report.py).
+
+Environment variables:
+    ACIDWAVE_TRACE=1               enable tracing
+"""
+
+import functools
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACE_ENV = "ACIDWAVE_TRACE"
+TRACE_FILE = "trace.jsonl"
+
+
+def tracing_enabled() -> bool:
+    return os.environ.get(TRACE_ENV, "0") == "1"
+
+
+class _NullSpan:
+    """Shared no-op span; attributes set on it are dropped."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setitem__(self, key, value):
+        pass
+
+    def update(self, *args, **kwargs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "attrs", "start", "parent", "depth")
+
+    def __init__(self, tracer: "Tracer", name: str, attrs: dict) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        stack = self.tracer.stack
+        self.parent = stack[-1].name if stack else None
+        self.depth = len(stack)
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        self.tracer.stack.pop()
+        event = {
+            "name": self.name,
+            "start_ms": round((self.start - self.tracer.t0) * 1000, 3),
+            "dur_ms": round((end - self.start) * 1000, 3),
+            "depth": self.depth,
+            "parent": self.parent,
+        }
+        if exc_type is not None:
+            event["error"] = exc_type.__name__
+        if self.attrs:
+            event.update(self.attrs)
+        self.tracer.events.append(event)
+        return False
+
+    def __setitem__(self, key, value):
+        self.attrs[key] = value
+
+    def update(self, *args, **kwargs):
+        self.attrs.update(*args, **kwargs)
+
+
+class Tracer:
+    """Span buffer of one episode."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.t0 = time.perf_counter()
+        self.stack: List[_Span] = []
+        self.events: List[dict] = []
+
+    def flush(self) -> None:
+        """Write the episode's spans, replacing the trace of an earlier (relaunched) attempt."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            for event in self.events:
+                f.write(json.dumps(event, default=str) + "\n")
+
+
+_tracer: Optional[Tracer] = None
+
+
+def span(name: str, **attrs):
+    """Context manager timing a block; a no-op unless an episode is traced."""
+    if _tracer is None:
+        return _NULL_SPAN
+    return _Span(_tracer, name, attrs)
+
+
+def traced(name: str):
+    """Decorator form of ``span``."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return fn(*args, **kwargs)
+            with _Span(_tracer, name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def trace_episode(path: Path, **attrs):
+    """Trace everything inside the block into ``path`` (one span ``episode`` around it)."""
+    global _tracer
+    if not tracing_enabled():
+        yield None
+        return
+    previous, _tracer = _tracer, Tracer(path)
+    try:
+        with _Span(_tracer, "episode", attrs):
+            yield _tracer
+    finally:
+        try:
+            _tracer.flush()
+        except OSError as e:
+            logger.warning(f"[tracing] Cannot write {path}: {e}")
+        _tracer = previous
+
+
+# ------------------------------------------------------------------- install
+
+def _wrap_method(cls, method: str, name: str) -> bool:
+    original = getattr(cls, method, None)
+    if original is None or getattr(original, "_acidwave_traced", False):
+        return False
+    wrapper = traced(name)(original)
+    wrapper._acidwave_traced = True
+    setattr(cls, method, wrapper)
+    return True
+
+
+_INSTALLED = False
+
+
+def install() -> bool:
+    """
+    Trace AgentLab episodes and BrowserGym environment calls.
+
+    Returns:
+        True if episodes are traced
+    """
+    global _INSTALLED
+    if _INSTALLED:
+        return True
+    try:
+        from agentlab.experiments.loop import ExpArgs
+    except ImportError as e:
+        logger.debug(f"[tracing] AgentLab not available: {e}")
+        return False
+
+    _original_run = ExpArgs.run
+
+    def run(self, *args, **kwargs):
+        env_args = self.env_args
+        with trace_episode(Path(self.exp_dir) / TRACE_FILE, task_name=env_args.task_name, seed=env_args.task_seed):
+            return _original_run(self, *args, **kwargs)
+
+    ExpArgs.run = run
+
+    try:
+        from browsergym.core.env import BrowserEnv
+        _wrap_method(BrowserEnv, "reset", "env.reset")
+        _wrap_method(BrowserEnv, "step", "env.step")
+        _wrap_method(BrowserEnv, "_get_obs", "env.observation")
+    except ImportError as e:
+        logger.debug(f"[tracing] BrowserGym env not traced: {e}")
+
+    _INSTALLED = True
+    return True
+
+
+# ------------------------------------------------------------------- reports
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    rank = max(1, -(-len(sorted_values) * q // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def trace_files(paths: Iterable[Path]) -> List[Path]:
+    """Trace files from trace files, episode directories and study directories."""
+    found = []
+    for path in map(Path, paths):
+        if path.is_file():
+            found.append(path)
+        elif (path / TRACE_FILE).exists():
+            found.append(path / TRACE_FILE)
+        else:
+            found.extend(sorted(path.glob(f"*/{TRACE_FILE}")))
+    return found
+
+
+def summarize(paths: Iterable[Path]) -> Dict[str, dict]:
+    """
+    Aggregate spans per name.
+
+    Returns:
+        Map span name -> ``count``, ``total_ms``, ``p50_ms``, ``p95_ms``,
+        ``p99_ms``, ``max_ms``, ``errors``
+    """
+    durations: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    for path in trace_files(paths):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                durations.setdefault(event["name"], []).append(event["dur_ms"])
+                if "error" in event:
+                    errors[event["name"]] = errors.get(event["name"], 0) + 1
+    summary = {}
+    for name, values in durations.items():
+        values.sort()
+        summary[name] = {
+            "count": len(values),
+            "total_ms": round(sum(values), 3),
+            "p50_ms": _percentile(values, 50),
+            "p95_ms": _percentile(values, 95),
+            "p99_ms": _percentile(values, 99),
+            "max_ms": values[-1],
+            "errors": errors.get(name, 0),
+        }
+    return summary
@@ -0,0 +1,32 @@
+import copy
+import pickle
+import sys
+import unittest
+from pathlib import Path
+
+# Add the AgentLab root to the path so the benchmark package imports normally
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmark.registration import LazyTaskClass
+
+
+class TestLazyTaskClass(unittest.TestCase):
+    def test_copy_and_pickle_do_not_resolve(self):
+        task_class = LazyTaskClass("json:JSONDecoder")
+
+        for clone in (copy.deepcopy(task_class), pickle.loads(pickle.dumps(task_class))):
+            self.assertEqual(clone.path, task_class.path)
+            self.assertIsNone(clone._cls)
+
+    def test_public_attributes_come_from_the_real_class(self):
+        import json
+
+        task_class = LazyTaskClass("json:JSONDecoder")
+
+        self.assertIs(task_class.decode, json.JSONDecoder.decode)
+        with self.assertRaises(AttributeError):
+            task_class._missing
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import sys
+import unittest
+from pathlib import Path
+
+# Add the AgentLab root to the path so the benchmark package imports normally
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmark.routing import _HASHED_ASSET, RouteInterceptor, get_route_policy
+
+
+class FakeRequest:
+    def __init__(self, url, resource_type="script", method="GET"):
+        self.url = url
+        self.resource_type = resource_type
+        self.method = method
+
+
+class FakeRoute:
+    def __init__(self):
+        self.calls = []
+
+    def fetch(self):
+        self.calls.append("fetch")
+        raise AssertionError("unhashed bundles must not be proxied")
+
+    def fallback(self):
+        self.calls.append("fallback")
+
+
+class TestHashedAsset(unittest.TestCase):
+    def test_fingerprinted_bundles_are_cached(self):
+        for url in [
+            "http://localhost:5173/assets/index-3f9a1c2b.js",
+            "http://localhost:5173/assets/index-BqM1x0aZ.js",
+            "http://localhost:3000/_next/static/chunks/framework-2c79e2a64abdb08b.js",
+            "http://localhost:3000/static/css/main.8c1d2e4f.css",
+        ]:
+            self.assertIsNotNone(_HASHED_ASSET.search(url), url)
+
+    def test_plain_names_are_not_cached(self):
+        for url in [
+            "http://localhost:5173/src/main-component.js",
+            "http://localhost:5173/assets/app-bundle.js",
+            "http://localhost:5173/src/components/player-controls.mjs",
+            "http://localhost:3000/styles/dashboard-layout.css",
+        ]:
+            self.assertIsNone(_HASHED_ASSET.search(url), url)
+
+
+
+class TestRouteInterceptor(unittest.TestCase):
+    def test_unhashed_bundle_passes_through_without_fetch(self):
+        router = RouteInterceptor(get_route_policy("mydrive"), cache=object())
+        route = FakeRoute()
+        router._handle(route, FakeRequest("http://localhost:3000/_next/static/chunks/app/page.js"))
+
+        self.assertEqual(route.calls, ["fallback"])
+        self.assertEqual(router.stats.passed, 1)
+        self.assertEqual(router.stats.cache_misses, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,267 @@
+"""
+Warm Browser Pool
+=================
+
+Reuses Playwright browser processes across episodes within one worker.
+
+BrowserGym launches a new Chromium for every episode (``pw.chromium.launch``
+in ``BrowserEnv.reset``) and closes it in ``BrowserEnv.close``. Startup and
+teardown cost seconds, which dominates short Acidwave tasks.
+
+``install()`` patches ``BrowserType.launch`` so that:
+
+- a launch with the same options (headless, slow_mo, args, ...) as an idle
+  pooled browser returns that browser instead of starting a new process;
+- the returned proxy hands out fresh, isolated contexts as usual, and its
+  ``close()`` closes those contexts and returns the browser to the pool;
+- a browser is recycled after ``max_episodes`` episodes, or when the
+  browser processes of this worker exceed ``max_rss_mb`` (needs psutil);
+- hit/miss/recycle counts and the launch time saved are available from
+  ``pool_stats()`` and logged when the worker exits.
+
+Enable it for experiments with ``ACIDWAVE_BROWSER_POOL=1`` (see
+``patch_agentlab.py``, which also forwards the setting to Ray workers).
+
+Environment variables:
+    ACIDWAVE_BROWSER_POOL=1              enable the pool
+    ACIDWAVE_POOL_MAX_EPISODES=50        episodes per browser before recycling
+    ACIDWAVE_POOL_MAX_RSS_MB=2048        browser memory limit before recycling
+"""
+
+import atexit
+import json
+import logging
+import os
+import time
+
+# 控制调试输出 - 设置环境变量 ACIDWAVE_DEBUG=1 启用详细输出
+ACIDWAVE_DEBUG = os.environ.get('ACIDWAVE_DEBUG', '0') == '1'
+
+logger = logging.getLogger(__name__)
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+
+def debug_print(msg):
+    """条件打印调试信息"""
+    if ACIDWAVE_DEBUG:
+        print(msg)
+
+
+def _browser_rss_mb():
+    """Resident memory of this process's descendants (driver + browsers), in MB."""
+    if not PSUTIL_AVAILABLE:
+        return None
+    total = 0
+    for child in psutil.Process().children(recursive=True):
+        try:
+            total += child.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    return total / (1024 * 1024)
+
+
+class _PooledBrowser:
+    """
+    Proxy returned by the patched ``launch``.
+
+    Behaves like a Playwright ``Browser``; contexts opened through it are
+    closed on ``close()`` and the underlying browser goes back to the pool.
+    """
+
+    def __init__(self, pool, key, entry):
+        self._pool = pool
+        self._key = key
+        self._entry = entry
+        self._contexts = []
+        self._closed = False
+
+    @property
+    def _browser(self):
+        return self._entry["browser"]
+
+    def new_context(self, *args, **kwargs):
+        context = self._browser.new_context(*args, **kwargs)
+        self._contexts.append(context)
+        return context
+
+    def new_page(self, *args, **kwargs):
+        # Browser.new_page owns a private context; keep that semantic
+        return self.new_context(*args, **kwargs).new_page()
+
+    @property
+    def contexts(self):
+        return [c for c in self._contexts if c in self._browser.contexts]
+
+    def close(self, *args, **kwargs):
+        if self._closed:
+            return
+        self._closed = True
+        for context in self._contexts:
+            try:
+                context.close()
+            except Exception as e:
+                debug_print(f"[browser_pool] Context close failed: {e}")
+        self._contexts.clear()
+        self._pool.release(self._key, self._entry)
+
+    def __getattr__(self, name):
+        return getattr(self._browser, name)
+
+
+class BrowserPool:
+    """
+    Per-process pool of launched browsers keyed by launch options.
+
+    Args:
+        max_episodes: Episodes served by one browser before it is recycled
+        max_rss_mb: Recycle when browser processes use more memory than this
+        max_idle: Idle browsers kept per launch-option key
+    """
+
+    def __init__(self, max_episodes=50, max_rss_mb=2048, max_idle=1):
+        self.max_episodes = max_episodes
+        self.max_rss_mb = max_rss_mb
+        self.max_idle = max_idle
+        self._idle = {}
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "recycled": 0,
+            "launch_s": 0.0,
+        }
+
+    @staticmethod
+    def make_key(browser_type, kwargs):
+        return browser_type + ":" + json.dumps(kwargs, sort_keys=True, default=str)
+
+    def acquire(self, key, launcher):
+        """Return an idle browser for ``key`` or launch one with ``launcher()``."""
+        idle = self._idle.get(key, [])
+        while idle:
+            entry = idle.pop()
+            if entry["browser"].is_connected():
+                self.stats["hits"] += 1
+                debug_print(f"[browser_pool] Reusing browser (episode {entry['episodes'] + 1}) in PID {os.getpid()}")
+                return _PooledBrowser(self, key, entry)
+            self.stats["recycled"] += 1
+
+        start = time.monotonic()
+        browser = launcher()
+        self.stats["launch_s"] += time.monotonic() - start
+        self.stats["misses"] += 1
+        debug_print(f"[browser_pool] Launched new browser in PID {os.getpid()}")
+        entry = {"browser": browser, "episodes": 0}
+        return _PooledBrowser(self, key, entry)
+
+    def release(self, key, entry):
+        """Return a browser after an episode, or close it if it is due for recycling."""
+        entry["episodes"] += 1
+        browser = entry["browser"]
+
+        reason = None
+        if not browser.is_connected():
+            reason = "disconnected"
+        elif entry["episodes"] >= self.max_episodes:
+            reason = f"served {entry['episodes']} episodes"
+        elif len(self._idle.get(key, [])) >= self.max_idle:
+            reason = "pool full"
+        else:
+            rss = _browser_rss_mb()
+            if rss is not None and rss > self.max_rss_mb:
+                reason = f"memory {rss:.0f}MB > {self.max_rss_mb}MB"
+
+        if reason:
+            self.stats["recycled"] += 1
+            debug_print(f"[browser_pool] Recycling browser: {reason}")
+            self._close(browser)
+        else:
+            self._idle.setdefault(key, []).append(entry)
+
+    @staticmethod
+    def _close(browser):
+        try:
+            browser.close()
+        except Exception as e:
+            debug_print(f"[browser_pool] Browser close failed: {e}")
+
+    def summary(self):
+        """Hit rate and estimated startup time saved."""
+        served = self.stats["hits"] + self.stats["misses"]
+        avg_launch = self.stats["launch_s"] / self.stats["misses"] if self.stats["misses"] else 0.0
+        return {
+            **self.stats,
+            "launch_s": round(self.stats["launch_s"], 2),
+            "episodes": served,
+            "hit_rate": round(self.stats["hits"] / served, 3) if served else 0.0,
+            "saved_s": round(self.stats["hits"] * avg_launch, 2),
+            "idle": sum(len(v) for v in self._idle.values()),
+        }
+
+    def shutdown(self):
+        """Close every idle browser."""
+        for entries in self._idle.values():
+            for entry in entries:
+                self._close(entry["browser"])
+        self._idle.clear()
+
+
+_POOL = None
+
+
+def pool_stats():
+    """Stats of this process's pool (empty dict if the pool is not installed)."""
+    return _POOL.summary() if _POOL is not None else {}
+
+
+def _report():
+    summary = pool_stats()
+    if summary.get("episodes"):
+        logger.info(f"[browser_pool] PID {os.getpid()}: {summary}")
+        debug_print(f"[browser_pool] PID {os.getpid()}: {summary}")
+    if _POOL is not None:
+        _POOL.shutdown()
+
+
+def install(max_episodes=None, max_rss_mb=None):
+    """
+    Patch Playwright's sync ``BrowserType.launch`` to use a per-process pool.
+
+    Returns:
+        True if the patch is active
+    """
+    global _POOL
+    if _POOL is not None:
+        return True
+
+    try:
+        from playwright.sync_api._generated import BrowserType
+    except ImportError:
+        debug_print("[browser_pool] Playwright not installed, skipping")
+        return False
+
+    if max_episodes is None:
+        max_episodes = int(os.environ.get("ACIDWAVE_POOL_MAX_EPISODES", "50"))
+    if max_rss_mb is None:
+        max_rss_mb = int(os.environ.get("ACIDWAVE_POOL_MAX_RSS_MB", "2048"))
+    if not PSUTIL_AVAILABLE:
+        debug_print("[browser_pool] psutil not installed, memory-based recycling disabled")
+
+    _POOL = BrowserPool(max_episodes=max_episodes, max_rss_mb=max_rss_mb)
+    _original_launch = BrowserType.launch
+
+    def _pooled_launch(self, *args, **kwargs):
+        if args:
+            # Options are keyword-only in Playwright; don't pool unexpected calls
+            return _original_launch(self, *args, **kwargs)
+        key = BrowserPool.make_key(self.name, kwargs)
+        return _POOL.acquire(key, lambda: _original_launch(self, **kwargs))
+
+    BrowserType.launch = _pooled_launch
+    atexit.register(_report)
+    debug_print(f"[browser_pool] Installed (max_episodes={max_episodes}, max_rss_mb={max_rss_mb}) in PID {os.getpid()}")
+    return True
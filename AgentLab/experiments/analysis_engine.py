@@ -0,0 +1,184 @@
+"""
+Analysis Engine
+===============
+
+Every report section of a study from one vectorized pass.
+
+The report scripts used to derive ``task_id``, ``difficulty`` and ``intent``
+with ``Series.apply`` lambdas once per section and walk failures and
+per-task lines with ``iterrows``. Here:
+
+- task metadata is read once from the task files of every namespace
+  (benchmark/registration.py) into a frame;
+- results are enriched with one left merge on ``task_name``;
+- outcome flags are vectorized comparisons, and every grouped metric is a
+  single ``groupby(...).agg``;
+- ``analyze`` returns all sections together (``Analysis``), so the
+  scripts only format.
+
+Example:
+    >>> analysis = analyze(load_study_df(study_dir))
+    >>> analysis.overall["success_rate"]
+    62.5
+    >>> analysis.by_difficulty
+"""
+
+import json
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, Optional
+
+import pandas as pd
+
+SUCCESS_THRESHOLD = 0.8
+PARTIAL_THRESHOLD = 0.3
+DIFFICULTY_ORDER = ["easy", "medium", "hard"]
+
+# Column name of the task in AgentLab result frames, most specific first
+TASK_COLUMNS = ["task_name", "env.task_name", "exp_args.env_args.task_name", "env_name"]
+
+
+@lru_cache(maxsize=None)
+def _task_metadata(namespaces: tuple) -> pd.DataFrame:
+    from benchmark.registration import BENCHMARK_DIR, NAMESPACES
+
+    rows = []
+    for name in namespaces:
+        namespace = NAMESPACES[name]
+        for filename in namespace.task_files:
+            path = BENCHMARK_DIR / name / filename
+            if not path.exists():
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                for task in json.load(f):
+                    rows.append({
+                        "task_name": f"{name}.task_{task['task_id']}",
+                        "task_id": task["task_id"],
+                        "difficulty": task.get("difficulty", "unknown"),
+                        "intent": task.get("intent", "Unknown"),
+                    })
+    # Later files override earlier ones, as in the task loaders
+    return pd.DataFrame(rows, columns=["task_name", "task_id", "difficulty", "intent"]).drop_duplicates(
+        "task_name", keep="last"
+    )
+
+
+def task_metadata(namespaces: Iterable[str] = ("acidwave", "mydrive")) -> pd.DataFrame:
+    """One row per task: ``task_name``, ``task_id``, ``difficulty``, ``intent``."""
+    return _task_metadata(tuple(namespaces)).copy()
+
+
+def enrich(df: pd.DataFrame, metadata: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Add task metadata and outcome columns with one merge.
+
+    Adds ``task_id``, ``difficulty``, ``intent``, ``success``, ``partial``,
+    ``failed``, ``not_run`` and ``outcome``; columns already present in ``df``
+    win. Warehouse rows with status ``incomplete`` (e.g. episodes skipped by
+    the budget) are ``not_run`` and carry none of the other outcome flags.
+    """
+    metadata = task_metadata() if metadata is None else metadata
+    df = df.copy()
+    if "task_name" not in df.columns:
+        source = next((c for c in TASK_COLUMNS if c in df.columns), None)
+        df["task_name"] = df[source] if source else "unknown"
+    new_columns = [c for c in metadata.columns if c == "task_name" or c not in df.columns]
+    df = df.merge(metadata[new_columns], on="task_name", how="left")
+    if "task_id" in new_columns:
+        # Tasks missing from the task files: id from the name, -1 if it has none
+        parsed = pd.to_numeric(df["task_name"].str.extract(r"_(\d+)$")[0], errors="coerce")
+        df["task_id"] = df["task_id"].fillna(parsed).fillna(-1).astype(int)
+    df["difficulty"] = df["difficulty"].fillna("unknown")
+    df["intent"] = df["intent"].fillna("Unknown")
+
+    df["not_run"] = df["status"].eq("incomplete") if "status" in df.columns else False
+    ran = ~df["not_run"]
+    reward = df["cum_reward"].fillna(0.0)
+    df["success"] = (reward > SUCCESS_THRESHOLD) & ran
+    df["partial"] = (reward > PARTIAL_THRESHOLD) & ~df["success"] & ran
+    df["failed"] = (reward <= PARTIAL_THRESHOLD) & ran
+    df["outcome"] = "failed"
+    df.loc[df["partial"], "outcome"] = "partial"
+    df.loc[df["success"], "outcome"] = "success"
+    df.loc[df["not_run"], "outcome"] = "not run"
+    return df
+
+
+@dataclass
+class Analysis:
+    """All report sections of one result set."""
+
+    df: pd.DataFrame
+    overall: Dict[str, float]
+    by_difficulty: pd.DataFrame
+    step_efficiency: pd.DataFrame
+    failures: pd.DataFrame
+    per_task: pd.DataFrame
+
+
+def _ordered(frame: pd.DataFrame) -> pd.DataFrame:
+    """Difficulty rows in easy/medium/hard order, others dropped (as in the reports)."""
+    return frame.reindex([d for d in DIFFICULTY_ORDER if d in frame.index]).reset_index()
+
+
+def analyze(df: pd.DataFrame, metadata: Optional[pd.DataFrame] = None) -> Analysis:
+    """
+    Compute every report section in one pass.
+
+    Args:
+        df: Episode results (warehouse.load_study_df or load_result_df)
+        metadata: Task metadata (default: all task files)
+
+    Episodes that never ran (``not_run``) are left out of every total and
+    section except ``per_task``, and counted in ``overall["not_run"]``.
+    """
+    df = enrich(df, metadata)
+    ran = df[~df["not_run"]]
+    total = len(ran)
+    success_count = int(ran["success"].sum())
+    cost = float(df["cost"].fillna(0.0).sum()) if "cost" in df.columns else 0.0
+    overall = {
+        "total": total,
+        "success": success_count,
+        "partial": int(ran["partial"].sum()),
+        "failed": int(ran["failed"].sum()),
+        "not_run": int(df["not_run"].sum()),
+        "success_rate": success_count / total * 100 if total else 0.0,
+        "avg_reward": float(ran["cum_reward"].mean()) if total else 0.0,
+        "avg_steps": float(ran["n_steps"].mean()) if total else 0.0,
+        "cost": cost,
+        # Spend of the whole study (failures included) per solved task
+        "cost_per_success": cost / success_count if success_count else None,
+    }
+
+    by_difficulty = ran.groupby("difficulty").agg(
+        total=("success", "size"),
+        success=("success", "sum"),
+        success_rate=("success", "mean"),
+        avg_reward=("cum_reward", "mean"),
+        avg_steps=("n_steps", "mean"),
+    )
+    by_difficulty["success_rate"] *= 100
+
+    step_efficiency = ran[ran["success"]].groupby("difficulty")["n_steps"].agg(
+        avg_steps="mean", min_steps="min", max_steps="max", std_steps="std"
+    )
+
+    failure_columns = ["task_id", "task_name", "difficulty", "intent", "cum_reward", "n_steps", "err_msg"]
+    failures = ran.loc[~ran["success"], [c for c in failure_columns if c in df.columns]].rename(
+        columns={"cum_reward": "reward", "n_steps": "steps", "err_msg": "error"}
+    )
+    if "error" not in failures.columns:
+        failures["error"] = None
+    failures["error"] = failures["error"].fillna("")
+
+    per_task = df.sort_values(["task_id", "task_name"], kind="stable")
+
+    return Analysis(
+        df=df,
+        overall=overall,
+        by_difficulty=_ordered(by_difficulty),
+        step_efficiency=_ordered(step_efficiency),
+        failures=failures.reset_index(drop=True),
+        per_task=per_task.reset_index(drop=True),
+    )
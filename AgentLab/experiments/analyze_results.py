@@ -11,18 +11,22 @@
 用法:
     python experiments/analyze_results.py <result_dir>
     python experiments/analyze_results.py results/2025-12-13_18-00-00_*
+    python experiments/analyze_results.py "results/*" --compare   # 多实验对比
 """
 
 import sys
+import glob
 import json
 from pathlib import Path
 import pandas as pd
-from typing import Dict, List, Optional
+from typing import List, Optional
 import argparse
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from analysis_engine import analyze, task_metadata
+
 
 def load_experiment_results(result_dir: Path) -> Optional[pd.DataFrame]:
     """
@@ -35,144 +39,15 @@ def load_experiment_results(result_dir: Path) -> Optional[pd.DataFrame]:
         DataFrame with results or None if not found
     """
     try:
-        from agentlab.analyze import inspect_results
-        df = inspect_results.load_result_df(result_dir)
+        # 增量导入结果仓库，只读取新的或有变化的 episode
+        from warehouse import load_study_df
+        df = load_study_df(result_dir)
         return df
     except Exception as e:
         print(f"❌ 无法加载结果: {e}")
         return None
 
 
-def load_task_metadata(task_ids: List[int]) -> Dict:
-    """
-    加载任务元数据
-    
-    Args:
-        task_ids: 任务ID列表
-        
-    Returns:
-        Dict mapping task_id to task config
-    """
-    from benchmark.acidwave import AcidwaveBenchmark
-    
-    benchmark = AcidwaveBenchmark()
-    task_map = {}
-    
-    for task in benchmark._tasks:
-        task_map[task["task_id"]] = task
-    
-    return task_map
-
-
-def extract_task_id(task_name: str) -> int:
-    """从task_name提取task_id"""
-    try:
-        # Format: acidwave.task_<ID>
-        return int(task_name.split("_")[-1])
-    except:
-        return -1
-
-
-def analyze_by_difficulty(df: pd.DataFrame, task_map: Dict) -> pd.DataFrame:
-    """按难度分组分析"""
-    
-    # Add task metadata
-    df['task_id'] = df['task_name'].apply(extract_task_id)
-    df['difficulty'] = df['task_id'].apply(
-        lambda tid: task_map.get(tid, {}).get('difficulty', 'unknown')
-    )
-    df['intent'] = df['task_id'].apply(
-        lambda tid: task_map.get(tid, {}).get('intent', 'Unknown')
-    )
-    
-    # Calculate success (reward > 0.8)
-    df['success'] = df['cum_reward'] > 0.8
-    
-    # Group by difficulty
-    difficulty_stats = []
-    
-    for diff in ['easy', 'medium', 'hard']:
-        diff_tasks = df[df['difficulty'] == diff]
-        if len(diff_tasks) == 0:
-            continue
-        
-        stats = {
-            'difficulty': diff,
-            'total': len(diff_tasks),
-            'success': diff_tasks['success'].sum(),
-            'success_rate': diff_tasks['success'].mean() * 100,
-            'avg_reward': diff_tasks['cum_reward'].mean(),
-            'avg_steps': diff_tasks['n_steps'].mean(),
-        }
-        difficulty_stats.append(stats)
-    
-    return pd.DataFrame(difficulty_stats)
-
-
-def analyze_failures(df: pd.DataFrame, task_map: Dict) -> List[Dict]:
-    """分析失败任务"""
-    
-    # Add metadata
-    df['task_id'] = df['task_name'].apply(extract_task_id)
-    df['difficulty'] = df['task_id'].apply(
-        lambda tid: task_map.get(tid, {}).get('difficulty', 'unknown')
-    )
-    df['intent'] = df['task_id'].apply(
-        lambda tid: task_map.get(tid, {}).get('intent', 'Unknown')
-    )
-    
-    # Find failures (reward <= 0.8)
-    failures = df[df['cum_reward'] <= 0.8].copy()
-    
-    failure_list = []
-    for _, row in failures.iterrows():
-        failure_list.append({
-            'task_id': row['task_id'],
-            'task_name': row['task_name'],
-            'difficulty': row['difficulty'],
-            'intent': row['intent'],
-            'reward': row['cum_reward'],
-            'steps': row['n_steps'],
-            'error': row.get('err_msg', 'No error message'),
-        })
-    
-    return failure_list
-
-
-def analyze_step_efficiency(df: pd.DataFrame, task_map: Dict) -> pd.DataFrame:
-    """分析步数效率"""
-    
-    df['task_id'] = df['task_name'].apply(extract_task_id)
-    df['difficulty'] = df['task_id'].apply(
-        lambda tid: task_map.get(tid, {}).get('difficulty', 'unknown')
-    )
-    df['success'] = df['cum_reward'] > 0.8
-    
-    # Only analyze successful tasks
-    success_df = df[df['success']].copy()
-    
-    if len(success_df) == 0:
-        return pd.DataFrame()
-    
-    # Group by difficulty
-    step_stats = []
-    for diff in ['easy', 'medium', 'hard']:
-        diff_tasks = success_df[success_df['difficulty'] == diff]
-        if len(diff_tasks) == 0:
-            continue
-        
-        stats = {
-            'difficulty': diff,
-            'avg_steps': diff_tasks['n_steps'].mean(),
-            'min_steps': diff_tasks['n_steps'].min(),
-            'max_steps': diff_tasks['n_steps'].max(),
-            'std_steps': diff_tasks['n_steps'].std(),
-        }
-        step_stats.append(stats)
-    
-    return pd.DataFrame(step_stats)
-
-
 def generate_report(result_dir: Path, output_file: Optional[Path] = None):
     """
     生成完整分析报告
@@ -188,7 +63,7 @@ def generate_report(result_dir: Path, output_file: Optional[Path] = None):
     print(f"\n📁 结果目录: {result_dir}")
     
     # Load results
-    print("\n[1/5] 加载实验数据...")
+    print("\n[1/3] 加载实验数据...")
     df = load_experiment_results(result_dir)
     
     if df is None:
@@ -198,32 +73,24 @@ def generate_report(result_dir: Path, output_file: Optional[Path] = None):
     print(f"   ✅ 加载了 {len(df)} 个任务的结果")
     
     # Load task metadata
-    print("\n[2/5] 加载任务元数据...")
-    task_ids = df['task_name'].apply(extract_task_id).tolist()
-    task_map = load_task_metadata(task_ids)
-    print(f"   ✅ 加载了 {len(task_map)} 个任务的元数据")
-    
-    # Overall statistics
-    print("\n[3/5] 计算整体统计...")
-    total = len(df)
-    success_count = (df['cum_reward'] > 0.8).sum()
-    partial_count = ((df['cum_reward'] > 0.3) & (df['cum_reward'] <= 0.8)).sum()
-    fail_count = (df['cum_reward'] <= 0.3).sum()
-    success_rate = (success_count / total * 100) if total > 0 else 0
-    
-    avg_reward = df['cum_reward'].mean()
-    avg_steps = df['n_steps'].mean()
-    
-    # Difficulty analysis
-    print("\n[4/5] 按难度分析...")
-    difficulty_df = analyze_by_difficulty(df, task_map)
-    
-    # Failure analysis
-    print("\n[5/5] 分析失败任务...")
-    failures = analyze_failures(df, task_map)
-    
-    # Step efficiency
-    step_efficiency_df = analyze_step_efficiency(df, task_map)
+    print("\n[2/3] 加载任务元数据...")
+    metadata = task_metadata()
+    print(f"   ✅ 加载了 {len(metadata)} 个任务的元数据")
+    
+    # 一次合并元数据，所有统计用向量化 groupby 一次算完
+    print("\n[3/3] 计算整体统计、难度分组、步数效率与失败任务...")
+    analysis = analyze(df, metadata)
+    overall = analysis.overall
+    total = overall["total"]
+    success_count = overall["success"]
+    partial_count = overall["partial"]
+    fail_count = overall["failed"]
+    success_rate = overall["success_rate"]
+    avg_reward = overall["avg_reward"]
+    avg_steps = overall["avg_steps"]
+    difficulty_df = analysis.by_difficulty
+    step_efficiency_df = analysis.step_efficiency
+    failures = analysis.failures.to_dict("records")
     
     # ==========================================
     # Generate Report
@@ -244,8 +111,13 @@ def generate_report(result_dir: Path, output_file: Optional[Path] = None):
     add_line(f"成功任务:      {success_count:2d} ({success_rate:5.1f}%)")
     add_line(f"部分完成:      {partial_count:2d}")
     add_line(f"失败任务:      {fail_count:2d}")
+    if overall["not_run"]:
+        add_line(f"未运行:        {overall['not_run']:2d} (不计入统计)")
     add_line(f"平均得分:      {avg_reward:.3f}")
     add_line(f"平均步数:      {avg_steps:.1f}")
+    add_line(f"总成本:        ${overall['cost']:.4f}")
+    if overall["cost_per_success"] is not None:
+        add_line(f"每个成功任务:  ${overall['cost_per_success']:.4f}")
     
     # Difficulty breakdown
     add_line(f"\n📈 按难度分组")
@@ -253,7 +125,7 @@ def generate_report(result_dir: Path, output_file: Optional[Path] = None):
     add_line(f"{'难度':<10} {'总数':<6} {'成功':<6} {'成功率':<10} {'平均分':<10} {'平均步数':<10}")
     add_line("-" * 80)
     
-    for _, row in difficulty_df.iterrows():
+    for row in difficulty_df.to_dict("records"):
         add_line(
             f"{row['difficulty']:<10} "
             f"{row['total']:<6.0f} "
@@ -270,7 +142,7 @@ def generate_report(result_dir: Path, output_file: Optional[Path] = None):
         add_line(f"{'难度':<10} {'平均':<8} {'最少':<8} {'最多':<8} {'标准差':<8}")
         add_line("-" * 80)
         
-        for _, row in step_efficiency_df.iterrows():
+        for row in step_efficiency_df.to_dict("records"):
             add_line(
                 f"{row['difficulty']:<10} "
                 f"{row['avg_steps']:<8.1f} "
@@ -289,7 +161,7 @@ def generate_report(result_dir: Path, output_file: Optional[Path] = None):
             add_line(f"   目标: {failure['intent'][:70]}")
             add_line(f"   得分: {failure['reward']:.3f}")
             add_line(f"   步数: {failure['steps']}")
-            if failure['error'] and failure['error'] != 'No error message':
+            if failure['error']:
                 add_line(f"   错误: {failure['error'][:100]}")
     
     # Recommendations
@@ -348,6 +220,52 @@ def generate_report(result_dir: Path, output_file: Optional[Path] = None):
         print(f"\n✅ 报告已保存到: {default_output}")
 
 
+def generate_comparison(patterns: List[str], output_file: Optional[Path] = None, baseline: Optional[str] = None,
+                        jobs: Optional[int] = None):
+    """
+    对比多个实验 (并行加载, 按任务和种子对齐)
+    
+    Args:
+        patterns: 结果目录或 glob
+        output_file: JSON 汇总输出路径 (默认: results/comparison_summary.json)
+        baseline: 基线配置或模型名 (默认: episode 最多的一组)
+        jobs: 并行加载进程数
+    """
+    from compare_studies import METRICS, compare_studies
+    
+    print("\n" + "="*80)
+    print("ACIDWAVE 多实验对比")
+    print("="*80)
+    
+    summary = compare_studies(patterns, baseline=baseline, max_workers=jobs)
+    print(f"\n📁 {len(summary['studies'])} 个实验, {summary['n_episodes']} 个 episode")
+    if not summary["comparisons"]:
+        print("❌ 没有可对比的结果")
+        return
+    
+    digits = {m: 4 if m == "cost" else 2 for m in METRICS}
+    for grouping, comparison in summary["comparisons"].items():
+        title = "按配置" if grouping == "config" else "按模型"
+        print(f"\n📊 {title}对比 (基线: {comparison['baseline']})")
+        print("-" * 80)
+        header = f"{'组':<32} {'数量':>6} " + " ".join(f"{METRICS[m]:>18}" for m in METRICS)
+        print(header)
+        for group, stats in comparison["groups"].items():
+            print(f"{group:<32} {stats['n_episodes']:>6} " + " ".join(f"{stats[m]:>18.{digits[m]}f}" for m in METRICS))
+        for group, deltas in comparison["deltas"].items():
+            print(f"\n   Δ {group} vs {comparison['baseline']} ({deltas['success']['n_pairs']} 对齐 episode):")
+            for metric, d in deltas.items():
+                lo, hi = d["ci95"]
+                n = digits[metric]
+                print(f"     {METRICS[metric]:<18} {d['delta']:+10.{n}f}  95% CI [{lo:+.{n}f}, {hi:+.{n}f}]")
+    
+    output_file = Path(output_file) if output_file else Path(__file__).parent.parent / "results" / "comparison_summary.json"
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    print(f"\n✅ 对比汇总已保存到: {output_file}")
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="分析Acidwave实验结果 (WebArena风格)",
@@ -360,27 +278,52 @@ def main():
   # 指定输出文件
   python experiments/analyze_results.py results/<dir> -o my_report.txt
   
-  # 分析多个实验 (需要手动运行多次)
-  python experiments/analyze_results.py results/experiment1
-  python experiments/analyze_results.py results/experiment2
+  # 对比多个实验 (并行加载, 输出成功率/步数/token/成本/耗时差异及置信区间)
+  python experiments/analyze_results.py "results/*_full_experiment" results/experiment2 --compare
+  python experiments/analyze_results.py "results/*" --compare --baseline gpt-4o -o comparison.json
         """
     )
     
     parser.add_argument(
-        'result_dir',
+        'result_dirs',
         type=str,
-        help='实验结果目录路径'
+        nargs='+',
+        help='实验结果目录路径 (对比模式下可以是多个目录或 glob)'
     )
     
     parser.add_argument(
         '-o', '--output',
         type=str,
-        help='输出报告文件路径 (默认: <result_dir>/analysis_report.txt)'
+        help='输出报告文件路径 (默认: <result_dir>/analysis_report.txt; 对比模式: results/comparison_summary.json)'
+    )
+    
+    parser.add_argument(
+        '--compare',
+        action='store_true',
+        help='多实验对比模式 (传入多个目录时自动启用)'
+    )
+    
+    parser.add_argument(
+        '--baseline',
+        type=str,
+        help='对比基线: 配置名 (agent@hash) 或模型名'
+    )
+    
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        help='并行加载的进程数 (默认: min(实验数, 8))'
     )
     
     args = parser.parse_args()
     
-    result_dir = Path(args.result_dir)
+    # 引号中的 glob 也展开, 匹配多个目录时进入对比模式
+    expanded = [match for pattern in args.result_dirs for match in (sorted(glob.glob(pattern)) or [pattern])]
+    if args.compare or len(expanded) > 1:
+        generate_comparison(args.result_dirs, args.output, args.baseline, args.jobs)
+        return
+    
+    result_dir = Path(expanded[0])
     
     if not result_dir.exists():
         print(f"❌ 目录不存在: {result_dir}")
@@ -391,6 +334,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
-
-
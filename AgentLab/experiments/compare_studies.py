@@ -0,0 +1,170 @@
+"""
+Study Comparison
+================
+
+Compare agent configurations and models across many studies at once.
+
+- Study directories (or globs) are loaded in parallel in a process pool,
+  each through the results warehouse, so already ingested studies cost a
+  query and new ones are unpickled once.
+- Episodes are aligned by ``(task_name, seed, sub_task_id)``; episodes linked
+  into several studies by ``--resume`` are counted once.
+- For every configuration (agent name + config hash) and every model, the
+  mean success rate, steps, tokens, cost and wall time are compared with a
+  baseline on the aligned episodes only (paired deltas), with 95% bootstrap
+  confidence intervals.
+
+``compare_studies`` returns a JSON-able summary; analyze_results.py prints
+it and writes it to disk.
+
+Example:
+    >>> df = load_studies(expand_study_dirs(["results/*_full_experiment"]))
+    >>> summary = compare(df, by="model_name")
+    >>> summary["deltas"]["gpt-4o-mini"]["success"]
+    {'delta': -12.5, 'ci95': [-25.0, 0.0], 'n_pairs': 16}
+"""
+
+import glob
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from analysis_engine import enrich
+from warehouse import load_study_df
+
+logger = logging.getLogger(__name__)
+
+# Compared metric -> label; success is reported in percent
+METRICS = {
+    "success": "success rate (%)",
+    "n_steps": "steps",
+    "tokens": "tokens",
+    "cost": "cost ($)",
+    "wall_s": "wall time (s)",
+}
+ALIGN_KEYS = ["task_name", "seed", "sub_task_id"]
+
+
+def expand_study_dirs(patterns: Iterable[str]) -> List[Path]:
+    """Study directories from paths and glob patterns, in order, without duplicates."""
+    dirs: Dict[Path, None] = {}
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) or [pattern]
+        for match in matches:
+            path = Path(match)
+            if path.is_dir():
+                dirs.setdefault(path, None)
+            else:
+                logger.warning(f"[compare] Not a study directory: {match}")
+    return list(dirs)
+
+
+def load_studies(study_dirs: List[Path], max_workers: Optional[int] = None) -> pd.DataFrame:
+    """Episodes of all studies, loaded in parallel, with comparison columns added."""
+    if not study_dirs:
+        return pd.DataFrame()
+    with ProcessPoolExecutor(max_workers=max_workers or min(len(study_dirs), 8)) as pool:
+        frames = list(pool.map(load_study_df, study_dirs))
+    df = pd.concat([f for f in frames if len(f)], ignore_index=True) if any(len(f) for f in frames) else pd.DataFrame()
+    if df.empty:
+        return df
+    # Resumed studies link episodes of earlier ones
+    df = df.drop_duplicates("real_dir")
+    df = enrich(df)
+    # Budget-skipped episodes never ran, so they are not failures of either side
+    df = df[~df["not_run"]].copy()
+    df["config"] = df["agent_name"].fillna("agent") + "@" + df["agent"].str[:6]
+    df["model_name"] = df["model_name"].fillna("unknown")
+    df["tokens"] = df["input_tokens"].fillna(0) + df["output_tokens"].fillna(0)
+    df["wall_s"] = df["step_elapsed_s"] + df["agent_elapsed_s"]
+    df["sub_task_id"] = df["sub_task_id"].fillna(-1)
+    return df
+
+
+def bootstrap_ci(deltas: np.ndarray, n_boot: int = 2000, alpha: float = 0.05, seed: int = 0) -> List[float]:
+    """Percentile bootstrap interval of the mean of ``deltas``."""
+    deltas = deltas[~np.isnan(deltas)]
+    if len(deltas) == 0:
+        return [float("nan"), float("nan")]
+    if len(deltas) == 1:
+        return [float(deltas[0])] * 2
+    rng = np.random.default_rng(seed)
+    means = deltas[rng.integers(0, len(deltas), size=(n_boot, len(deltas)))].mean(axis=1)
+    lo, hi = np.quantile(means, [alpha / 2, 1 - alpha / 2])
+    return [float(lo), float(hi)]
+
+
+def compare(df: pd.DataFrame, by: str = "config", baseline: Optional[str] = None, n_boot: int = 2000) -> dict:
+    """
+    Paired comparison of every group against a baseline.
+
+    Args:
+        df: Output of ``load_studies``
+        by: ``"config"`` or ``"model_name"``
+        baseline: Group to compare against (default: the one with most episodes)
+        n_boot: Bootstrap resamples for the confidence intervals
+
+    Returns:
+        ``{"by", "baseline", "groups": {group: {n_episodes, studies, <metric>...}},
+        "deltas": {group: {metric: {delta, ci95, n_pairs}}}}``
+    """
+    values = df[[by, *ALIGN_KEYS]].copy()
+    for metric in METRICS:
+        values[metric] = df[metric].astype(float) * (100.0 if metric == "success" else 1.0)
+
+    counts = df.groupby(by).size()
+    baseline = baseline if baseline is not None else counts.idxmax()
+    if baseline not in counts.index:
+        raise ValueError(f"Baseline {baseline!r} not among {list(counts.index)}")
+
+    means = values.groupby(by)[list(METRICS)].mean()
+    studies = df.groupby(by)["study"].unique()
+    groups = {
+        str(group): {
+            "n_episodes": int(counts[group]),
+            "studies": sorted(studies[group].tolist()),
+            **{metric: float(means.at[group, metric]) for metric in METRICS},
+        }
+        for group in counts.index
+    }
+
+    # One value per (group, task, seed): repeated runs of a group are averaged
+    wide = values.groupby([by, *ALIGN_KEYS])[list(METRICS)].mean().unstack(by)
+    deltas = {}
+    for group in counts.index:
+        if group == baseline:
+            continue
+        deltas[str(group)] = {}
+        for metric in METRICS:
+            paired = (wide[(metric, group)] - wide[(metric, baseline)]).to_numpy(dtype=float)
+            paired = paired[~np.isnan(paired)]
+            deltas[str(group)][metric] = {
+                "delta": float(paired.mean()) if len(paired) else float("nan"),
+                "ci95": bootstrap_ci(paired, n_boot=n_boot),
+                "n_pairs": int(len(paired)),
+            }
+    return {"by": by, "baseline": str(baseline), "groups": groups, "deltas": deltas}
+
+
+def compare_studies(patterns: Iterable[str], by: Iterable[str] = ("config", "model_name"),
+                    baseline: Optional[str] = None, max_workers: Optional[int] = None) -> dict:
+    """Load studies in parallel and compare them by every grouping in ``by``."""
+    study_dirs = expand_study_dirs(patterns)
+    df = load_studies(study_dirs, max_workers=max_workers)
+    summary = {
+        "studies": [str(d) for d in study_dirs],
+        "n_episodes": int(len(df)),
+        "metrics": METRICS,
+        "comparisons": {},
+    }
+    if df.empty:
+        return summary
+    for grouping in by:
+        # A baseline name only applies to the grouping it belongs to
+        group_baseline = baseline if baseline in set(df[grouping]) else None
+        summary["comparisons"][grouping] = compare(df, by=grouping, baseline=group_baseline)
+    return summary
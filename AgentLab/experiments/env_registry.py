@@ -0,0 +1,186 @@
+"""
+Environment Registry
+====================
+
+Run episodes on several backend instances instead of one base URL.
+
+Every task normally targets one backend (``MYDRIVE_BASE_URL`` or the
+``start_url`` in ``test.raw.json``), which caps useful ``n_jobs``. The
+registry lists several instances of a site and hands them to the episodes:
+
+- instances are health-checked concurrently (health.py); failing ones are
+  drained and get no episodes,
+- the healthy ones become a lease pool (benchmark/env_pool.py): each
+  episode leases a free instance in task setup, moves its ``start_url`` onto
+  it (path and query are kept, only scheme/host/port change) and hands it
+  back in teardown, so an instance never runs two episodes at once.
+
+An instance has one database, so a second episode on it would reset or dump
+the first one's state. Leasing is what prevents that; ``lease_urls`` also
+refuses ``n_jobs`` above the number of healthy instances, since extra
+workers could only wait for a free instance.
+
+Instances come from ``--instances`` on the runners or from
+``MYDRIVE_INSTANCES`` / ``ACIDWAVE_INSTANCES`` (comma-separated, e.g.
+``http://localhost:3000,http://localhost:3001``).
+
+Example:
+    >>> registry = EnvRegistry.from_env("mydrive")
+    >>> registry.check_health()
+    >>> pool = EnvPool.create(study_dir / "env_pool", registry.lease_urls(n_jobs=2))
+    >>> registry.summary()
+"""
+
+import logging
+import os
+import sys
+import threading
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import health
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Instance:
+    """One backend instance of a site."""
+
+    url: str
+    healthy: bool = True
+    drained: bool = False
+    failures: int = 0
+    latency_s: Optional[float] = None
+    last_error: str = ""
+
+
+@dataclass
+class EnvRegistry:
+    """
+    Instances of one site and their health.
+
+    Args:
+        site: Site name (for logging and env-var lookup)
+        instances: Registered instances
+        max_failures: Consecutive failed health checks before an instance is drained
+    """
+
+    site: str
+    instances: List[Instance] = field(default_factory=list)
+    max_failures: int = 2
+
+    def __post_init__(self) -> None:
+        self._lock = threading.Lock()
+        self._monitor: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_urls(cls, site: str, urls: List[str]) -> "EnvRegistry":
+        """Build from instance URLs."""
+        return cls(site=site, instances=[Instance(url=url.strip()) for url in urls if url.strip()])
+
+    @classmethod
+    def from_env(cls, site: str) -> Optional["EnvRegistry"]:
+        """Registry from ``<SITE>_INSTANCES``, or None if it is not set."""
+        value = os.environ.get(f"{site.upper()}_INSTANCES")
+        if not value:
+            return None
+        return cls.from_urls(site, value.split(","))
+
+    # ----------------------------------------------------------------- health
+
+    def check_health(self, timeout: float = 5.0, wait_s: float = 0.0) -> List[Instance]:
+        """
+        Probe all instances concurrently; returns the healthy ones.
+
+        Args:
+            timeout: Per-request timeout
+            wait_s: If set, poll with backoff for up to this long for instances still starting
+        """
+        endpoints = [
+            [replace(e, timeout_s=timeout) for e in health.site_endpoints(self.site, i.url) if e.required]
+            for i in self.instances
+        ]
+        flat = [e for group in endpoints for e in group]
+        results = health.wait_ready(flat, wait_s) if wait_s else health.check(flat)
+        for instance, group in zip(self.instances, endpoints):
+            mine, results = results[:len(group)], results[len(group):]
+            failed = [r for r in mine if not r.ok]
+            instance.healthy = not failed
+            if failed:
+                instance.failures += 1
+                instance.last_error = failed[0].error
+            else:
+                instance.failures = 0
+                instance.last_error = ""
+                instance.latency_s = max(r.latency_s for r in mine)
+
+        with self._lock:
+            for instance in self.instances:
+                if not instance.healthy and instance.failures >= self.max_failures and not instance.drained:
+                    instance.drained = True
+                    logger.warning(f"[registry:{self.site}] Draining {instance.url}: {instance.last_error}")
+                elif instance.healthy and instance.drained:
+                    instance.drained = False
+                    logger.info(f"[registry:{self.site}] {instance.url} is healthy again")
+        return self.available()
+
+    def available(self) -> List[Instance]:
+        return [i for i in self.instances if i.healthy and not i.drained]
+
+    def start_monitor(self, interval_s: float = 30.0) -> None:
+        """Re-check health in the background so later placements skip failing instances."""
+        if self._monitor is not None:
+            return
+        self._stop.clear()
+
+        def _loop():
+            while not self._stop.wait(interval_s):
+                self.check_health()
+
+        self._monitor = threading.Thread(target=_loop, name=f"registry-{self.site}", daemon=True)
+        self._monitor.start()
+
+    def stop_monitor(self) -> None:
+        if self._monitor is not None:
+            self._stop.set()
+            self._monitor.join()
+            self._monitor = None
+
+    # ---------------------------------------------------------------- leasing
+
+    def lease_urls(self, n_jobs: int = 1) -> List[str]:
+        """
+        URLs of the healthy instances, for a lease pool (``EnvPool.create``).
+
+        Args:
+            n_jobs: Episodes the study runs at once
+
+        Raises:
+            RuntimeError: No instance is healthy
+            ValueError: ``n_jobs`` exceeds the healthy instances
+        """
+        urls = [i.url for i in self.available()]
+        if not urls:
+            raise RuntimeError(f"No healthy {self.site} instance available")
+        if n_jobs > len(urls):
+            raise ValueError(
+                f"n_jobs={n_jobs} exceeds the {len(urls)} healthy {self.site} instance(s); "
+                f"each instance runs one episode at a time"
+            )
+        return urls
+
+    def summary(self) -> List[dict]:
+        return [
+            {
+                "url": i.url,
+                "healthy": i.healthy,
+                "drained": i.drained,
+                "latency_ms": round(i.latency_s * 1000, 1) if i.latency_s is not None else None,
+            }
+            for i in self.instances
+        ]
@@ -0,0 +1,227 @@
+"""
+Environment Health Checks
+=========================
+
+Concurrent probes, readiness polling and a preflight gate for studies.
+
+- ``probe_all`` checks every endpoint of every environment at once, so a
+  full check takes as long as the slowest endpoint, not their sum.
+- ``wait_ready`` polls each endpoint with exponential backoff (0.1s, 0.2s,
+  0.4s ... capped at ``max_interval_s``, 1s) until it answers or the deadline
+  passes. Bring-up takes as long as the services need, instead of fixed sleeps.
+- ``preflight`` runs before a study dispatches episodes and fails fast
+  (``PreflightError``) when an environment is not up.
+
+Endpoints per site come from ``site_endpoints``; ``configured_endpoints``
+covers every instance listed in ``ACIDWAVE_INSTANCES`` / ``MYDRIVE_INSTANCES``
+(see env_registry.py) or the default URLs.
+
+Example:
+    >>> report = preflight(configured_endpoints(["mydrive"]), deadline_s=30)
+    >>> report["ready"]
+    True
+"""
+
+import asyncio
+import logging
+import os
+import time
+import urllib.error
+import urllib.request
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+from urllib.parse import urljoin
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_URLS = {
+    "acidwave": "http://localhost:5173",
+    "mydrive": "http://localhost:3000",
+}
+
+
+class PreflightError(RuntimeError):
+    """Raised when environments are not ready before a study starts."""
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    """One URL to probe."""
+
+    name: str
+    url: str
+    # Statuses counted as "up"; any answer below 500 by default
+    ok_status: Tuple[int, ...] = tuple(range(200, 500))
+    timeout_s: float = 3.0
+    # Optional endpoints never fail a preflight (e.g. a health route that may not exist)
+    required: bool = True
+
+
+@dataclass
+class ProbeResult:
+    """Outcome of probing one endpoint."""
+
+    endpoint: Endpoint
+    ok: bool
+    status: Optional[int] = None
+    latency_s: Optional[float] = None
+    error: str = ""
+    attempts: int = 1
+    ready_after_s: Optional[float] = None
+
+
+def site_endpoints(site: str, base_url: Optional[str] = None) -> List[Endpoint]:
+    """Endpoints that must answer for a site to be usable."""
+    base_url = base_url or DEFAULT_URLS[site]
+    if site == "acidwave":
+        backend = base_url.replace("5173", "3001")
+        return [
+            Endpoint(f"acidwave frontend {base_url}", base_url, ok_status=(200,)),
+            Endpoint(f"acidwave backend {backend}", urljoin(backend, "/api/health"), ok_status=(200, 404), required=False),
+        ]
+    if site == "mydrive":
+        return [
+            Endpoint(f"mydrive login {base_url}", urljoin(base_url, "/login"), ok_status=(200,)),
+            Endpoint(f"mydrive auth {base_url}", urljoin(base_url, "/api/auth/csrf"), ok_status=(200,)),
+        ]
+    return [Endpoint(f"{site} {base_url}", base_url)]
+
+
+def configured_endpoints(sites: Iterable[str]) -> List[Endpoint]:
+    """Endpoints of every configured instance of the given sites."""
+    endpoints = []
+    for site in sites:
+        instances = os.environ.get(f"{site.upper()}_INSTANCES")
+        if instances:
+            urls = [spec.strip().partition("*")[0] for spec in instances.split(",") if spec.strip()]
+        elif site == "mydrive" and os.environ.get("MYDRIVE_BASE_URL"):
+            urls = [os.environ["MYDRIVE_BASE_URL"]]
+        else:
+            urls = [DEFAULT_URLS.get(site, "")]
+        for url in urls:
+            endpoints.extend(site_endpoints(site, url))
+    return endpoints
+
+
+# ---------------------------------------------------------------------- probes
+
+def _probe_sync(endpoint: Endpoint) -> ProbeResult:
+    start = time.monotonic()
+    try:
+        with urllib.request.urlopen(endpoint.url, timeout=endpoint.timeout_s) as response:
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception as e:
+        return ProbeResult(endpoint, ok=False, latency_s=time.monotonic() - start, error=str(e))
+    latency = time.monotonic() - start
+    ok = status in endpoint.ok_status
+    return ProbeResult(endpoint, ok=ok, status=status, latency_s=latency, error="" if ok else f"HTTP {status}")
+
+
+async def probe(endpoint: Endpoint) -> ProbeResult:
+    """Probe one endpoint without blocking the event loop."""
+    return await asyncio.to_thread(_probe_sync, endpoint)
+
+
+async def probe_all(endpoints: List[Endpoint]) -> List[ProbeResult]:
+    """Probe all endpoints concurrently."""
+    return list(await asyncio.gather(*(probe(e) for e in endpoints)))
+
+
+async def _poll(endpoint: Endpoint, deadline: float, initial_s: float, factor: float, max_interval_s: float) -> ProbeResult:
+    start = time.monotonic()
+    interval = initial_s
+    attempts = 0
+    while True:
+        attempts += 1
+        result = await probe(endpoint)
+        result.attempts = attempts
+        if result.ok:
+            result.ready_after_s = time.monotonic() - start
+            return result
+        if not endpoint.required:
+            # Optional endpoints are informational; never hold up readiness for them
+            return result
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return result
+        await asyncio.sleep(min(interval, remaining))
+        interval = min(interval * factor, max_interval_s)
+
+
+async def wait_ready_async(
+    endpoints: List[Endpoint],
+    deadline_s: float = 60.0,
+    initial_s: float = 0.1,
+    factor: float = 2.0,
+    max_interval_s: float = 1.0,
+) -> List[ProbeResult]:
+    """Poll every endpoint concurrently until it is up or ``deadline_s`` passes."""
+    deadline = time.monotonic() + deadline_s
+    return list(await asyncio.gather(
+        *(_poll(e, deadline, initial_s, factor, max_interval_s) for e in endpoints)
+    ))
+
+
+def check(endpoints: List[Endpoint]) -> List[ProbeResult]:
+    """Synchronous wrapper around ``probe_all``."""
+    return asyncio.run(probe_all(endpoints))
+
+
+def wait_ready(endpoints: List[Endpoint], deadline_s: float = 60.0, **backoff) -> List[ProbeResult]:
+    """Synchronous wrapper around ``wait_ready_async``."""
+    return asyncio.run(wait_ready_async(endpoints, deadline_s, **backoff))
+
+
+def wait_down(endpoints: List[Endpoint], deadline_s: float = 30.0, interval_s: float = 0.1) -> bool:
+    """Poll until no required endpoint answers (e.g. after stopping containers)."""
+    deadline = time.monotonic() + deadline_s
+    required = [e for e in endpoints if e.required]
+    while time.monotonic() < deadline:
+        if not any(r.ok for r in check(required)):
+            return True
+        time.sleep(interval_s)
+    return False
+
+
+# ------------------------------------------------------------------- preflight
+
+def preflight(endpoints: List[Endpoint], deadline_s: float = 30.0, raise_on_failure: bool = True) -> dict:
+    """
+    Gate a study on its environments being ready.
+
+    Args:
+        endpoints: Endpoints to wait for (see ``configured_endpoints``)
+        deadline_s: Total time allowed for all endpoints to come up
+        raise_on_failure: Raise ``PreflightError`` if a required endpoint is down
+
+    Returns:
+        Report dict with ``ready``, ``elapsed_s`` and per-endpoint results
+    """
+    start = time.monotonic()
+    results = wait_ready(endpoints, deadline_s)
+    failed = [r for r in results if not r.ok and r.endpoint.required]
+    report = {
+        "ready": not failed,
+        "elapsed_s": round(time.monotonic() - start, 3),
+        "endpoints": [
+            {
+                "name": r.endpoint.name,
+                "ok": r.ok,
+                "status": r.status,
+                "attempts": r.attempts,
+                "ready_after_s": round(r.ready_after_s, 3) if r.ready_after_s is not None else None,
+                "error": r.error,
+            }
+            for r in results
+        ],
+    }
+    if failed:
+        names = ", ".join(f"{r.endpoint.name} ({r.error})" for r in failed)
+        logger.warning(f"[health] Preflight failed after {report['elapsed_s']}s: {names}")
+        if raise_on_failure:
+            raise PreflightError(f"Environments not ready: {names}")
+    else:
+        logger.info(f"[health] Preflight passed in {report['elapsed_s']}s")
+    return report
@@ -15,14 +15,14 @@
 
 import sys
 import os
-import time
 from pathlib import Path
-import requests
 import argparse
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+import health
+
 
 class AcidwaveEnvironment:
     """Acidwave环境管理器"""
@@ -30,6 +30,25 @@ class AcidwaveEnvironment:
     def __init__(self, frontend_url="http://localhost:5173"):
         self.frontend_url = frontend_url
         self.backend_url = frontend_url.replace("5173", "3001")  # Assumed backend port
+
+    def endpoints(self):
+        """前端和后端的探测端点"""
+        return health.site_endpoints("acidwave", self.frontend_url)
+
+    def wait_until_ready(self, deadline_s=60.0) -> bool:
+        """
+        轮询直到服务就绪 (指数退避, 有截止时间), 代替固定的 sleep
+
+        Returns:
+            前端是否在截止时间前就绪
+        """
+        results = health.wait_ready(self.endpoints(), deadline_s)
+        frontend = results[0]
+        if frontend.ok:
+            print(f"✅ 服务就绪, 用时 {frontend.ready_after_s:.1f}s ({frontend.attempts} 次探测)")
+        else:
+            print(f"⚠️  {deadline_s:.0f}s 内服务未就绪: {frontend.error}")
+        return frontend.ok
     
     def check_status(self) -> dict:
         """
@@ -46,30 +65,24 @@ class AcidwaveEnvironment:
             'backend_url': self.backend_url,
         }
         
-        # Check frontend
-        try:
-            response = requests.get(self.frontend_url, timeout=3)
-            if response.status_code == 200:
-                status['frontend'] = True
-                print(f"✅ Frontend 运行正常: {self.frontend_url}")
-            else:
-                print(f"⚠️  Frontend 返回状态 {response.status_code}")
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Frontend 无法访问: {e}")
-        
-        # Check backend (if API endpoint exists)
-        try:
-            # Try to access a common API endpoint
-            api_endpoint = f"{self.backend_url}/api/health"
-            response = requests.get(api_endpoint, timeout=3)
-            if response.status_code in [200, 404]:  # 404 is ok if health endpoint doesn't exist
-                status['backend'] = True
-                print(f"✅ Backend 运行正常: {self.backend_url}")
-        except requests.exceptions.RequestException:
-            # Backend might not have health endpoint, try to infer from frontend
-            if status['frontend']:
-                status['backend'] = True  # Assume backend is ok if frontend works
-                print(f"ℹ️  Backend 状态未知 (从Frontend推断: 可能正常)")
+        # 前端和后端并发检查
+        frontend, backend = health.check(self.endpoints())
+
+        if frontend.ok:
+            status['frontend'] = True
+            print(f"✅ Frontend 运行正常: {self.frontend_url}")
+        elif frontend.status is not None:
+            print(f"⚠️  Frontend 返回状态 {frontend.status}")
+        else:
+            print(f"❌ Frontend 无法访问: {frontend.error}")
+
+        # Backend might not have health endpoint (404 is ok)
+        if backend.ok:
+            status['backend'] = True
+            print(f"✅ Backend 运行正常: {self.backend_url}")
+        elif status['frontend']:
+            status['backend'] = True  # Assume backend is ok if frontend works
+            print(f"ℹ️  Backend 状态未知 (从Frontend推断: 可能正常)")
         
         # Overall health
         status['healthy'] = status['frontend'] and status['backend']
@@ -130,9 +143,9 @@ class AcidwaveEnvironment:
             print(f"❌ 停止容器失败: {e}")
             return False
         
-        # Wait a bit
+        # Wait until the old frontend is really gone
         print("\n[2/3] 等待清理...")
-        time.sleep(2)
+        health.wait_down(self.endpoints(), deadline_s=10)
         
         # Start containers
         print("\n[3/3] 启动容器...")
@@ -147,7 +160,7 @@ class AcidwaveEnvironment:
             if result.returncode == 0:
                 print("✅ 容器已启动")
                 print("\n等待服务就绪...")
-                time.sleep(5)
+                self.wait_until_ready()
                 
                 # Check status
                 status = self.check_status()
@@ -306,7 +319,7 @@ def main():
             subprocess.run(['docker-compose', 'up', '-d'], check=True)
             print("\n✅ 环境已启动")
             print("等待服务就绪...")
-            time.sleep(5)
+            env.wait_until_ready()
             env.check_status()
         except Exception as e:
             print(f"\n❌ 启动失败: {e}")
@@ -0,0 +1,252 @@
+"""
+Study Resume
+============
+
+Continue interrupted studies instead of paying for finished episodes again.
+
+Every episode is identified by ``(agent config hash, task name, seed,
+sub_task_id)``. ``index_studies`` scans existing study directories and
+classifies each episode from its ``summary_info.json``:
+
+- ``done``: finished without an error message,
+- ``error``: finished with ``err_msg`` (rerun on resume),
+- ``incomplete``: the run died before the summary was written (rerun).
+
+``resume_study`` then drops every ``done`` episode from a freshly made
+study, and copies the finished episode directories into the new study
+directory as hardlinked files (plain copies across filesystems), so the
+merged study loads as one logical result set
+(``inspect_results.load_result_df(study.dir)``). Directory symlinks would be
+cheaper but ``Path.glob`` does not follow them before Python 3.13.
+
+Unpickling ``exp_args.pkl`` for thousands of episodes is slow, so the keys of
+each study are cached in ``<study>/resume_index.json`` and rebuilt only for
+new or changed episode directories.
+
+Usage:
+    python experiments/run_full_experiments.py --resume results/<old_study>
+    python experiments/resume.py status results/<study> [results/<study> ...]
+"""
+
+import dataclasses
+import enum
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "resume_index.json"
+
+EpisodeKey = Tuple[str, str, int, Optional[int]]
+
+# Preference when the same episode exists in several studies
+_RANK = {"done": 2, "error": 1, "incomplete": 0}
+
+
+def _config_repr(value):
+    """
+    JSON-able view of an agent config (dataclasses, dicts, lists, scalars).
+
+    Raises:
+        TypeError: A value has no stable representation; ``repr`` would embed
+            its memory address and give the same config a new hash every run
+    """
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return {f.name: _config_repr(getattr(value, f.name)) for f in dataclasses.fields(value)}
+    if isinstance(value, dict):
+        return {str(k): _config_repr(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_config_repr(v) for v in value]
+    if isinstance(value, enum.Enum):
+        return _config_repr(value.value)
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, os.PathLike):
+        return os.fspath(value)
+    if isinstance(value, type) or (callable(value) and hasattr(value, "__qualname__")):
+        return f"{value.__module__}.{value.__qualname__}"
+    if hasattr(value, "__dict__"):
+        return {"__class__": f"{type(value).__module__}.{type(value).__qualname__}", **_config_repr(vars(value))}
+    raise TypeError(f"[resume] Cannot hash agent config value of type {type(value).__name__}: {value!r}")
+
+
+def agent_hash(agent_args) -> str:
+    """Stable short hash of an agent configuration."""
+    blob = json.dumps(_config_repr(agent_args), sort_keys=True)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()[:12]
+
+
+def episode_key(exp_args) -> EpisodeKey:
+    """Key of an AgentLab ``ExpArgs``."""
+    env_args = exp_args.env_args
+    sub_task_id = (env_args.task_kwargs or {}).get("sub_task_id")
+    return (agent_hash(exp_args.agent_args), env_args.task_name, env_args.task_seed, sub_task_id)
+
+
+@dataclass
+class EpisodeRecord:
+    """One episode directory found on disk."""
+
+    key: EpisodeKey
+    exp_dir: Path
+    status: str
+    mtime: float
+
+
+def _status(exp_dir: Path) -> str:
+    summary = exp_dir / "summary_info.json"
+    if not summary.exists():
+        return "incomplete"
+    try:
+        with open(summary, "r", encoding="utf-8") as f:
+            info = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return "incomplete"
+    return "error" if info.get("err_msg") else "done"
+
+
+def index_study(study_dir: Path) -> List[EpisodeRecord]:
+    """Every episode directory of one study, with its key and status."""
+    cache_path = study_dir / INDEX_FILE
+    cache: Dict[str, dict] = {}
+    if cache_path.exists():
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            cache = {}
+
+    records = []
+    updated = {}
+    for pkl in sorted(study_dir.glob("*/exp_args.pkl")):
+        exp_dir = pkl.parent
+        mtime = pkl.stat().st_mtime
+        entry = cache.get(exp_dir.name)
+        if entry is None or entry["mtime"] != mtime:
+            try:
+                with open(pkl, "rb") as f:
+                    key = episode_key(pickle.load(f))
+            except Exception as e:
+                logger.warning(f"[resume] Cannot read {pkl}: {e}")
+                continue
+            entry = {"key": list(key), "mtime": mtime}
+        updated[exp_dir.name] = entry
+        summary = exp_dir / "summary_info.json"
+        records.append(EpisodeRecord(
+            key=tuple(entry["key"]),
+            exp_dir=exp_dir,
+            status=_status(exp_dir),
+            mtime=summary.stat().st_mtime if summary.exists() else mtime,
+        ))
+
+    if updated != cache:
+        try:
+            with open(cache_path, "w", encoding="utf-8") as f:
+                json.dump(updated, f)
+        except OSError:
+            pass
+    return records
+
+
+def index_studies(study_dirs: Iterable[Path]) -> Dict[EpisodeKey, EpisodeRecord]:
+    """
+    Best record per episode across study directories.
+
+    A finished episode beats an errored one, which beats an incomplete one;
+    among equals the most recent wins.
+    """
+    best: Dict[EpisodeKey, EpisodeRecord] = {}
+    for study_dir in study_dirs:
+        study_dir = Path(study_dir)
+        if not study_dir.is_dir():
+            logger.warning(f"[resume] Not a study directory: {study_dir}")
+            continue
+        for record in index_study(study_dir):
+            current = best.get(record.key)
+            if current is None or (_RANK[record.status], record.mtime) > (_RANK[current.status], current.mtime):
+                best[record.key] = record
+    return best
+
+
+def _link_or_copy(src: str, dst: str) -> None:
+    try:
+        os.link(src, dst)
+    except OSError:
+        # Across filesystems, or without hardlink support
+        shutil.copy2(src, dst)
+
+
+def _link(src: Path, dst: Path) -> None:
+    """Materialize ``src`` as a real directory at ``dst`` whose files are hardlinks."""
+    if dst.exists() or dst.is_symlink():
+        return
+    shutil.copytree(src, dst, copy_function=_link_or_copy)
+
+
+def resume_study(study, previous_dirs: Iterable[Path]) -> dict:
+    """
+    Drop already finished episodes from ``study`` and merge their results in.
+
+    Args:
+        study: Study from ``make_study`` (``exp_args_list`` is filtered in place)
+        previous_dirs: Study directories of earlier, interrupted runs
+
+    Returns:
+        Counts of total, reused, rerun-after-error and pending episodes
+    """
+    index = index_studies(previous_dirs)
+    study_dir = Path(study.dir)
+    study_dir.mkdir(parents=True, exist_ok=True)
+
+    pending = []
+    reused = rerun_errors = 0
+    for exp_args in study.exp_args_list:
+        record = index.get(episode_key(exp_args))
+        if record is not None and record.status == "done":
+            _link(record.exp_dir, study_dir / record.exp_dir.name)
+            reused += 1
+            continue
+        if record is not None and record.status == "error":
+            rerun_errors += 1
+        pending.append(exp_args)
+
+    report = {
+        "total": len(study.exp_args_list),
+        "reused": reused,
+        "rerun_errors": rerun_errors,
+        "pending": len(pending),
+    }
+    study.exp_args_list = pending
+    with open(study_dir / "resumed_from.json", "w", encoding="utf-8") as f:
+        json.dump({"previous": [str(Path(d).resolve()) for d in previous_dirs], **report}, f, indent=2)
+    logger.info(f"[resume] {report}")
+    return report
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Show which episodes of existing studies are finished")
+    parser.add_argument("command", choices=["status"])
+    parser.add_argument("study_dirs", nargs="+", type=Path)
+    args = parser.parse_args()
+
+    index = index_studies(args.study_dirs)
+    counts = {"done": 0, "error": 0, "incomplete": 0}
+    for record in index.values():
+        counts[record.status] += 1
+    print(f"\n📊 Episodes: {len(index)} (done {counts['done']}, error {counts['error']}, incomplete {counts['incomplete']})")
+    for key, record in sorted(index.items(), key=lambda kv: kv[0][1:3]):
+        if record.status != "done":
+            sub = f" sub_task {key[3]}" if key[3] is not None else ""
+            print(f"   {record.status:10s} {key[1]} seed {key[2]}{sub} [{key[0]}] {record.exp_dir.name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -26,6 +26,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 # CRITICAL: Patch AgentLab to support Acidwave tasks in Ray workers
 import patch_agentlab
+from local_executor import select_backend
 
 from benchmark.acidwave import AcidwaveBenchmark
 
@@ -35,20 +36,30 @@ if not os.getenv("OPENAI_API_KEY"):
     print("Please set the environment variable or create a .env file")
     sys.exit(1)
 
-from agentlab.experiments.study import make_study
 from agentlab.experiments.loop import EnvArgs
 from agents.acidwave_agent import ACIDWAVE_AGENT, ACIDWAVE_REASONING_AGENT
 
 
+def replays_offline(task: dict) -> bool:
+    """True if the task is answered from replay archives (``ACIDWAVE_REPLAY`` overrides the task config)."""
+    mode = os.environ.get("ACIDWAVE_REPLAY") or (task.get("replay") or {}).get("mode", "off")
+    return mode.lower() == "replay"
+
+
 def run_full_experiments(
     task_ids=None,
     difficulty=None,
     agent=None,
     headless=True,
-    slow_mo=100,
+    slow_mo=None,
     max_steps=30,
     n_jobs=1,
     quiet=False,
+    instances=None,
+    preflight_deadline=30.0,
+    resume=None,
+    max_cost=None,
+    max_tokens=None,
 ):
     """
     Run complete Acidwave experiments
@@ -58,10 +69,15 @@ def run_full_experiments(
         difficulty: Filter by difficulty ("easy", "medium", "hard")
         agent: Agent to use (default: ACIDWAVE_AGENT)
         headless: Whether to run in headless mode
-        slow_mo: Browser operation delay (ms)
+        slow_mo: Browser operation delay (ms); None uses the task's pacing profile
         max_steps: Maximum steps per task
         n_jobs: Number of parallel tasks
         quiet: Quiet mode, reduce terminal output
+        instances: Acidwave instances; each episode leases a free one (default: ACIDWAVE_INSTANCES)
+        preflight_deadline: Seconds to wait for Acidwave to answer before giving up
+        resume: Earlier study directories; their finished episodes are reused
+        max_cost: Stop starting episodes once the study spent this many USD
+        max_tokens: Stop starting episodes once the study used this many tokens
     """
     def log(msg="", level="info"):
         """Conditional print function"""
@@ -112,7 +128,7 @@ def run_full_experiments(
     # Configure browser settings
     log(f"\n🖥️  Browser Configuration:")
     log(f"   Display Mode: {'Headless' if headless else 'Visual'}")
-    log(f"   Operation Delay: {slow_mo}ms")
+    log(f"   Operation Delay: {f'{slow_mo}ms' if slow_mo is not None else 'task pacing profile'}")
     log(f"   Max Steps: {max_steps}")
     log(f"   Parallel Tasks: {n_jobs}")
     
@@ -136,6 +152,20 @@ def run_full_experiments(
             custom_env_args_list.append(custom_env_arg)
         
         benchmark.env_args_list = custom_env_args_list
+
+        # Replayed episodes never reach a backend, so only live ones need instances
+        live_tasks = {f"acidwave.task_{t['task_id']}" for t in benchmark if not replays_offline(t)}
+
+        # Run episodes on several Acidwave instances, one episode per instance at a time
+        from env_registry import EnvRegistry
+        registry = EnvRegistry.from_urls("acidwave", instances) if instances else EnvRegistry.from_env("acidwave")
+        if registry is not None and not live_tasks:
+            log("   Instances: not used, every task replays from its archive")
+            registry = None
+        if registry is not None:
+            healthy = registry.check_health(wait_s=preflight_deadline)
+            lease_urls = registry.lease_urls(n_jobs)
+            log(f"   Instances: {len(healthy)}/{len(registry.instances)} healthy, leased per episode")
         
         # Create study
         suffix = f"full_experiment"
@@ -144,6 +174,8 @@ def run_full_experiments(
         if task_ids and len(task_ids) < 16:
             suffix += f"_tasks{len(task_ids)}"
         
+        # Study machinery (Ray, pandas) is only needed once a study is built
+        from agentlab.experiments.study import make_study
         study = make_study(
             agent_args=[agent],
             benchmark=benchmark,
@@ -152,6 +184,11 @@ def run_full_experiments(
         )
         log(f"   Experiment name: {study.name}")
         log(f"   Experiment directory: {study.dir}")
+        if resume:
+            from resume import resume_study
+            report = resume_study(study, resume)
+            log(f"   Resuming: {report['reused']}/{report['total']} episodes already done, "
+                    f"{report['pending']} to run ({report['rerun_errors']} after errors)")
         
     except Exception as e:
         print(f"   ❌ Cannot create experiment: {e}")  # Always show errors
@@ -159,149 +196,135 @@ def run_full_experiments(
         traceback.print_exc()
         sys.exit(1)
     
-    # Check Acidwave is running
-    # log("\n[3/6] Checking Acidwave environment...")
-    # import requests
-    # try:
-    #     response = requests.get("http://localhost:5173", timeout=3)
-    #     if response.status_code == 200:
-    #         log("   ✅ Acidwave frontend running normally")
-    #     else:
-    #         log(f"   ⚠️  Frontend returned status {response.status_code}")
-    # except requests.exceptions.RequestException:
-    #     print("   ❌ Cannot connect to Acidwave!")  # Always show errors
-    #     print("   Please start first: docker-compose up -d")
-    #     response = input("\n   Continue? (y/n): ")
-    #     if response.lower() != 'y':
-    #         sys.exit(1)
+    # Check Acidwave is running (concurrent probes, polled with backoff)
+    log("\n[3/6] Checking Acidwave environment...")
+    import health
+    if not live_tasks:
+        log("   ⏭️  Skipped: every task replays from recorded archives")
+    else:
+        if registry is not None:
+            endpoints = [e for i in registry.available() for e in health.site_endpoints("acidwave", i.url)]
+        else:
+            start_urls = {
+                env_arg.task_kwargs.get("start_url") for env_arg in benchmark.env_args_list
+                if env_arg.task_name in live_tasks
+            }
+            endpoints = [e for url in sorted(u for u in start_urls if u) for e in health.site_endpoints("acidwave", url)]
+        try:
+            report = health.preflight(endpoints, deadline_s=preflight_deadline)
+            log(f"   ✅ Acidwave ready ({report['elapsed_s']}s)")
+        except health.PreflightError as e:
+            print(f"   ❌ {e}")  # Always show errors
+            print("   Please start first: docker-compose up -d")
+            sys.exit(1)
     
     # Run experiments
+    # Longest-expected-first dispatch, with an ETA from past durations
+    from scheduler import DurationModel, EtaMonitor, schedule_study
+    difficulty_by_task = {f"acidwave.task_{t['task_id']}": t['difficulty'] for t in benchmark}
+    plan = schedule_study(study, DurationModel.from_history(difficulty=difficulty_by_task), n_jobs)
+    
     log("\n[4/6] Running experiments...")
-    log(f"   This may take {len(benchmark) * 2}-{len(benchmark) * 5} minutes...")
+    log(f"   Estimated duration: ~{plan['makespan_s'] / 60:.1f} minutes ({n_jobs} parallel jobs, "
+        f"{plan['history_samples']} past episodes)")
     
     if not headless and not quiet:
         log("\n   💡 Browser window will open, you can watch the agent's actions")
     
+    # Episodes lease their instance in task setup
+    from benchmark.env_pool import POOL_ENV, EnvPool, no_reset
+    pool = None
+    if registry is not None:
+        pool = EnvPool.create(Path(study.dir) / "env_pool", lease_urls)
+        pool.start(no_reset)
+        pool.wait_ready(min_ready=len(lease_urls))
+        os.environ[POOL_ENV] = str(pool.pool_dir)
+
+    # Live token/cost ledger shared by all workers, with the study's caps
+    from benchmark.budget import BUDGET_ENV, Budget
+    budget = Budget.create(Path(study.dir) / "budget", max_cost=max_cost, max_tokens=max_tokens)
+    os.environ[BUDGET_ENV] = str(budget.budget_dir)
+    # Prompt blocks repeated across steps and episodes are written once per study (AcidwaveAgent only)
+    from message_store import STORE_ENV
+    os.environ[STORE_ENV] = str(Path(study.dir) / "message_store")
+    if max_cost is not None or max_tokens is not None:
+        log(f"   Budget caps: max_cost={max_cost} USD, max_tokens={max_tokens} (None = unlimited)")
+    
     try:
-        study.run(n_jobs=n_jobs)
+        if study.exp_args_list:
+            with EtaMonitor(study.dir, plan, n_jobs, log=log, budget=budget):
+                study.run(n_jobs=n_jobs, parallel_backend=select_backend())
         log("   ✅ Experiment completed!")
     except Exception as e:
         print(f"   ❌ Experiment failed: {e}")  # Always show errors
         print(f"\n   View logs: {study.dir}")
         sys.exit(1)
+    finally:
+        if pool is not None:
+            pool.stop()
+            os.environ.pop(POOL_ENV, None)
+            log(f"   Instance lease metrics: {pool.metrics()}")
+        os.environ.pop(BUDGET_ENV, None)
+        os.environ.pop(STORE_ENV, None)
+        spent = budget.totals()
+        print(f"   💰 Spent ${spent['cost']:.4f}, {spent['tokens']} tokens "
+              f"({spent['cached_input_tokens']} cached prompt tokens)")
+        if spent["skipped"]:
+            print(f"   ⚠️  Budget reached: {spent['skipped']} episode(s) not started, run them with --resume {study.dir}")
     
     # Analyze results
     log("\n[5/6] Analyzing results...")
-    from agentlab.analyze import inspect_results
+    from analysis_engine import analyze
+    from warehouse import load_study_df
     
     summary_file = None  # Initialize to avoid UnboundLocalError
     
     try:
-        result_df = inspect_results.load_result_df(study.dir)
-
-        # Enrich with difficulty if missing
-        if "difficulty" not in result_df.columns:
-            difficulty_map = {
-                f"acidwave.task_{t['task_id']}": t.get("difficulty", "unknown")
-                for t in benchmark
-            }
+        # Ingests episodes only (the report never reads steps); reruns only read new episodes
+        result_df = load_study_df(study.dir)
 
-            # Try to find a task identifier column
-            task_col = None
-            for candidate in ["task_name", "env_name", "task", "env_id"]:
-                if candidate in result_df.columns:
-                    task_col = candidate
-                    break
-
-            if task_col:
-                result_df["difficulty"] = result_df[task_col].map(
-                    lambda tn: difficulty_map.get(tn, "unknown")
-                )
-            else:
-                # Fallback: fill with unknown to avoid KeyError in downstream analysis
-                result_df["difficulty"] = "unknown"
+        # One metadata merge and vectorized groupbys for every section below
+        analysis = analyze(result_df)
+        result_df = analysis.df
+        overall = analysis.overall
         
         log("\n" + "="*80)
         log("Experiment Results")
         log("="*80)
         
         # Overall metrics
-        total = len(result_df)
-        success_count = (result_df["cum_reward"] > 0.8).sum()
-        partial_count = ((result_df["cum_reward"] > 0.3) & 
-                        (result_df["cum_reward"] <= 0.8)).sum()
-        fail_count = (result_df["cum_reward"] <= 0.3).sum()
-        
-        success_rate = (success_count / total * 100) if total > 0 else 0
+        total = overall["total"]
+        success_count = overall["success"]
+        partial_count = overall["partial"]
+        fail_count = overall["failed"]
+        success_rate = overall["success_rate"]
         
         # Always show key results
         print(f"\n📊 Overall Performance:")
         print(f"   Success: {success_count:2d} / {total} ({success_rate:5.1f}%)")
         print(f"   Partial: {partial_count:2d} / {total}")
         print(f"   Failed: {fail_count:2d} / {total}")
+        if overall["not_run"]:
+            print(f"   Not run: {overall['not_run']:2d} (excluded from the totals)")
+        if overall["cost_per_success"] is not None:
+            print(f"   Cost per successful task: ${overall['cost_per_success']:.4f}")
         
         # By difficulty
-        if not quiet and ("difficulty" in result_df.columns or len(benchmark._tasks) > 0):
+        if not quiet and len(analysis.by_difficulty) > 0:
             print(f"\n📈 Analysis by Difficulty:")
-            
-            # Add difficulty to results - check for task_name column
-            if 'task_name' in result_df.columns:
-                task_difficulty = {
-                    f"acidwave.task_{t['task_id']}": t['difficulty']
-                    for t in benchmark._tasks
-                }
-                result_df['difficulty'] = result_df['task_name'].map(task_difficulty)
-            elif 'exp_args.env_args.task_name' in result_df.columns:
-                # Alternative column name
-                task_difficulty = {
-                    f"acidwave.task_{t['task_id']}": t['difficulty']
-                    for t in benchmark._tasks
-                }
-                result_df['difficulty'] = result_df['exp_args.env_args.task_name'].map(task_difficulty)
-            
-            for diff in ["easy", "medium", "hard"]:
-                diff_tasks = result_df[result_df['difficulty'] == diff]
-                if len(diff_tasks) > 0:
-                    diff_success = (diff_tasks["cum_reward"] > 0.8).sum()
-                    diff_total = len(diff_tasks)
-                    diff_rate = (diff_success / diff_total * 100) if diff_total > 0 else 0
-                    print(f"   {diff:6s}: {diff_success:2d}/{diff_total:2d} ({diff_rate:5.1f}%)")
+            for row in analysis.by_difficulty.to_dict("records"):
+                print(f"   {row['difficulty']:6s}: {row['success']:2d}/{row['total']:2d} ({row['success_rate']:5.1f}%)")
         
         # Per-task details
         if not quiet:
             print(f"\n📝 Task Details:")
-            
-            # Find the task name column
-            task_col = None
-            for col in ['task_name', 'exp_args.env_args.task_name']:
-                if col in result_df.columns:
-                    task_col = col
-                    break
-            
-            for _, row in result_df.iterrows():
-                if task_col:
-                    task_name = row.get(task_col, "Unknown")
-                else:
-                    task_name = "Unknown"
-                    
-                task_id = task_name.split("_")[-1] if "_" in task_name else "?"
-                reward = row.get("cum_reward", 0)
-                steps = row.get("n_steps", 0)
-                error = row.get("err_msg", "")
-                
-                # Status icon
-                if reward > 0.8:
-                    status = "✅"
-                elif reward > 0.3:
-                    status = "🔶"
-                else:
-                    status = "❌"
-                
-                # Get task difficulty
-                diff = row.get("difficulty", "?")
-                
-                print(f"   {status} Task {task_id} ({diff:6s}): Score={reward:.2f}, Steps={steps}")
-                if error and reward <= 0.8:
+            status_icon = {"success": "✅", "partial": "🔶", "failed": "❌", "not run": "⏸️"}
+            for row in analysis.per_task.to_dict("records"):
+                reward = row.get("cum_reward") or 0
+                print(f"   {status_icon[row['outcome']]} Task {row['task_id']} ({row['difficulty']:6s}): "
+                      f"Score={reward:.2f}, Steps={row.get('n_steps', 0)}")
+                error = row.get("err_msg")
+                if error and not row["success"]:
                     print(f"      Error: {error[:70]}")
         
         # Save summary
@@ -318,7 +341,13 @@ def run_full_experiments(
             f.write(f"Tasks: {total}\n\n")
             f.write(f"Success Rate: {success_rate:.1f}% ({success_count}/{total})\n")
             f.write(f"Partial: {partial_count}/{total}\n")
-            f.write(f"Failed: {fail_count}/{total}\n\n")
+            f.write(f"Failed: {fail_count}/{total}\n")
+            if overall["not_run"]:
+                f.write(f"Not run: {overall['not_run']}\n")
+            f.write(f"Cost: ${overall['cost']:.4f}\n")
+            if overall["cost_per_success"] is not None:
+                f.write(f"Cost per successful task: ${overall['cost_per_success']:.4f}\n")
+            f.write("\n")
             f.write("="*80 + "\n")
             f.write("Detailed Results\n")
             f.write("="*80 + "\n\n")
@@ -398,6 +427,9 @@ Examples:
   
   # Parallel execution (requires sufficient resources)
   python experiments/run_full_experiments.py --n-jobs 3
+  
+  # Unattended run capped at $5 (remaining episodes: --resume)
+  python experiments/run_full_experiments.py --n-jobs 3 --max-cost 5
         """
     )
     
@@ -438,8 +470,8 @@ Examples:
     parser.add_argument(
         '--slow-mo',
         type=int,
-        default=100,
-        help='Browser operation delay (ms, default: 100)'
+        default=None,
+        help='Browser operation delay (ms, default: task pacing profile)'
     )
     
     parser.add_argument(
@@ -456,6 +488,31 @@ Examples:
         help='Number of parallel tasks (default: 1, sequential execution)'
     )
     
+    parser.add_argument(
+        '--instances',
+        nargs='+',
+        help='Acidwave instances; each episode leases a free healthy one'
+    )
+    
+    parser.add_argument(
+        '--resume',
+        nargs='+',
+        metavar='STUDY_DIR',
+        help='Resume interrupted studies: only run missing or errored episodes'
+    )
+    
+    parser.add_argument(
+        '--max-cost',
+        type=float,
+        help='Stop starting new episodes once the study spent this many USD'
+    )
+    
+    parser.add_argument(
+        '--max-tokens',
+        type=int,
+        help='Stop starting new episodes once the study used this many tokens'
+    )
+    
     parser.add_argument(
         '--quiet',
         action='store_true',
@@ -491,6 +548,10 @@ Examples:
         max_steps=args.max_steps,
         n_jobs=args.n_jobs,
         quiet=args.quiet,
+        instances=args.instances,
+        resume=args.resume,
+        max_cost=args.max_cost,
+        max_tokens=args.max_tokens,
     )
 
 
@@ -4,6 +4,10 @@ Run MyDrive Composite Experiments (Multi-Agent)
 
 Execute MyDrive task 102 (multi-agent) using AgentLab's infrastructure
 with a dedicated runner defaulting to n_jobs=2.
+
+With --coordinated, each composite task runs as one coordinated episode
+(single reset, concurrent sub-agents, event-based waits, one validation)
+via benchmark.mydrive.composite.CompositeEpisodeRunner.
 """
 
 import os
@@ -22,6 +26,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 # CRITICAL: Patch AgentLab to support MyDrive tasks
 import patch_agentlab
+from local_executor import select_backend
 
 from benchmark.mydrive.benchmark import MyDriveBenchmark
 
@@ -30,18 +35,22 @@ if not os.getenv("OPENAI_API_KEY") and not os.getenv("ANTHROPIC_API_KEY"):
     print("❌ Error: No API keys found")
     sys.exit(1)
 
-from agentlab.experiments.study import make_study
 from agentlab.experiments.loop import EnvArgs
 from agents.acidwave_agent import ACIDWAVE_AGENT
 
 def run_composite_experiments(
     headless=True,
-    slow_mo=3000,
+    slow_mo=None,
     max_steps=30,
     n_jobs=2,
+    resume=None,
 ):
     """
     Run MyDrive composite experiments
+
+    slow_mo defaults to None so the browser uses the task's pacing profile
+    (readiness waits in setup) instead of a fixed per-operation delay.
+    resume lists earlier study directories whose finished episodes are reused.
     """
     print("\n" + "="*80)
     print("MyDrive Composite Experiment Runner (Multi-Agent)")
@@ -104,6 +113,8 @@ def run_composite_experiments(
         
         benchmark.env_args_list = custom_env_args_list
         
+        # Study machinery (Ray, pandas) is only needed once a study is built
+        from agentlab.experiments.study import make_study
         study = make_study(
             agent_args=[agent],
             benchmark=benchmark,
@@ -111,6 +122,11 @@ def run_composite_experiments(
             comment=f"MyDrive Composite: {len(benchmark)} tasks",
         )
         print(f"   Experiment directory: {study.dir}")
+        if resume:
+            from resume import resume_study
+            report = resume_study(study, resume)
+            print(f"   Resuming: {report['reused']}/{report['total']} episodes already done, "
+                      f"{report['pending']} to run ({report['rerun_errors']} after errors)")
         
     except Exception as e:
         print(f"   ❌ Cannot create experiment: {e}")
@@ -122,7 +138,8 @@ def run_composite_experiments(
     print("\n[4/6] Running composite experiments...")
     
     try:
-        study.run(n_jobs=n_jobs)
+        if study.exp_args_list:
+            study.run(n_jobs=n_jobs, parallel_backend=select_backend())
         print("   ✅ Composite Experiment completed!")
     except Exception as e:
         print(f"   ❌ Experiment failed: {e}")
@@ -131,17 +148,86 @@ def run_composite_experiments(
     print(f"\n   Results saved to: {study.dir}")
 
 
+def run_coordinated_composite(
+    headless=True,
+    slow_mo=None,
+    max_steps=30,
+    resume=None,
+):
+    """
+    Run each composite task as one coordinated multi-agent episode
+
+    resume: an earlier coordinated result dir; tasks that finished there
+    without sub-agent errors are skipped and new results go to the same dir.
+    """
+    import json
+    from datetime import datetime
+    from benchmark.mydrive.composite import CompositeEpisodeRunner
+
+    print("\n" + "="*80)
+    print("MyDrive Composite Episode Runner (Coordinated)")
+    print("="*80)
+
+    benchmark = MyDriveBenchmark(task_file="test_composite.raw.json", headless=headless, max_steps=max_steps)
+    if resume:
+        exp_root = Path(resume)
+    else:
+        exp_root = Path(__file__).parent.parent / "results" / f"{datetime.now():%Y-%m-%d_%H-%M-%S}_mydrive-composite-coordinated"
+
+    all_success = True
+    for task in benchmark:
+        previous = exp_root / f"task_{task['task_id']}" / "composite_result.json"
+        if resume and previous.exists():
+            with open(previous, "r", encoding="utf-8") as f:
+                outcome = json.load(f)
+            if not any(sub.get("err_msg") for sub in outcome["sub_agents"]):
+                all_success &= outcome["success"]
+                print(f"\n   ⏭️  Task {task['task_id']} already finished (success={outcome['success']}), skipping")
+                continue
+        print(f"\n   Running composite task {task['task_id']}...")
+        runner = CompositeEpisodeRunner(
+            task_id=task["task_id"],
+            agent_args=ACIDWAVE_AGENT,
+            exp_root=exp_root / f"task_{task['task_id']}",
+            max_steps=max_steps,
+            headless=headless,
+            slow_mo=slow_mo,
+        )
+        outcome = runner.run()
+        all_success &= outcome["success"]
+        status = "✅" if outcome["success"] else "❌"
+        print(f"   {status} Task {task['task_id']}: steps={outcome['n_steps']}, elapsed={outcome['elapsed_s']}s")
+        for sub in outcome["sub_agents"]:
+            print(f"      - {sub['agent']}: steps={sub['n_steps']}, blocked={sub['blocked_s']:.1f}s, {sub.get('message') or sub.get('err_msg')}")
+
+    print(f"\n   Results saved to: {exp_root}")
+    return all_success
+
+
 def main():
     import argparse
     parser = argparse.ArgumentParser(description="Run MyDrive Composite Experiments")
     parser.add_argument('--no-headless', action='store_true', help='Show browser window')
     parser.add_argument('--n-jobs', type=int, default=2, help='Number of parallel jobs (default: 2)')
+    parser.add_argument('--slow-mo', type=int, default=None, help='Browser delay (ms, default: task pacing profile)')
+    parser.add_argument('--resume', nargs='+', metavar='DIR', help='Resume: reuse finished episodes (coordinated mode: one earlier result dir)')
+    parser.add_argument('--coordinated', action='store_true', help='Run sub-agents as one coordinated episode (single reset, event waits)')
     
     args = parser.parse_args()
     
+    if args.coordinated:
+        success = run_coordinated_composite(
+            headless=not args.no_headless,
+            slow_mo=args.slow_mo,
+            resume=args.resume[0] if args.resume else None,
+        )
+        sys.exit(0 if success else 1)
+    
     run_composite_experiments(
         headless=not args.no_headless,
-        n_jobs=args.n_jobs
+        slow_mo=args.slow_mo,
+        n_jobs=args.n_jobs,
+        resume=args.resume,
     )
 
 if __name__ == "__main__":
@@ -21,6 +21,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 # CRITICAL: Patch AgentLab to support MyDrive tasks
 import patch_agentlab
+from local_executor import select_backend
 
 from benchmark.mydrive.benchmark import MyDriveBenchmark
 
@@ -30,7 +31,6 @@ if not os.getenv("OPENAI_API_KEY") and not os.getenv("ANTHROPIC_API_KEY"):
     print("Please set the environment variable or create a .env file")
     sys.exit(1)
 
-from agentlab.experiments.study import make_study
 from agentlab.experiments.loop import EnvArgs
 from agents.acidwave_agent import (
     ACIDWAVE_AGENT, 
@@ -43,14 +43,29 @@ def run_mydrive_experiments(
     task_ids=None,
     models=None,
     headless=True,
-    slow_mo=100,
+    slow_mo=None,
     max_steps=30,
     n_jobs=1,
     quiet=False,
     viewport=None,
+    pool_urls=None,
+    instances=None,
+    preflight_deadline=30.0,
+    resume=None,
+    max_cost=None,
+    max_tokens=None,
 ):
     """
     Run MyDrive experiments
+
+    pool_urls: MyDrive instances kept pre-reset in a standby pool; episodes
+    lease a ready instance and resets run in the background.
+    instances: MyDrive instances checked for health and then used as the
+    standby pool (default: MYDRIVE_INSTANCES); ignored when pool_urls is set.
+    preflight_deadline: Seconds to wait for MyDrive to answer before giving up.
+    resume: Earlier study directories; their finished episodes are reused.
+    max_cost / max_tokens: Stop starting episodes once the study spent this
+    many USD / used this many tokens (the rest can be run with --resume).
     """
     if viewport is None:
         viewport = {"width": 1280, "height": 720} # Default standard viewport
@@ -165,7 +180,20 @@ def run_mydrive_experiments(
                 custom_env_args_list.append(custom_env_arg)
         
         benchmark.env_args_list = custom_env_args_list
-        
+
+        # Healthy registry instances become the standby pool, so every episode
+        # leases its own instance in task setup
+        from env_registry import EnvRegistry
+        registry = None if pool_urls else (
+            EnvRegistry.from_urls("mydrive", instances) if instances else EnvRegistry.from_env("mydrive")
+        )
+        if registry is not None:
+            healthy = registry.check_health(wait_s=preflight_deadline)
+            pool_urls = registry.lease_urls(n_jobs)
+            log(f"   Instances: {len(healthy)}/{len(registry.instances)} healthy, leased per episode")
+
+        # Study machinery (Ray, pandas) is only needed once a study is built
+        from agentlab.experiments.study import make_study
         study = make_study(
             agent_args=agents_to_run,
             benchmark=benchmark,
@@ -173,6 +201,11 @@ def run_mydrive_experiments(
             comment=f"MyDrive evaluation: {len(benchmark)} tasks",
         )
         log(f"   Experiment directory: {study.dir}")
+        if resume:
+            from resume import resume_study
+            report = resume_study(study, resume)
+            log(f"   Resuming: {report['reused']}/{report['total']} episodes already done, "
+                    f"{report['pending']} to run ({report['rerun_errors']} after errors)")
         
     except Exception as e:
         print(f"   ❌ Cannot create experiment: {e}")
@@ -180,25 +213,88 @@ def run_mydrive_experiments(
         traceback.print_exc()
         sys.exit(1)
 
-    # Run experiments
-    total_experiments = len(benchmark) * len(agents_to_run)
-    est_time_per_task = 2.0 # minutes, approximate
-    total_est_minutes = (total_experiments * est_time_per_task) / n_jobs
+    # Run experiments, longest-expected-first, with an ETA from past durations
+    from scheduler import DurationModel, EtaMonitor, schedule_study
+    plan = schedule_study(study, DurationModel.from_history(), n_jobs)
     
     log("\n[4/6] Running experiments...")
-    log(f"   Total experiments to run: {total_experiments} ({len(benchmark)} tasks x {len(agents_to_run)} models)")
-    log(f"   Estimated duration: ~{total_est_minutes:.1f} minutes (@ {est_time_per_task}m/task, {n_jobs} parallel jobs)")
+    log(f"   Total experiments to run: {len(study.exp_args_list)} ({len(benchmark)} tasks x {len(agents_to_run)} models)")
+    log(f"   Estimated duration: ~{plan['makespan_s'] / 60:.1f} minutes ({n_jobs} parallel jobs, "
+        f"{plan['history_samples']} past episodes; benchmark order: ~{plan['in_order_makespan_s'] / 60:.1f} minutes)")
     
     if not headless and not quiet:
         log("\n   💡 Browser window will open")
     
+    # Gate on every target instance answering (concurrent probes, polled with backoff)
+    import health
+    if pool_urls:
+        endpoints = [e for url in pool_urls for e in health.site_endpoints("mydrive", url)]
+    else:
+        endpoints = health.configured_endpoints(["mydrive"])
+    try:
+        report = health.preflight(endpoints, deadline_s=preflight_deadline)
+        log(f"   Preflight: MyDrive ready ({report['elapsed_s']}s)")
+    except health.PreflightError as e:
+        print(f"   ❌ {e}")
+        sys.exit(1)
+
+    pool = None
+    if pool_urls:
+        from benchmark.env_pool import POOL_ENV, EnvPool
+        from benchmark.mydrive.task import reset_database
+
+        pool = EnvPool.create(Path(study.dir) / "env_pool", pool_urls)
+        pool.start(reset_database)
+        pool.wait_ready(min_ready=1)
+        os.environ[POOL_ENV] = str(pool.pool_dir)
+        log(f"   Standby pool: {len(pool_urls)} instances, ready: {pool.depth()['ready']}")
+
+    # Live token/cost ledger shared by all workers, with the study's caps
+    from benchmark.budget import BUDGET_ENV, Budget
+    budget = Budget.create(Path(study.dir) / "budget", max_cost=max_cost, max_tokens=max_tokens)
+    os.environ[BUDGET_ENV] = str(budget.budget_dir)
+    # Prompt blocks repeated across steps and episodes are written once per study (AcidwaveAgent only)
+    from message_store import STORE_ENV
+    os.environ[STORE_ENV] = str(Path(study.dir) / "message_store")
+    if max_cost is not None or max_tokens is not None:
+        log(f"   Budget caps: max_cost={max_cost} USD, max_tokens={max_tokens} (None = unlimited)")
+
     try:
-        study.run(n_jobs=n_jobs)
+        if study.exp_args_list:
+            with EtaMonitor(study.dir, plan, n_jobs, log=log, budget=budget):
+                study.run(n_jobs=n_jobs, parallel_backend=select_backend())
         log("   ✅ Experiment completed!")
     except Exception as e:
         print(f"   ❌ Experiment failed: {e}")
         print(f"\n   View logs: {study.dir}")
         sys.exit(1)
+    finally:
+        if pool is not None:
+            pool.stop()
+            os.environ.pop(POOL_ENV, None)
+            log(f"   Standby pool metrics: {pool.metrics()}")
+        os.environ.pop(BUDGET_ENV, None)
+        os.environ.pop(STORE_ENV, None)
+        spent = budget.totals()
+        print(f"   💰 Spent ${spent['cost']:.4f}, {spent['tokens']} tokens "
+              f"({spent['cached_input_tokens']} cached prompt tokens)")
+        if spent["skipped"]:
+            print(f"   ⚠️  Budget reached: {spent['skipped']} episode(s) not started, run them with --resume {study.dir}")
+
+    # Spend per solved task, from the episode summaries
+    try:
+        from analysis_engine import analyze
+        from warehouse import load_study_df
+        overall = analyze(load_study_df(study.dir)).overall
+        if overall["cost_per_success"] is not None:
+            print(f"   Success: {overall['success']}/{overall['total']}, "
+                  f"cost per successful task: ${overall['cost_per_success']:.4f}")
+        else:
+            print(f"   Success: 0/{overall['total']}, spent ${overall['cost']:.4f} without a solved task")
+        if overall["not_run"]:
+            print(f"   Not run: {overall['not_run']} episode(s), excluded from the totals")
+    except Exception as e:
+        print(f"   ⚠️  Cannot compute cost per success: {e}")
         
     log(f"\n   Results saved to: {study.dir}")
 
@@ -210,9 +306,14 @@ def main():
     parser.add_argument('--task-ids', nargs='+', type=int, help='Specify task ID list (e.g., 0 2)')
     parser.add_argument('--model', nargs='+', choices=['4o', '4o-mini', '4o-cot', 'all'], default=['4o'], help='Select agent models (default: 4o)')
     parser.add_argument('--no-headless', action='store_true', help='Show browser window')
-    parser.add_argument('--slow-mo', type=int, default=100, help='Browser delay (ms)')
+    parser.add_argument('--slow-mo', type=int, default=None, help='Browser delay (ms, default: task pacing profile)')
     parser.add_argument('--n-jobs', type=int, default=1, help='Number of parallel jobs')
     parser.add_argument('--viewport', type=str, default="1280x720", help='Viewport size (widthxheight), default: 1280x720')
+    parser.add_argument('--instances', nargs='+', help='MyDrive instances; unhealthy ones are dropped and each episode leases a free one')
+    parser.add_argument('--resume', nargs='+', metavar='STUDY_DIR', help='Resume interrupted studies: only run missing or errored episodes')
+    parser.add_argument('--max-cost', type=float, help='Stop starting new episodes once the study spent this many USD')
+    parser.add_argument('--max-tokens', type=int, help='Stop starting new episodes once the study used this many tokens')
+    parser.add_argument('--pool-urls', nargs='+', help='MyDrive instances to keep pre-reset in a standby pool (e.g. http://localhost:3000 http://localhost:3001)')
     
     args = parser.parse_args()
     
@@ -230,7 +331,12 @@ def main():
         headless=not args.no_headless,
         slow_mo=args.slow_mo,
         n_jobs=args.n_jobs,
-        viewport=viewport
+        viewport=viewport,
+        pool_urls=args.pool_urls,
+        instances=args.instances,
+        resume=args.resume,
+        max_cost=args.max_cost,
+        max_tokens=args.max_tokens,
     )
 
 
@@ -0,0 +1,232 @@
+"""
+Episode Scheduler
+=================
+
+Longest-expected-first dispatch and a live ETA, from historical durations.
+
+``study.run`` dispatches episodes in benchmark order, so a long task that
+happens to come last runs alone while every other worker idles. The
+scheduler:
+
+- learns episode durations from earlier studies (``DurationModel``). A
+  prediction falls back from (agent, task) to task, then difficulty, then
+  everything seen, then ``DEFAULT_DURATION_S``, using medians so one
+  timed-out run does not dominate;
+- orders ``study.exp_args_list`` longest-expected-first (LPT), which is the
+  classic makespan heuristic for workers pulling from one queue;
+- simulates that packing on ``n_jobs`` workers for the up-front estimate;
+- re-estimates while the study runs (``EtaMonitor``), scaling the remaining
+  predictions by how far finished episodes were off.
+
+History is read from ``AGENTLAB_EXP_ROOT`` (default ``~/agentlab_results``)
+and ``AgentLab/results``, reusing the per-study key cache of resume.py.
+
+Example:
+    >>> model = DurationModel.from_history(difficulty=task_difficulty)
+    >>> plan = schedule_study(study, model, n_jobs=4)
+    >>> print(f"ETA {plan['makespan_s'] / 60:.1f} min")
+    >>> with EtaMonitor(study.dir, plan, n_jobs=4):
+    ...     study.run(n_jobs=4)
+"""
+
+import heapq
+import json
+import logging
+import os
+import statistics
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from resume import agent_hash, episode_key, index_study
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DURATION_S = 120.0
+
+HISTORY_ROOTS = [
+    Path(os.environ.get("AGENTLAB_EXP_ROOT", Path.home() / "agentlab_results")),
+    Path(__file__).parent.parent / "results",
+]
+
+
+def episode_duration(exp_dir: Path) -> Optional[float]:
+    """Wall-clock seconds of a finished episode, or None if it did not finish."""
+    summary = exp_dir / "summary_info.json"
+    if not summary.exists():
+        return None
+    try:
+        with open(summary, "r", encoding="utf-8") as f:
+            info = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    step = info.get("stats.cum_step_elapsed")
+    agent = info.get("stats.cum_agent_elapsed")
+    if step is not None and agent is not None:
+        return float(step) + float(agent)
+    # Older summaries: exp_args.pkl is written when the episode starts
+    started = exp_dir / "exp_args.pkl"
+    if started.exists():
+        return max(0.0, summary.stat().st_mtime - started.stat().st_mtime)
+    return None
+
+
+class DurationModel:
+    """
+    Median episode durations with hierarchical fallback.
+
+    Args:
+        difficulty: Map task name -> difficulty label (e.g. from test.raw.json)
+        default_s: Prediction when nothing is known
+    """
+
+    def __init__(self, difficulty: Optional[Dict[str, str]] = None, default_s: float = DEFAULT_DURATION_S) -> None:
+        self.difficulty = difficulty or {}
+        self.default_s = default_s
+        self._samples: Dict[tuple, List[float]] = defaultdict(list)
+
+    def add(self, agent: str, task_name: str, duration_s: float) -> None:
+        level = self.difficulty.get(task_name, "unknown")
+        for key in (("agent_task", agent, task_name), ("task", task_name), ("difficulty", level), ("all",)):
+            self._samples[key].append(duration_s)
+
+    @classmethod
+    def from_history(cls, roots: Iterable[Path] = HISTORY_ROOTS, **kwargs) -> "DurationModel":
+        """Learn from every finished episode under the study roots."""
+        model = cls(**kwargs)
+        seen = set()
+        for root in roots:
+            root = Path(root)
+            if not root.is_dir():
+                continue
+            for study_dir in sorted(p for p in root.iterdir() if p.is_dir()):
+                for record in index_study(study_dir):
+                    # Resumed studies link episodes of earlier ones; count each once
+                    real = record.exp_dir.resolve()
+                    if record.status != "done" or real in seen:
+                        continue
+                    seen.add(real)
+                    duration = episode_duration(record.exp_dir)
+                    if duration is not None:
+                        model.add(record.key[0], record.key[1], duration)
+        logger.info(f"[scheduler] Learned from {len(seen)} episodes")
+        return model
+
+    def predict(self, agent: str, task_name: str) -> float:
+        level = self.difficulty.get(task_name, "unknown")
+        for key in (("agent_task", agent, task_name), ("task", task_name), ("difficulty", level), ("all",)):
+            samples = self._samples.get(key)
+            if samples:
+                return statistics.median(samples)
+        return self.default_s
+
+    def predict_exp(self, exp_args) -> float:
+        return self.predict(agent_hash(exp_args.agent_args), exp_args.env_args.task_name)
+
+    @property
+    def n_samples(self) -> int:
+        return len(self._samples.get(("all",), []))
+
+
+def simulate_makespan(durations: List[float], n_jobs: int) -> float:
+    """Finish time of dispatching ``durations`` in order to ``n_jobs`` workers pulling from one queue."""
+    workers = [0.0] * max(1, n_jobs)
+    for duration in durations:
+        start = heapq.heappop(workers)
+        heapq.heappush(workers, start + duration)
+    return max(workers)
+
+
+def schedule_study(study, model: DurationModel, n_jobs: int) -> dict:
+    """
+    Reorder ``study.exp_args_list`` longest-expected-first.
+
+    Returns:
+        Plan dict: ``predictions`` (episode key -> seconds), ``makespan_s``,
+        ``in_order_makespan_s`` (dispatch in original order) and ``total_s``
+    """
+    predicted = [(model.predict_exp(e), e) for e in study.exp_args_list]
+    in_order = simulate_makespan([p for p, _ in predicted], n_jobs)
+    predicted.sort(key=lambda pe: -pe[0])
+    study.exp_args_list = [e for _, e in predicted]
+    durations = [p for p, _ in predicted]
+    return {
+        "predictions": {episode_key(e): p for p, e in predicted},
+        "makespan_s": simulate_makespan(durations, n_jobs),
+        "in_order_makespan_s": in_order,
+        "total_s": sum(durations),
+        "history_samples": model.n_samples,
+    }
+
+
+class EtaMonitor:
+    """
+    Print an updated ETA while a study runs.
+
+    Finished episodes are found with resume.index_study; the remaining
+    predictions are scaled by the observed/predicted ratio of finished ones
+    and packed onto ``n_jobs`` workers again.
+
+    Args:
+        study_dir: Directory the study writes episodes into
+        plan: Result of ``schedule_study``
+        n_jobs: Parallel workers
+        interval_s: Seconds between updates
+        log: Print function
+        budget: Study budget (benchmark/budget.py); its live spend is shown too
+    """
+
+    def __init__(self, study_dir: Path, plan: dict, n_jobs: int, interval_s: float = 30.0,
+                 log: Callable[[str], None] = print, budget=None) -> None:
+        self.study_dir = Path(study_dir)
+        self.predictions = plan["predictions"]
+        self.n_jobs = n_jobs
+        self.interval_s = interval_s
+        self.log = log
+        self.budget = budget
+        self._start = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def estimate(self) -> dict:
+        finished = {}
+        if self.study_dir.is_dir():
+            for record in index_study(self.study_dir):
+                if record.status != "incomplete" and record.key in self.predictions:
+                    finished[record.key] = episode_duration(record.exp_dir)
+        observed = [(d, self.predictions[k]) for k, d in finished.items() if d]
+        ratio = sum(d for d, _ in observed) / sum(p for _, p in observed) if observed else 1.0
+        remaining = sorted((p * ratio for k, p in self.predictions.items() if k not in finished), reverse=True)
+        elapsed = time.monotonic() - self._start
+        return {
+            "done": len(finished),
+            "total": len(self.predictions),
+            "elapsed_s": elapsed,
+            "calibration": ratio,
+            "remaining_s": simulate_makespan(remaining, self.n_jobs) if remaining else 0.0,
+        }
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            eta = self.estimate()
+            spend = ""
+            if self.budget is not None:
+                totals = self.budget.totals()
+                spend = f", spent ${totals['cost']:.2f} / {totals['tokens']} tokens"
+            self.log(
+                f"   ⏱️  {eta['done']}/{eta['total']} done, elapsed {eta['elapsed_s'] / 60:.1f} min, "
+                f"ETA {eta['remaining_s'] / 60:.1f} min (calibration x{eta['calibration']:.2f}){spend}"
+            )
+
+    def __enter__(self) -> "EtaMonitor":
+        self._start = time.monotonic()
+        self._thread = threading.Thread(target=self._loop, name="eta-monitor", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,326 @@
+"""
+Startup Profiler
+================
+
+Measure what a fresh worker pays before its first episode, and fail when
+that exceeds a budget.
+
+Every Ray worker (and local_executor worker) imports the same chain:
+``patch_agentlab``, the benchmark packages and the agent presets, then
+looks up its first task id, which registers the namespace. This tool runs
+that chain in a fresh interpreter under ``python -X importtime`` and
+records:
+
+- per-module import time (self and cumulative), from ``-X importtime``;
+- side effects inside those imports: ``copy.deepcopy`` (agent presets) and
+  ``json.load``/``json.loads`` (task catalogs), timed at the outermost call
+  and attributed to the calling module;
+- the first task lookup per namespace (lazy registration, see
+  benchmark/registration.py);
+- peak RSS of the process after startup.
+
+Outputs, under ``--out`` (default ``AgentLab/results/startup_profile``):
+
+- ``startup.folded``: folded stacks ("a;b;c <us>"), the input format of
+  flamegraph.pl and speedscope;
+- ``startup_report.json``: totals, slowest modules, side effects, budget
+  violations.
+
+The budget (``startup_budget.json`` next to this file) caps the total,
+selected modules' cumulative import time, side-effect totals per kind and
+RSS, and lists modules workers must not import at all (analysis
+libraries); the exit status is 1 when any cap is exceeded or any module or
+lookup of the chain fails, so it can gate CI.
+
+Usage:
+    python experiments/startup_profile.py
+    python experiments/startup_profile.py --repeat 5 --top 30
+    python experiments/startup_profile.py --modules patch_agentlab agents.acidwave_agent --no-budget
+"""
+
+import argparse
+import copy
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+BUDGET_FILE = Path(__file__).parent / "startup_budget.json"
+DEFAULT_OUT = PROJECT_ROOT / "results" / "startup_profile"
+
+# What a worker imports before its first episode (ray_worker_init / local_executor)
+WORKER_CHAIN = [
+    "patch_agentlab",
+    "benchmark.acidwave.task",
+    "benchmark.mydrive.task",
+    "agents.acidwave_agent",
+]
+# First lookup per namespace; registers it (ids must exist in the task catalogs)
+FIRST_LOOKUPS = ["acidwave.task_0", "mydrive.task_1"]
+
+
+@dataclass
+class ImportNode:
+    """One line of ``-X importtime`` output, with its nested imports."""
+
+    name: str
+    self_us: int
+    cumulative_us: int
+    children: List["ImportNode"] = field(default_factory=list)
+
+
+def parse_importtime(stderr: str) -> List[ImportNode]:
+    """
+    Build the import tree from ``-X importtime`` output.
+
+    Lines are printed when an import finishes, so children come before
+    their parent; nesting is given by two spaces of indentation per level.
+    """
+    pending: Dict[int, List[ImportNode]] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, raw_name = line[len("import time:"):].split("|", 2)
+        depth = (len(raw_name) - len(raw_name.lstrip(" ")) - 1) // 2
+        node = ImportNode(raw_name.strip(), int(self_us), int(cumulative_us), pending.pop(depth + 1, []))
+        pending.setdefault(depth, []).append(node)
+    return pending.get(0, [])
+
+
+def folded_stacks(roots: List[ImportNode], prefix: str = "import") -> List[str]:
+    lines = []
+
+    def walk(node: ImportNode, stack: str) -> None:
+        stack = f"{stack};{node.name}"
+        if node.self_us > 0:
+            lines.append(f"{stack} {node.self_us}")
+        for child in node.children:
+            walk(child, stack)
+
+    for root in roots:
+        walk(root, prefix)
+    return lines
+
+
+def flatten(roots: List[ImportNode]) -> Dict[str, ImportNode]:
+    """First occurrence of every module (a module is imported once per process)."""
+    found: Dict[str, ImportNode] = {}
+    stack = list(roots)
+    while stack:
+        node = stack.pop()
+        found.setdefault(node.name, node)
+        stack.extend(node.children)
+    return found
+
+
+# ------------------------------------------------------------------- child side
+
+class _SideEffects:
+    """Times the outermost call of wrapped functions, attributed to the calling module."""
+
+    def __init__(self) -> None:
+        self.events: List[dict] = []
+        self._depth: Dict[str, int] = {}
+
+    def wrap(self, kind: str, label: str, fn):
+        def timed(*args, **kwargs):
+            if self._depth.get(kind):
+                return fn(*args, **kwargs)
+            self._depth[kind] = 1
+            caller = sys._getframe(1)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._depth[kind] = 0
+                self.events.append({
+                    "kind": kind,
+                    "call": label,
+                    "caller": f"{caller.f_globals.get('__name__', '?')}:{caller.f_lineno}",
+                    "us": int((time.perf_counter() - start) * 1e6),
+                })
+        return timed
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _child(modules: List[str], lookups: List[str], result_path: Path) -> None:
+    sys.path.insert(0, str(PROJECT_ROOT))
+    effects = _SideEffects()
+    copy.deepcopy = effects.wrap("deepcopy", "copy.deepcopy", copy.deepcopy)
+    json.load = effects.wrap("json", "json.load", json.load)
+    json.loads = effects.wrap("json", "json.loads", json.loads)
+
+    phases, errors = [], {}
+    start = time.perf_counter()
+    for module in modules:
+        t0 = time.perf_counter()
+        try:
+            __import__(module)
+        except Exception as e:
+            errors[module] = f"{type(e).__name__}: {e}"
+        phases.append({"phase": "import", "name": module, "us": int((time.perf_counter() - t0) * 1e6)})
+    for env_id in lookups:
+        t0 = time.perf_counter()
+        try:
+            import gymnasium as gym
+            from benchmark.registration import ensure_registered
+            if not ensure_registered(env_id):
+                raise LookupError(f"{env_id} is not in a known namespace")
+            # Raises if the id is not in the catalog
+            gym.spec(f"browsergym/{env_id}")
+        except Exception as e:
+            errors[env_id] = f"{type(e).__name__}: {e}"
+        phases.append({"phase": "lookup", "name": env_id, "us": int((time.perf_counter() - t0) * 1e6)})
+
+    with open(result_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "total_us": int((time.perf_counter() - start) * 1e6),
+            "phases": phases,
+            "side_effects": effects.events,
+            "errors": errors,
+            "peak_rss_mb": _peak_rss_mb(),
+        }, f)
+
+
+# ------------------------------------------------------------------ parent side
+
+def profile_once(modules: List[str], lookups: List[str]) -> dict:
+    """Run the startup chain in a fresh interpreter."""
+    with tempfile.TemporaryDirectory() as tmp:
+        result_path = Path(tmp) / "child.json"
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", __file__, "--child", str(result_path),
+             "--modules", *modules, "--lookups", *lookups],
+            cwd=PROJECT_ROOT, capture_output=True, text=True,
+        )
+        if not result_path.exists():
+            raise RuntimeError(f"Profiling child failed (exit {proc.returncode}):\n{proc.stderr[-2000:]}")
+        with open(result_path, "r", encoding="utf-8") as f:
+            run = json.load(f)
+    run["imports"] = parse_importtime(proc.stderr)
+    return run
+
+
+def check_budget(report: dict, modules: Dict[str, ImportNode], budget: dict) -> List[str]:
+    """Budget violations as readable strings."""
+    violations = []
+    total_ms = report["total_ms"]
+    if "total_ms" in budget and total_ms > budget["total_ms"]:
+        violations.append(f"total {total_ms:.0f}ms > {budget['total_ms']}ms")
+    for name, limit_ms in budget.get("modules_ms", {}).items():
+        node = modules.get(name)
+        if node is not None and node.cumulative_us / 1000 > limit_ms:
+            violations.append(f"import {name} {node.cumulative_us / 1000:.0f}ms > {limit_ms}ms")
+    for kind, limit_ms in budget.get("side_effects_ms", {}).items():
+        spent = report["side_effects_ms"].get(kind, 0.0)
+        if spent > limit_ms:
+            violations.append(f"{kind} {spent:.0f}ms > {limit_ms}ms")
+    for name in budget.get("forbidden_modules", []):
+        if name in modules:
+            violations.append(f"{name} imported at startup (forbidden in workers)")
+    rss = report.get("peak_rss_mb")
+    if "rss_mb" in budget and rss is not None and rss > budget["rss_mb"]:
+        violations.append(f"peak RSS {rss:.0f}MB > {budget['rss_mb']}MB")
+    return violations
+
+
+def build_report(run: dict, top: int) -> tuple:
+    modules = flatten(run["imports"])
+    side_effects_ms: Dict[str, float] = {}
+    for event in run["side_effects"]:
+        side_effects_ms[event["kind"]] = side_effects_ms.get(event["kind"], 0.0) + event["us"] / 1000
+    slowest = sorted(modules.values(), key=lambda n: -n.self_us)[:top]
+    report = {
+        "total_ms": run["total_us"] / 1000,
+        "peak_rss_mb": run["peak_rss_mb"],
+        "phases": [{**p, "ms": p["us"] / 1000} for p in run["phases"]],
+        "slowest_modules": [
+            {"module": n.name, "self_ms": n.self_us / 1000, "cumulative_ms": n.cumulative_us / 1000} for n in slowest
+        ],
+        "side_effects_ms": side_effects_ms,
+        "side_effects": sorted(run["side_effects"], key=lambda e: -e["us"])[:top],
+        "errors": run["errors"],
+    }
+    folded = folded_stacks(run["imports"])
+    folded += [f"side_effect;{e['kind']};{e['caller']} {e['us']}" for e in run["side_effects"]]
+    folded += [f"lookup;{p['name']} {p['us']}" for p in run["phases"] if p["phase"] == "lookup"]
+    return report, modules, folded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile worker startup (imports and side effects) against a budget")
+    parser.add_argument("--modules", nargs="+", default=WORKER_CHAIN)
+    parser.add_argument("--lookups", nargs="*", default=FIRST_LOOKUPS)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs; the one with the median total is reported")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--out", type=Path, default=DEFAULT_OUT)
+    parser.add_argument("--budget", type=Path, default=BUDGET_FILE)
+    parser.add_argument("--no-budget", action="store_true")
+    parser.add_argument("--child", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.modules, args.lookups, args.child)
+        return 0
+
+    runs = sorted((profile_once(args.modules, args.lookups) for _ in range(max(1, args.repeat))),
+                  key=lambda r: r["total_us"])
+    run = runs[len(runs) // 2]
+    report, modules, folded = build_report(run, args.top)
+    report["runs_total_ms"] = [r["total_us"] / 1000 for r in runs]
+
+    budget = {}
+    if not args.no_budget and args.budget.exists():
+        with open(args.budget, "r", encoding="utf-8") as f:
+            budget = json.load(f)
+    report["budget"] = budget
+    # A chain that fails to import or look up is never within budget
+    report["violations"] = [f"{name} failed: {error}" for name, error in report["errors"].items()]
+    report["violations"] += check_budget(report, modules, budget)
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    with open(args.out / "startup.folded", "w", encoding="utf-8") as f:
+        f.write("\n".join(folded) + "\n")
+    with open(args.out / "startup_report.json", "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n🚀 Worker startup: {report['total_ms']:.0f}ms "
+          f"(median of {len(runs)}: {', '.join(f'{t:.0f}' for t in report['runs_total_ms'])}), "
+          f"peak RSS {report['peak_rss_mb'] or 0:.0f}MB")
+    for phase in report["phases"]:
+        print(f"   {phase['phase']:6s} {phase['name']:30s} {phase['ms']:8.1f}ms")
+    print(f"\n   Slowest modules (self time):")
+    for entry in report["slowest_modules"]:
+        print(f"   {entry['self_ms']:8.1f}ms  (cum {entry['cumulative_ms']:8.1f}ms)  {entry['module']}")
+    if report["side_effects_ms"]:
+        print(f"\n   Side effects: " + ", ".join(f"{k} {v:.1f}ms" for k, v in report["side_effects_ms"].items()))
+        for event in report["side_effects"][:5]:
+            print(f"   {event['us'] / 1000:8.1f}ms  {event['call']} from {event['caller']}")
+    print(f"\n   Flame graph input: {args.out / 'startup.folded'}")
+
+    if report["violations"]:
+        print(f"\n❌ Startup check failed ({args.budget}):")
+        for violation in report["violations"]:
+            print(f"   - {violation}")
+        return 1
+    if budget:
+        print(f"\n✅ Within startup budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
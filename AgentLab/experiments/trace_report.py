@@ -0,0 +1,71 @@
+"""
+Trace Report
+============
+
+Per-phase latency breakdown of traced episodes (``ACIDWAVE_TRACE=1``, see
+benchmark/tracing.py).
+
+Accepts study directories, episode directories or ``trace.jsonl`` files and
+prints, per span name, the count, total time, share of the episode total
+and the p50/p95/p99/max durations, slowest phases first.
+
+Usage:
+    ACIDWAVE_TRACE=1 python experiments/run_full_experiments.py
+    python experiments/trace_report.py results/<study_dir>
+    python experiments/trace_report.py results/<study_dir> --json trace_summary.json
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmark.tracing import summarize, trace_files
+
+
+def format_table(summary: dict) -> str:
+    """Phases sorted by total time, with their share of the episode time."""
+    episode_ms = summary.get("episode", {}).get("total_ms", 0.0)
+    lines = [
+        f"{'phase':<34} {'count':>7} {'total s':>10} {'share':>7} "
+        f"{'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'max ms':>10} {'err':>5}",
+        "-" * 112,
+    ]
+    for name, stats in sorted(summary.items(), key=lambda item: -item[1]["total_ms"]):
+        share = f"{stats['total_ms'] / episode_ms * 100:6.1f}%" if episode_ms else f"{'-':>7}"
+        lines.append(
+            f"{name:<34} {stats['count']:>7} {stats['total_ms'] / 1000:>10.2f} {share} "
+            f"{stats['p50_ms']:>10.1f} {stats['p95_ms']:>10.1f} {stats['p99_ms']:>10.1f} "
+            f"{stats['max_ms']:>10.1f} {stats['errors']:>5}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-step latency breakdown of traced episodes")
+    parser.add_argument("paths", nargs="+", help="Study directories, episode directories or trace.jsonl files")
+    parser.add_argument("--json", type=str, help="Also write the summary to this JSON file")
+    args = parser.parse_args()
+
+    files = trace_files(args.paths)
+    if not files:
+        print("❌ No trace.jsonl found (run with ACIDWAVE_TRACE=1)")
+        sys.exit(1)
+
+    summary = summarize(files)
+    print(f"\n📊 Latency breakdown of {len(files)} traced episode(s)\n")
+    print(format_table(summary))
+
+    if args.json:
+        output = Path(args.json)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump({"n_traces": len(files), "spans": summary}, f, indent=2)
+        print(f"\n✅ Summary saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""
+Results Warehouse
+=================
+
+Incrementally ingest study directories into one queryable store.
+
+``inspect_results.load_result_df(study_dir)`` unpickles every episode of a
+study each time it is called, and only ``results.csv`` is kept afterwards.
+The warehouse ingests each episode once:
+
+- ``ingested`` records every episode directory with the mtime of its
+  ``summary_info.json`` (or ``exp_args.pkl`` while still running); a later
+  ingest skips unchanged directories and re-reads only new or updated ones;
+- ``episodes`` holds one row per episode, keyed by study, agent, task and
+  seed, with the common metrics as columns and the full summary as JSON;
+- ``steps`` holds one row per step (action, reward, flags, step stats)
+  from the ``step_*.pkl.gz`` files.
+
+The store is SQLite (stdlib, safe to append to, indexed on the episode
+key). ``export_parquet`` writes the same tables as Parquet partitioned by
+study when pyarrow is installed, for tools that prefer columnar files.
+
+Location: ``ACIDWAVE_WAREHOUSE`` (default ``AgentLab/results/warehouse.sqlite``).
+
+Usage:
+    python experiments/warehouse.py ingest results/*
+    python experiments/warehouse.py ingest results/* --no-steps
+    python experiments/warehouse.py summary
+    python experiments/warehouse.py export-parquet results/warehouse_parquet
+
+    >>> wh = Warehouse()
+    >>> wh.ingest([study.dir])
+    >>> df = wh.episodes_df(studies=[study.dir.name])
+"""
+
+import gzip
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from resume import agent_hash
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = Path(os.environ.get(
+    "ACIDWAVE_WAREHOUSE", Path(__file__).parent.parent / "results" / "warehouse.sqlite"
+))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingested (
+    exp_dir TEXT PRIMARY KEY,
+    study TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    ingested_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS episodes (
+    exp_dir TEXT PRIMARY KEY,
+    real_dir TEXT NOT NULL,
+    study TEXT NOT NULL,
+    agent TEXT NOT NULL,
+    agent_name TEXT,
+    model_name TEXT,
+    task_name TEXT NOT NULL,
+    seed INTEGER,
+    sub_task_id INTEGER,
+    status TEXT NOT NULL,
+    cum_reward REAL,
+    n_steps INTEGER,
+    err_msg TEXT,
+    input_tokens REAL,
+    output_tokens REAL,
+    cost REAL,
+    step_elapsed_s REAL,
+    agent_elapsed_s REAL,
+    summary TEXT
+);
+CREATE INDEX IF NOT EXISTS episodes_key ON episodes (study, agent, task_name, seed);
+CREATE TABLE IF NOT EXISTS steps (
+    exp_dir TEXT NOT NULL,
+    step INTEGER NOT NULL,
+    action TEXT,
+    reward REAL,
+    terminated INTEGER,
+    truncated INTEGER,
+    stats TEXT,
+    PRIMARY KEY (exp_dir, step)
+);
+"""
+
+# summary_info.json keys copied into columns
+SUMMARY_COLUMNS = {
+    "cum_reward": "cum_reward",
+    "n_steps": "n_steps",
+    "err_msg": "err_msg",
+    "stats.cum_input_tokens": "input_tokens",
+    "stats.cum_output_tokens": "output_tokens",
+    "stats.cum_cost": "cost",
+    "stats.cum_step_elapsed": "step_elapsed_s",
+    "stats.cum_agent_elapsed": "agent_elapsed_s",
+}
+
+
+def _scalar(value):
+    """Value if it fits a JSON/SQLite scalar, else its repr."""
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if hasattr(value, "item"):  # numpy scalars
+        return value.item()
+    return repr(value)
+
+
+def _episode_mtime(exp_dir: Path) -> float:
+    summary = exp_dir / "summary_info.json"
+    return (summary if summary.exists() else exp_dir / "exp_args.pkl").stat().st_mtime
+
+
+def _read_steps(exp_dir: Path) -> List[tuple]:
+    rows = []
+    for path in sorted(exp_dir.glob("step_*.pkl.gz")):
+        try:
+            with gzip.open(path, "rb") as f:
+                step_info = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"[warehouse] Cannot read {path}: {e}")
+            continue
+        stats = {k: _scalar(v) for k, v in (getattr(step_info, "stats", None) or {}).items()}
+        rows.append((
+            str(exp_dir),
+            getattr(step_info, "step", int(path.name[len("step_"):-len(".pkl.gz")])),
+            _scalar(getattr(step_info, "action", None)),
+            _scalar(getattr(step_info, "reward", None)),
+            int(bool(getattr(step_info, "terminated", False))),
+            int(bool(getattr(step_info, "truncated", False))),
+            json.dumps(stats),
+        ))
+    return rows
+
+
+class Warehouse:
+    """
+    SQLite store of episodes and steps across studies.
+
+    Args:
+        path: Database file (created if missing)
+    """
+
+    def __init__(self, path: Path = DEFAULT_PATH) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Parallel loaders (compare_studies.py) wait for each other's writes
+        self.conn = sqlite3.connect(self.path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "Warehouse":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ----------------------------------------------------------------- ingest
+
+    def _episode_row(self, study: str, exp_dir: Path) -> Optional[tuple]:
+        try:
+            with open(exp_dir / "exp_args.pkl", "rb") as f:
+                exp_args = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"[warehouse] Cannot read {exp_dir / 'exp_args.pkl'}: {e}")
+            return None
+        summary = {}
+        summary_path = exp_dir / "summary_info.json"
+        if summary_path.exists():
+            try:
+                with open(summary_path, "r", encoding="utf-8") as f:
+                    summary = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                summary = {}
+        status = "incomplete" if not summary else ("error" if summary.get("err_msg") else "done")
+
+        agent_args = exp_args.agent_args
+        env_args = exp_args.env_args
+        chat_model_args = getattr(agent_args, "chat_model_args", None)
+        return (
+            str(exp_dir),
+            str(exp_dir.resolve()),
+            study,
+            agent_hash(agent_args),
+            getattr(agent_args, "agent_name", None),
+            getattr(chat_model_args, "model_name", None),
+            env_args.task_name,
+            env_args.task_seed,
+            (env_args.task_kwargs or {}).get("sub_task_id"),
+            status,
+            *(_scalar(summary.get(key)) for key in SUMMARY_COLUMNS),
+            json.dumps({k: _scalar(v) for k, v in summary.items()}),
+        )
+
+    def ingest(self, study_dirs: Iterable[Path], steps: bool = True) -> Dict[str, int]:
+        """
+        Ingest new and changed episodes of the given study directories.
+
+        Args:
+            study_dirs: Study directories (each containing episode directories)
+            steps: Also ingest step-level records
+
+        Returns:
+            Counts of ``scanned``, ``ingested`` and ``skipped`` episodes
+        """
+        known = dict(self.conn.execute("SELECT exp_dir, mtime FROM ingested"))
+        counts = {"scanned": 0, "ingested": 0, "skipped": 0}
+        start = time.monotonic()
+        for study_dir in study_dirs:
+            # Absolute paths, so the same episode is one row however it was named
+            study_dir = Path(os.path.abspath(study_dir))
+            if not study_dir.is_dir():
+                logger.warning(f"[warehouse] Not a study directory: {study_dir}")
+                continue
+            for pkl in sorted(study_dir.glob("*/exp_args.pkl")):
+                exp_dir = pkl.parent
+                counts["scanned"] += 1
+                mtime = _episode_mtime(exp_dir)
+                if known.get(str(exp_dir)) == mtime:
+                    counts["skipped"] += 1
+                    continue
+                row = self._episode_row(study_dir.name, exp_dir)
+                if row is None:
+                    continue
+                step_rows = _read_steps(exp_dir) if steps else []
+                with self.conn:
+                    self.conn.execute("DELETE FROM steps WHERE exp_dir = ?", (str(exp_dir),))
+                    self.conn.execute(f"INSERT OR REPLACE INTO episodes VALUES ({', '.join('?' * len(row))})", row)
+                    self.conn.executemany("INSERT OR REPLACE INTO steps VALUES (?, ?, ?, ?, ?, ?, ?)", step_rows)
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO ingested VALUES (?, ?, ?, ?)",
+                        (str(exp_dir), study_dir.name, mtime, time.time()),
+                    )
+                counts["ingested"] += 1
+        logger.info(f"[warehouse] {counts} in {time.monotonic() - start:.2f}s")
+        return counts
+
+    # ------------------------------------------------------------------ query
+
+    def query_df(self, sql: str, params: tuple = ()):
+        """Run SQL against the warehouse and return a DataFrame."""
+        import pandas as pd
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def episodes_df(self, studies: Optional[List[str]] = None, expand_summary: bool = False):
+        """
+        Episodes as a DataFrame, optionally restricted to some studies.
+
+        Args:
+            studies: Study directory names (None = all)
+            expand_summary: Add every summary_info.json key as a column, like
+                ``inspect_results.load_result_df``
+        """
+        sql = "SELECT * FROM episodes"
+        params: tuple = ()
+        if studies:
+            sql += f" WHERE study IN ({', '.join('?' * len(studies))})"
+            params = tuple(studies)
+        df = self.query_df(sql + " ORDER BY study, task_name, seed", params)
+        if expand_summary and len(df):
+            import pandas as pd
+            extra = pd.DataFrame([json.loads(s) for s in df["summary"]], index=df.index)
+            df = df.join(extra[[c for c in extra.columns if c not in df.columns]])
+        return df.drop(columns=["summary"])
+
+    def steps_df(self, studies: Optional[List[str]] = None):
+        sql = "SELECT s.*, e.study, e.agent, e.task_name, e.seed FROM steps s JOIN episodes e USING (exp_dir)"
+        params: tuple = ()
+        if studies:
+            sql += f" WHERE e.study IN ({', '.join('?' * len(studies))})"
+            params = tuple(studies)
+        return self.query_df(sql + " ORDER BY s.exp_dir, s.step", params)
+
+    def summary(self) -> List[tuple]:
+        """Per-study episode counts, success rate and mean steps."""
+        return self.conn.execute(
+            "SELECT study, COUNT(*), AVG(cum_reward > 0.8), AVG(n_steps), SUM(status != 'done') "
+            "FROM episodes GROUP BY study ORDER BY study"
+        ).fetchall()
+
+    def export_parquet(self, out_dir: Path) -> None:
+        """Write ``episodes`` and ``steps`` as Parquet datasets partitioned by study (needs pyarrow)."""
+        out_dir = Path(out_dir)
+        self.episodes_df().to_parquet(out_dir / "episodes", partition_cols=["study"], index=False)
+        self.steps_df().to_parquet(out_dir / "steps", partition_cols=["study"], index=False)
+
+
+def load_study_df(study_dir: Path, steps: bool = False, path: Path = DEFAULT_PATH):
+    """
+    Ingest one study (incrementally) and return its episodes.
+
+    Drop-in for ``inspect_results.load_result_df(study_dir)`` in the report
+    scripts: only new or changed episodes are unpickled.
+    """
+    study_dir = Path(os.path.abspath(study_dir))
+    with Warehouse(path) as wh:
+        wh.ingest([study_dir], steps=steps)
+        return wh.episodes_df(studies=[study_dir.name], expand_summary=True)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Incrementally ingest study results into the warehouse")
+    parser.add_argument("--db", type=Path, default=DEFAULT_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    ingest = sub.add_parser("ingest", help="Ingest study directories")
+    ingest.add_argument("study_dirs", nargs="+", type=Path)
+    ingest.add_argument("--no-steps", action="store_true", help="Skip step-level records")
+    sub.add_parser("summary", help="Per-study overview")
+    export = sub.add_parser("export-parquet", help="Export as Parquet partitioned by study")
+    export.add_argument("out_dir", type=Path)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    with Warehouse(args.db) as wh:
+        if args.command == "ingest":
+            counts = wh.ingest(args.study_dirs, steps=not args.no_steps)
+            print(f"\n📦 Scanned {counts['scanned']} episodes: "
+                  f"{counts['ingested']} ingested, {counts['skipped']} unchanged ({args.db})")
+        elif args.command == "summary":
+            print(f"\n📊 {'Study':50s} {'Episodes':>8s} {'Success':>8s} {'Steps':>6s} {'Not done':>8s}")
+            for study, n, success, steps, not_done in wh.summary():
+                print(f"   {study:50s} {n:8d} {(success or 0) * 100:7.1f}% {steps or 0:6.1f} {not_done:8d}")
+        elif args.command == "export-parquet":
+            wh.export_parquet(args.out_dir)
+            print(f"\n✅ Exported to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
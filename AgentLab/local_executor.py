@@ -0,0 +1,187 @@
+"""
+Local Process-Pool Backend
+==========================
+
+Single-node alternative to Ray for running studies.
+
+On one machine Ray mostly costs startup time and memory: a local cluster,
+``runtime_env`` setup and ``worker_process_setup_hook`` (ray_worker_init.py)
+before the first episode runs. The local backend uses a
+``concurrent.futures.ProcessPoolExecutor`` on a forkserver context instead:
+
+- the fork server imports ``PRELOAD_MODULES`` (AgentLab patches, task
+  catalogs, benchmarks, agents) once, and every worker is forked from it,
+  sharing those pages copy-on-write;
+- the runner process forks nothing itself, so its threads (ETA monitor,
+  standby-pool resetter) cannot leak into workers;
+- episodes are dispatched in ``exp_args_list`` order (so scheduler.py's
+  longest-first order holds) and every episode is run with ``exp_args.run()``
+  in its prepared ``exp_dir``, exactly like the Ray path, so study
+  directories look the same.
+
+Not supported compared to Ray: per-step timeouts and task dependency
+graphs (the Acidwave and MyDrive benchmarks have no dependencies).
+
+Select it with ``ACIDWAVE_BACKEND=local`` in the runners, which call
+``select_backend()`` right before ``study.run``, or with
+``study.run(n_jobs=..., parallel_backend="local")`` after ``install()``.
+``install`` patches AgentLab's study module, which imports the analysis
+stack, so only the driver process installs it, never the workers.
+
+Environment variables:
+    ACIDWAVE_BACKEND=local          use this backend in the experiment runners
+"""
+
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+# 控制调试输出 - 设置环境变量 ACIDWAVE_DEBUG=1 启用详细输出
+ACIDWAVE_DEBUG = os.environ.get('ACIDWAVE_DEBUG', '0') == '1'
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).parent.absolute()
+
+# Imported once in the fork server; modules that fail to import are skipped
+PRELOAD_MODULES = [
+    "patch_agentlab",
+    "benchmark.acidwave.task",
+    "benchmark.mydrive.task",
+    "agents.acidwave_agent",
+    "agentlab.experiments.loop",
+    "playwright.sync_api",
+]
+
+
+def debug_print(msg):
+    """条件打印调试信息"""
+    if ACIDWAVE_DEBUG:
+        print(msg)
+
+
+def default_backend():
+    """Backend name for the experiment runners (``ACIDWAVE_BACKEND``, default ray)."""
+    return os.environ.get('ACIDWAVE_BACKEND', 'ray')
+
+
+def select_backend():
+    """
+    Backend for ``study.run`` in the runners; installs the local backend in
+    this (driver) process when ``ACIDWAVE_BACKEND=local``.
+    """
+    backend = default_backend()
+    if backend == "local":
+        install()
+    return backend
+
+
+def _init_worker():
+    """Runs once per worker; modules are already loaded by the fork server."""
+    if str(PROJECT_ROOT) not in sys.path:
+        sys.path.insert(0, str(PROJECT_ROOT))
+    import patch_agentlab  # noqa: F401  (no-op when preloaded)
+    debug_print(f"[local_executor] Worker ready in PID {os.getpid()}")
+
+
+def _run_episode(exp_args):
+    start = time.monotonic()
+    try:
+        exp_args.run()
+        error = None
+    except Exception as e:
+        # ExpArgs.run records its own errors in summary_info.json; this is a crash outside it
+        error = f"{type(e).__name__}: {e}"
+    return exp_args.exp_name, error, time.monotonic() - start
+
+
+def _context():
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    ctx = multiprocessing.get_context(method)
+    if method == "forkserver":
+        ctx.set_forkserver_preload(PRELOAD_MODULES)
+    return ctx
+
+
+def run_experiments_local(n_jobs, exp_args_list, study_dir, **kwargs):
+    """
+    Run prepared-or-not ``ExpArgs`` in a local process pool.
+
+    Mirrors ``agentlab.experiments.launch_exp.run_experiments``: every
+    experiment is prepared into ``study_dir`` before dispatch and agent
+    resources are closed afterwards.
+
+    Args:
+        n_jobs: Worker processes
+        exp_args_list: Experiments, dispatched in list order
+        study_dir: Study directory
+        **kwargs: Ray-only options (e.g. ``avg_step_timeout``), ignored
+    """
+    if not exp_args_list:
+        logger.warning("No experiments to run.")
+        return
+
+    study_dir = Path(study_dir)
+    for exp_args in exp_args_list:
+        exp_args.agent_args.prepare()
+        exp_args.prepare(exp_root=study_dir)
+
+    start = time.monotonic()
+    n_workers = max(1, min(n_jobs, len(exp_args_list)))
+    crashed = 0
+    try:
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=_context(), initializer=_init_worker) as pool:
+            futures = [pool.submit(_run_episode, exp_args) for exp_args in exp_args_list]
+            for i, future in enumerate(as_completed(futures), 1):
+                exp_name, error, elapsed = future.result()
+                if error:
+                    crashed += 1
+                    logger.error(f"[local_executor] {exp_name} crashed: {error}")
+                debug_print(f"[local_executor] {i}/{len(futures)} {exp_name} done in {elapsed:.1f}s")
+    finally:
+        for exp_args in exp_args_list:
+            exp_args.agent_args.close()
+    logger.info(
+        f"[local_executor] {len(exp_args_list)} episodes on {n_workers} workers in "
+        f"{time.monotonic() - start:.1f}s ({crashed} crashed)"
+    )
+
+
+_INSTALLED = False
+
+
+def install():
+    """
+    Add ``parallel_backend="local"`` to AgentLab's ``run_experiments``.
+
+    Returns:
+        True if the backend is available
+    """
+    global _INSTALLED
+    if _INSTALLED:
+        return True
+    try:
+        import agentlab.experiments.launch_exp as launch_exp
+        import agentlab.experiments.study as study_module
+    except ImportError:
+        debug_print("[local_executor] AgentLab not installed, skipping")
+        return False
+
+    _original_run_experiments = launch_exp.run_experiments
+
+    def run_experiments(n_jobs, exp_args_list, study_dir, parallel_backend="ray", **kwargs):
+        if parallel_backend == "local":
+            return run_experiments_local(n_jobs, exp_args_list, study_dir, **kwargs)
+        return _original_run_experiments(n_jobs, exp_args_list, study_dir, parallel_backend=parallel_backend, **kwargs)
+
+    launch_exp.run_experiments = run_experiments
+    # study.py imports the function by name
+    if getattr(study_module, "run_experiments", None) is _original_run_experiments:
+        study_module.run_experiments = run_experiments
+    _INSTALLED = True
+    debug_print(f"[local_executor] Installed local backend in PID {os.getpid()}")
+    return True
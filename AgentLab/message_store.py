@@ -0,0 +1,134 @@
+"""
+Message Store
+=============
+
+Content-addressed storage of the chat messages the agent sends.
+
+``AcidwaveAgent.get_action`` used to put the whole ``messages`` list in
+``agent_info`` on every step, and AgentLab pickles it into every
+``step_*.pkl.gz``: the system prompt and all few-shot examples again on
+each step of each episode, plus the retry turns. With a store:
+
+- every message (role and content) is keyed by the SHA-256 of its
+  canonical JSON and written once per study, gzipped, as
+  ``<store>/<h[:2]>/<h>.json.gz``;
+- a block is written under a temporary name and renamed into place, so
+  workers writing the same block at once are harmless, and each process
+  remembers the blocks it has seen and skips them without touching disk;
+- ``agent_info["message_refs"]`` keeps only the store directory and the
+  hashes, in order, and ``load_messages(agent_info)`` rebuilds the list.
+
+The runners point ``ACIDWAVE_MESSAGE_STORE`` at ``<study>/message_store``
+(patch_agentlab forwards ``ACIDWAVE_*`` variables to Ray workers). Without
+it, messages stay inline in ``agent_info["messages"]``.
+
+Only ``acidwave_agent.AcidwaveAgent`` writes to the store. The
+``GenericAgentArgs`` presets in ``agents/`` keep AgentLab's own
+``chat_messages`` inline, so studies of those agents save nothing. This
+module only uses the standard library, so the runners can import it
+without loading the agent package (and BrowserGym).
+
+Example:
+    >>> store = MessageStore(study_dir / "message_store")
+    >>> refs = store.put_all(messages)
+    >>> store.get_all(refs) == messages
+    True
+    >>> load_messages(step_info.agent_info)   # either format
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+STORE_ENV = "ACIDWAVE_MESSAGE_STORE"
+
+
+class MessageStore:
+    """
+    Directory of unique message blocks.
+
+    Args:
+        root: Store directory (created on first write)
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+        # Blocks known to be on disk (written or read by this process)
+        self._known: Dict[str, dict] = {}
+
+    @staticmethod
+    def block_hash(message: dict) -> str:
+        return hashlib.sha256(
+            json.dumps(message, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+        ).hexdigest()
+
+    def _path(self, digest: str) -> Path:
+        return self.root / digest[:2] / f"{digest}.json.gz"
+
+    def put(self, message: dict) -> str:
+        """Store one message if new; returns its hash."""
+        digest = self.block_hash(message)
+        if digest in self._known:
+            return digest
+        path = self._path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            with gzip.open(tmp, "wt", encoding="utf-8") as f:
+                json.dump(message, f, ensure_ascii=False, default=str)
+            os.replace(tmp, path)
+        self._known[digest] = message
+        return digest
+
+    def put_all(self, messages: List[dict]) -> List[str]:
+        return [self.put(message) for message in messages]
+
+    def get(self, digest: str) -> dict:
+        message = self._known.get(digest)
+        if message is None:
+            with gzip.open(self._path(digest), "rt", encoding="utf-8") as f:
+                message = self._known[digest] = json.load(f)
+        return dict(message)
+
+    def get_all(self, digests: List[str]) -> List[dict]:
+        return [self.get(digest) for digest in digests]
+
+    def refs(self, messages: List[dict]) -> dict:
+        """Store ``messages`` and return what goes into ``agent_info["message_refs"]``."""
+        return {"store": str(self.root), "hashes": self.put_all(messages)}
+
+
+_STORE: Optional[MessageStore] = None
+
+
+def store_from_env() -> Optional[MessageStore]:
+    """The store named by ``ACIDWAVE_MESSAGE_STORE`` in this process, or None."""
+    global _STORE
+    root = os.environ.get(STORE_ENV)
+    if not root:
+        return None
+    if _STORE is None or _STORE.root != Path(root):
+        _STORE = MessageStore(Path(root))
+    return _STORE
+
+
+def load_messages(agent_info: dict, store_dir: Optional[Path] = None) -> Optional[List[dict]]:
+    """
+    Messages of one step, inline or rebuilt from the store.
+
+    Args:
+        agent_info: ``agent_info`` of a step
+        store_dir: Store directory, if the study was moved since it ran
+
+    Returns:
+        The messages, or None if the step recorded none
+    """
+    if "messages" in agent_info:
+        return agent_info["messages"]
+    refs = agent_info.get("message_refs")
+    if refs is None:
+        return None
+    return MessageStore(Path(store_dir or refs["store"])).get_all(refs["hashes"])
@@ -2,7 +2,9 @@
 AgentLab Patch for Acidwave Tasks
 ===================================
 
-This module patches AgentLab's _get_env_name function to support Acidwave tasks.
+This module hooks task lookup in Gymnasium and AgentLab so Acidwave and MyDrive
+tasks are registered on demand (benchmark/registration.py), and sets up Ray
+workers to do the same.
 
 Import this module BEFORE running AgentLab experiments to ensure Acidwave tasks
 are properly registered in Ray workers.
@@ -24,130 +26,21 @@ def debug_print(msg):
         print(msg)
 
 
-def patch_gymnasium_for_acidwave():
+def patch_task_registration():
     """
-    Patch Gymnasium's _find_spec to auto-import benchmark.acidwave when acidwave tasks are requested.
+    Register benchmark tasks lazily on lookup (see benchmark/registration.py).
     
-    This is a fallback to ensure tasks are registered even in Ray workers.
+    Hooks Gymnasium's _find_spec and AgentLab's _get_env_name once; an
+    acidwave.* or mydrive.* id registers its namespace on first lookup and
+    every later lookup is a set membership test.
     """
     try:
-        import gymnasium
-        from gymnasium.envs import registration
-        
-        # Save original function
-        _original_find_spec = registration._find_spec
-        
-        def _patched_find_spec(env_id: str):
-            """Enhanced _find_spec that auto-imports acidwave benchmark."""
-            # Check if it's an acidwave task
-            if "acidwave" in env_id.lower():
-                # Force import to register tasks
-                try:
-                    import benchmark.acidwave
-                    debug_print(f"[patch_gymnasium] Auto-imported benchmark.acidwave for {env_id} in PID {os.getpid()}")
-                except Exception as e:
-                    debug_print(f"[patch_gymnasium] Failed to import benchmark.acidwave: {e}")
-            
-            # Check if it's a mydrive task
-            if "mydrive" in env_id.lower():
-                try:
-                    import benchmark.mydrive
-                    debug_print(f"[patch_gymnasium] Auto-imported benchmark.mydrive for {env_id} in PID {os.getpid()}")
-                except Exception as e:
-                    debug_print(f"[patch_gymnasium] Failed to import benchmark.mydrive: {e}")
-            
-            # Call original function
-            return _original_find_spec(env_id)
-        
-        # Replace the function
-        registration._find_spec = _patched_find_spec
-        
-        debug_print("[patch_gymnasium] Successfully patched Gymnasium for Acidwave tasks")
-        return True
-        
-    except Exception as e:
-        debug_print(f"[patch_gymnasium] Error patching Gymnasium: {e}")
-        return False
-
-
-def patch_agentlab_for_acidwave():
-    """
-    Patch AgentLab's _get_env_name function to include Acidwave task registration.
-
-    This ensures that when Ray workers try to create Acidwave environments,
-    the benchmark package is imported and tasks are registered.
-    """
-    try:
-        from agentlab.experiments import loop
-
-        # Save original function
-        _original_get_env_name = loop._get_env_name
-
-        def _patched_get_env_name(task_name: str):
-            """Enhanced version that handles Acidwave tasks."""
-            import sys
-            import os
-            from pathlib import Path
-            
-            debug_print(f"[patch_agentlab._patched_get_env_name] Called with task_name={task_name}, PID={os.getpid()}")
-            
-            # Register Acidwave tasks if needed
-            if task_name.startswith("acidwave"):
-                # CRITICAL: Ensure project root is in sys.path
-                project_root = Path(__file__).parent
-                if str(project_root) not in sys.path:
-                    sys.path.insert(0, str(project_root))
-                    debug_print(f"[patch_agentlab] Added {project_root} to sys.path")
-                
-                # Force import of benchmark package
-                # This triggers automatic registration via benchmark/acidwave/__init__.py
-                try:
-                    import benchmark.acidwave
-                    debug_print(f"[patch_agentlab] Successfully imported benchmark.acidwave (registered {len(benchmark.acidwave.ALL_ACIDWAVE_TASK_IDS)} tasks) in PID {os.getpid()}")
-                    
-                    # Verify registration
-                    import gymnasium as gym
-                    registry = gym.envs.registry
-                    acidwave_tasks = [env_id for env_id in registry if 'acidwave' in env_id]
-                    debug_print(f"[patch_agentlab] Found {len(acidwave_tasks)} acidwave tasks in gym registry")
-                    
-                except ImportError as e:
-                    print(f"[patch_agentlab] ERROR: Failed to import benchmark.acidwave: {e}")
-                    print(f"[patch_agentlab] sys.path = {sys.path}")
-                    raise
-            
-            # Register MyDrive tasks if needed
-            if task_name.startswith("mydrive"):
-                project_root = Path(__file__).parent
-                if str(project_root) not in sys.path:
-                    sys.path.insert(0, str(project_root))
-                
-                try:
-                    import benchmark.mydrive
-                    debug_print(f"[patch_agentlab] Successfully imported benchmark.mydrive")
-                except ImportError as e:
-                    print(f"[patch_agentlab] ERROR: Failed to import benchmark.mydrive: {e}")
-                    raise
-
-            # Call original function for other tasks
-            result = _original_get_env_name(task_name)
-            debug_print(f"[patch_agentlab._patched_get_env_name] Returning: {result}")
-            return result
-
-        # Replace the function
-        loop._get_env_name = _patched_get_env_name
-
-        debug_print("[patch_agentlab] Successfully patched AgentLab for Acidwave tasks")
-        return True
-
-    except ImportError as e:
-        debug_print(f"[patch_agentlab] Warning: Could not patch AgentLab: {e}")
-        debug_print("[patch_agentlab] Make sure agentlab is installed")
-        return False
+        from benchmark import registration
+        installed = registration.install()
+        debug_print(f"[patch_task_registration] Lazy task registration installed={installed} in PID {os.getpid()}")
+        return installed
     except Exception as e:
-        debug_print(f"[patch_agentlab] Error patching AgentLab: {e}")
-        import traceback
-        traceback.print_exc()
+        debug_print(f"[patch_task_registration] Error installing task registration: {e}")
         return False
 
 
@@ -185,6 +78,11 @@ def patch_ray_init_for_acidwave():
             else:
                 env_vars['PYTHONPATH'] = str(project_root)
             
+            # Forward ACIDWAVE_* settings (debug, browser pool, ...) to workers
+            for key, value in os.environ.items():
+                if key.startswith('ACIDWAVE_'):
+                    env_vars.setdefault(key, value)
+            
             kwargs['runtime_env']['env_vars'] = env_vars
             
             # Add worker process setup hook
@@ -216,29 +114,55 @@ def patch_ray_init_for_acidwave():
         return False
 
 
+def patch_browser_pool():
+    """
+    Reuse Playwright browsers across episodes when ACIDWAVE_BROWSER_POOL=1.
+    
+    See browser_pool.py. Each worker process keeps its own pool.
+    """
+    if os.environ.get('ACIDWAVE_BROWSER_POOL', '0') != '1':
+        return False
+    try:
+        import browser_pool
+        return browser_pool.install()
+    except Exception as e:
+        debug_print(f"[patch_browser_pool] Error installing browser pool: {e}")
+        return False
 
-# Auto-patch on import
-patch_gymnasium_for_acidwave()  # CRITICAL: Patch Gymnasium first
-patch_agentlab_for_acidwave()   # Then patch AgentLab
-patch_ray_init_for_acidwave()   # Finally patch Ray to setup worker initialization
 
+def patch_tracing():
+    """
+    Write per-episode step traces when ACIDWAVE_TRACE=1.
+    
+    See benchmark/tracing.py; spans go to <exp_dir>/trace.jsonl.
+    """
+    if os.environ.get('ACIDWAVE_TRACE', '0') != '1':
+        return False
+    try:
+        from benchmark import tracing
+        return tracing.install()
+    except Exception as e:
+        debug_print(f"[patch_tracing] Error installing tracing: {e}")
+        return False
 
-# CRITICAL: Also ensure benchmark is imported in main process
-try:
-    import benchmark.acidwave
-    debug_print(f"[patch_agentlab] Registered {len(benchmark.acidwave.ALL_ACIDWAVE_TASK_IDS)} tasks in main process (PID {os.getpid()})")
+
+def patch_budget():
+    """
+    Record per-step token usage; stop starting episodes once ACIDWAVE_BUDGET's caps are hit.
     
-    # Verify tasks are actually registered
-    import gymnasium as gym
-    registry = gym.envs.registry
-    acidwave_tasks = [env_id for env_id in registry if 'acidwave' in env_id]
-    if acidwave_tasks:
-        debug_print(f"[patch_agentlab] Verified {len(acidwave_tasks)} Acidwave tasks in Gymnasium registry")
-    else:
-        print("[patch_agentlab] WARNING: No Acidwave tasks found in Gymnasium registry!")
-        
-except ImportError as e:
-    print(f"[patch_agentlab] Warning: Could not import benchmark.acidwave: {e}")
-except Exception as e:
-    print(f"[patch_agentlab] Error during task registration: {e}")
+    See benchmark/budget.py.
+    """
+    try:
+        from benchmark import budget
+        return budget.install()
+    except Exception as e:
+        debug_print(f"[patch_budget] Error installing token accounting: {e}")
+        return False
+
 
+# Auto-patch on import
+patch_task_registration()       # Lazy acidwave/mydrive registration on lookup
+patch_ray_init_for_acidwave()   # Patch Ray to setup worker initialization
+patch_browser_pool()            # Optional: warm browser pool (ACIDWAVE_BROWSER_POOL=1)
+patch_tracing()                 # Optional: per-step spans (ACIDWAVE_TRACE=1)
+patch_budget()                  # Token accounting, study budget (ACIDWAVE_BUDGET)
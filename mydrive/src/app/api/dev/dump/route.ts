@@ -17,8 +17,20 @@ export async function POST(req: Request) {
         // Let's stick to default "agent1" per my thought process, or maybe check body?
         // User said "agent1 dump agent2 dump", implies explicit toggle.
 
-        const TARGET_DIR = path.resolve(process.cwd(), "../AgentLab/directory_downloads");
+        // Optional per-instance subdirectory so pooled instances sharing one
+        // checkout do not overwrite each other's dumps
+        const instanceDir = url.searchParams.get("dir") || "";
+        if (instanceDir && (!/^[A-Za-z0-9_.-]+$/.test(instanceDir) || instanceDir === "." || instanceDir.includes(".."))) {
+            return NextResponse.json({ error: `Invalid dump dir '${instanceDir}'` }, { status: 400 });
+        }
+
+        const BASE_DIR = path.resolve(process.cwd(), "../AgentLab/directory_downloads");
+        const TARGET_DIR = path.resolve(BASE_DIR, instanceDir);
         const EXTRACT_DIR = path.join(TARGET_DIR, `${agentUsername}_dump`);
+        // Never clean up anything outside the dump directory
+        if (!EXTRACT_DIR.startsWith(BASE_DIR + path.sep)) {
+            return NextResponse.json({ error: `Invalid dump dir '${instanceDir}'` }, { status: 400 });
+        }
 
         // 1. Identify User
         const user = await prisma.user.findUnique({